@@ -3,7 +3,8 @@ import sys, os
 
 # Setup path agar bisa import helper
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
-from source.utils.minio_helper import read_df_from_minio
+from source.utils.minio_helper import read_partitioned_df_from_minio
+from source.utils.incremental import read_batches
 
 BUCKET_NAME = "mlbb-lake"
 
@@ -12,7 +13,8 @@ def check_data_types():
 
     # 1. CEK DATA BRONZE (Input)
     print("\n1. Memeriksa File Bronze (Input untuk Silver)...")
-    df_bronze = read_df_from_minio(BUCKET_NAME, "bronze/tournament_matches/bronze_mpl_matches.parquet", file_format='parquet')
+    # Cukup 1 kolom yang dicek: kolom lain tidak perlu di-download
+    df_bronze = read_partitioned_df_from_minio(BUCKET_NAME, "bronze/tournament_matches/mpl_matches", columns=['left_picks_normalized'])
     
     if df_bronze is not None:
         print(f"   ✅ File ditemukan. Total Match: {len(df_bronze)} baris.")
@@ -39,7 +41,8 @@ def check_data_types():
 
     # 2. CEK DATA SILVER (Output Saat Ini)
     print("\n2. Memeriksa File Silver Draft (Output saat ini)...")
-    df_silver = read_df_from_minio(BUCKET_NAME, "silver/silver_draft_heroes.parquet", file_format='parquet')
+    # Silver sekarang dipartisi per batch: gabungkan semua partisi
+    df_silver = read_batches(BUCKET_NAME, "silver/silver_draft_heroes", partition_cols=["region", "season"])
     
     if df_silver is not None:
         print(f"   📊 Total Baris di Silver: {len(df_silver)}")
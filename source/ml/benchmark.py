@@ -0,0 +1,378 @@
+"""
+Benchmark latency recommender & predictor dari fixture parquet lokal (tanpa MinIO).
+
+Contoh:
+    python -m source.ml.benchmark
+    python -m source.ml.benchmark --synthetic 1000 --mpl-matches 50 --output report/benchmark/after.json
+    python -m source.ml.benchmark --compare report/benchmark/before.json
+
+Draft yang diukur:
+- synthetic: state acak di setiap tahap draft (0-10 pick, 0-10 ban)
+- mpl: replay urutan ban/pick pertandingan MPL dari bronze mpl_matches (tiap langkah = satu state)
+
+Throughput predict_many diukur terpisah pada satu batch besar matchup 5v5 acak (--batch-rows);
+info CPU & setting thread ikut disimpan di meta hasil.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(BASE_DIR)
+
+from source.utils.helper_bronze import normalize_hero_name, parse_hero_list, get_tier_score
+from source.utils.hero_registry import HeroRegistry
+from source.ml.recommender import DraftRecommender
+from source.ml.predictor import DraftPredictor, MODEL_PATH
+
+DATA_DIR = os.path.join(BASE_DIR, "data", "bronze")
+OUTPUT_DIR = os.path.join(BASE_DIR, "report", "benchmark")
+
+ROLES = ["Tank", "Fighter", "Assassin", "Mage", "Marksman", "Support"]
+BENCH_USERS = ["bench_user_0", "bench_user_1", "bench_user_2"]
+
+# Urutan draft turnamen (10 ban): (aksi, sisi) -> left = tim kita, right = musuh
+MPL_DRAFT_ORDER = (
+    [('ban', 'left'), ('ban', 'right')] * 3 +
+    [('pick', 'left'), ('pick', 'right'), ('pick', 'right'), ('pick', 'left'), ('pick', 'left'), ('pick', 'right')] +
+    [('ban', 'right'), ('ban', 'left')] * 2 +
+    [('pick', 'right'), ('pick', 'left'), ('pick', 'left'), ('pick', 'right')]
+)
+
+
+# --- FIXTURE LOKAL ---
+def load_local_fixtures(data_dir=DATA_DIR, seed=0):
+    """
+    Frame format Gold dari parquet bronze lokal:
+    leaderboard (hero_master + tier_score), counter lookup, dan statistik user sintetis,
+    semuanya dengan hero_id registry (Target_ID scraper counter sebagai dasar id).
+    """
+    rng = np.random.default_rng(seed)
+
+    stats = pd.read_parquet(os.path.join(data_dir, "heroes", "hero_master.parquet"))
+    stats = stats[['hero_name_raw', 'hero_name_normalized', 'role', 'lane', 'win_rate', 'ban_rate', 'pick_rate']].copy()
+    meta = pd.read_parquet(os.path.join(data_dir, "meta_tier.parquet"))
+    tier_map = dict(zip(meta['Nama Hero'].map(normalize_hero_name), meta['Tier'].map(get_tier_score)))
+    stats['tier_score'] = stats['hero_name_normalized'].map(tier_map).fillna(0)
+
+    counter = pd.read_parquet(os.path.join(data_dir, "counter_hero.parquet"))
+    counters = pd.DataFrame({
+        'Target_Name': counter['Target_Name'].map(normalize_hero_name),
+        'Counter_Name': counter['Counter_Name'].map(normalize_hero_name),
+        'Score': counter['Score'],
+    })
+
+    registry = HeroRegistry()
+    registry.register(counter['Target_Name'], counter['Target_ID'])
+    stats['hero_id'] = registry.register(stats['hero_name_raw'])
+    counters['Target_ID'] = registry.ids_for_keys(counters['Target_Name'])
+    counters['Counter_ID'] = registry.register(counter['Counter_Name'])
+
+    # Statistik user & sinergi sintetis (format gold/user_history)
+    hero_ids = stats['hero_id'].to_numpy()
+    perf, synergy = [], []
+    for username in BENCH_USERS:
+        for hero_id in rng.choice(hero_ids, 40, replace=False):
+            picks = int(rng.integers(1, 10)); wins = int(rng.integers(0, picks + 1))
+            perf.append({'username': username, 'hero_id': hero_id, 'total_picks': picks, 'win_rate': wins / picks})
+        for hero_id in rng.choice(hero_ids, 40, replace=False):
+            matches = int(rng.integers(1, 10)); wins = int(rng.integers(0, matches + 1))
+            synergy.append({'username': username, 'hero_id': hero_id, 'matches_together': matches, 'synergy_wr': wins / matches})
+
+    return stats, counters, pd.DataFrame(perf), pd.DataFrame(synergy)
+
+
+# --- STATE DRAFT ---
+def random_profile(rnd, hero_names):
+    return {
+        'main_roles': rnd.sample(ROLES, rnd.randint(1, 2)),
+        'comfort_heroes': rnd.sample(hero_names, rnd.randint(0, 3)),
+        'avoid_roles': rnd.sample(ROLES, rnd.randint(0, 1)),
+    }
+
+def synthetic_drafts(hero_names, n, seed=1):
+    """State acak yang tersebar merata di semua kombinasi (jumlah pick 0-10, jumlah ban 0-10)."""
+    rnd = random.Random(seed)
+    drafts = []
+    for i in range(n):
+        n_picks, n_bans = i % 11, (i // 11) % 11
+        pool = rnd.sample(hero_names, n_picks + n_bans)
+        picks, bans = pool[:n_picks], pool[n_picks:]
+        drafts.append({
+            'my_team': picks[0::2], 'enemy_team': picks[1::2], 'banned': bans,
+            'username': rnd.choice(BENCH_USERS), 'profile': random_profile(rnd, hero_names),
+        })
+    return drafts
+
+def mpl_drafts(data_dir, hero_names, n_matches, seed=2):
+    """Replay pertandingan MPL: satu state sebelum setiap aksi draft + state akhir."""
+    df = pd.read_parquet(os.path.join(data_dir, "mpl_matches.parquet"))
+    if n_matches:
+        df = df.head(n_matches)
+
+    # key normalisasi -> nama tampilan (seperti yang dikirim aplikasi)
+    display = {normalize_hero_name(name): name for name in hero_names}
+    rnd = random.Random(seed)
+    drafts = []
+    for _, match in df.iterrows():
+        actions = {
+            ('ban', 'left'): parse_hero_list(match['Left_Bans']), ('ban', 'right'): parse_hero_list(match['Right_Bans']),
+            ('pick', 'left'): parse_hero_list(match['Left_Picks']), ('pick', 'right'): parse_hero_list(match['Right_Picks']),
+        }
+        username, profile = rnd.choice(BENCH_USERS), random_profile(rnd, hero_names)
+        my_team, enemy_team, banned = [], [], []
+        for step in range(len(MPL_DRAFT_ORDER) + 1):
+            drafts.append({'my_team': list(my_team), 'enemy_team': list(enemy_team), 'banned': list(banned),
+                           'username': username, 'profile': profile})
+            if step == len(MPL_DRAFT_ORDER): break
+            action, side = MPL_DRAFT_ORDER[step]
+            queue = actions[(action, side)]
+            if not queue: continue
+            hero = display.get(queue.pop(0))
+            if hero is None: continue
+            if action == 'ban':
+                banned.append(hero)
+            else:
+                (my_team if side == 'left' else enemy_team).append(hero)
+    return drafts
+
+
+# --- PENGUKURAN ---
+def _summary(latencies_ns, total_s):
+    lat_ms = np.asarray(latencies_ns, dtype=float) / 1e6
+    return {
+        'calls': int(lat_ms.size),
+        'p50_ms': float(np.percentile(lat_ms, 50)),
+        'p95_ms': float(np.percentile(lat_ms, 95)),
+        'p99_ms': float(np.percentile(lat_ms, 99)),
+        'mean_ms': float(lat_ms.mean()),
+        'max_ms': float(lat_ms.max()),
+        'throughput_per_s': float(lat_ms.size / total_s) if total_s > 0 else 0.0,
+    }
+
+def time_calls(fn, drafts, before_call=None, warmup=5):
+    """Latensi per panggilan (ns). `before_call` (mis. kosongkan cache) tidak ikut diukur."""
+    for draft in drafts[:warmup]:
+        fn(draft)
+    latencies = []
+    excluded = 0.0
+    total_start = time.perf_counter()
+    for draft in drafts:
+        if before_call:
+            prep_start = time.perf_counter()
+            before_call()
+            excluded += time.perf_counter() - prep_start
+        start = time.perf_counter_ns()
+        fn(draft)
+        latencies.append(time.perf_counter_ns() - start)
+    return latencies, time.perf_counter() - total_start - excluded
+
+def peak_memory(fn, drafts, before_call=None):
+    """Peak alokasi Python (tracemalloc, byte) selama satu pass; dipisah dari pass timing."""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    for draft in drafts:
+        if before_call: before_call()
+        fn(draft)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def build_operations(recommender, predictor):
+    ops = {
+        'recommend_dynamic_ban': (recommender, lambda d: recommender.recommend_dynamic_ban(d['my_team'], d['enemy_team'], d['banned'])),
+        'recommend_dynamic_pick': (recommender, lambda d: recommender.recommend_dynamic_pick(d['my_team'], d['enemy_team'], d['banned'], d['username'])),
+        'recommend_personalized': (recommender, lambda d: recommender.recommend_personalized(
+            d['my_team'], d['enemy_team'], d['banned'], d['profile'], d['username'])),
+    }
+    if predictor is not None:
+        ops['predict_win_rate'] = (predictor, lambda d: predictor.predict_win_rate(d['my_team'], d['enemy_team']))
+    return ops
+
+def run_benchmark(recommender, predictor, datasets, memory_sample=50, predictor_limit=None):
+    results = {}
+    for op_name, (owner, fn) in build_operations(recommender, predictor).items():
+        cache = getattr(owner, 'cache', None)
+        results[op_name] = {}
+        for ds_name, drafts in datasets.items():
+            if op_name == 'predict_win_rate':
+                drafts = [d for d in drafts if d['my_team'] and d['enemy_team']][:predictor_limit]
+            if not drafts: continue
+            print(f"[BENCH] {op_name} / {ds_name} ({len(drafts)} state)")
+
+            entry = {}
+            # cold: cache dikosongkan sebelum tiap panggilan (biaya hitung penuh)
+            clear = cache.clear if cache is not None else None
+            latencies, total = time_calls(fn, drafts, before_call=clear)
+            entry['cold'] = _summary(latencies, total)
+            entry['cold']['peak_alloc_kb'] = peak_memory(fn, drafts[:memory_sample], before_call=clear) / 1024
+
+            # warm: pass kedua atas state yang sama (cache hit), hanya jika ada cache
+            if cache is not None:
+                for draft in drafts:
+                    fn(draft)
+                latencies, total = time_calls(fn, drafts, warmup=0)
+                entry['warm'] = _summary(latencies, total)
+            results[op_name][ds_name] = entry
+    return results
+
+
+def random_matchups(predictor, n_rows, seed=0, team_size=5, chunk=20000):
+    """Matchup acak 5v5 (tanpa hero dobel per matchup) -> (left, right) array hero index (n_rows x team_size)."""
+    rng = np.random.default_rng(seed)
+    heroes = np.flatnonzero(predictor.hero_known[:len(predictor.hero_names)])
+    teams = np.concatenate([
+        heroes[np.argsort(rng.random((min(chunk, n_rows - start), heroes.size)), axis=1)[:, :2 * team_size]]
+        for start in range(0, n_rows, chunk)
+    ])
+    return teams[:, :team_size].astype(np.intp), teams[:, team_size:].astype(np.intp)
+
+def batch_throughput(predictor, n_rows, repeats=3, seed=0):
+    """Throughput (baris/detik) build_features_many dan predict_many untuk satu batch besar matchup acak."""
+    left, right = random_matchups(predictor, n_rows, seed)
+    # Pemanasan di luar pengukuran: booster inplace_predict TreeEnsemble dimuat lazy di batch besar pertama
+    predictor.predict_many(left[:8192], right[:8192])
+    timings = {'build_features_many': [], 'predict_many': []}
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predictor.build_features_many(left, right)
+        timings['build_features_many'].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        predictor.predict_many(left, right)
+        timings['predict_many'].append(time.perf_counter() - start)
+    return {name: {'rows': n_rows, 'repeats': repeats,
+                   'best_rows_per_s': n_rows / min(values),
+                   'median_rows_per_s': n_rows / float(np.median(values))}
+            for name, values in timings.items()}
+
+
+# --- OUTPUT ---
+def _cpu_model():
+    """Nama CPU (Linux: /proc/cpuinfo), fallback ke platform.processor()."""
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or None
+
+def hardware_info():
+    """Info mesin & setting thread, disimpan di meta agar angka throughput bisa dibandingkan."""
+    return {
+        'cpu_model': _cpu_model(),
+        'cpu_count': os.cpu_count(),
+        'cpu_available': len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count(),
+        'machine': platform.machine(),
+        'omp_num_threads': os.environ.get('OMP_NUM_THREADS'),
+    }
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+def print_table(results, baseline=None):
+    header = f"{'operation':<24}{'dataset':<11}{'mode':<6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'calls/s':>10}"
+    if baseline: header += f"{'p50 vs base':>13}"
+    print(header)
+    print('-' * len(header))
+    for op_name, per_ds in results.items():
+        for ds_name, per_mode in per_ds.items():
+            for mode, m in per_mode.items():
+                line = f"{op_name:<24}{ds_name:<11}{mode:<6}{m['p50_ms']:>9.3f}{m['p95_ms']:>9.3f}{m['p99_ms']:>9.3f}{m['throughput_per_s']:>10.0f}"
+                base = (baseline or {}).get(op_name, {}).get(ds_name, {}).get(mode)
+                if base and base['p50_ms'] > 0:
+                    line += f"{(m['p50_ms'] / base['p50_ms'] - 1) * 100:>+12.1f}%"
+                print(line)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark latency recommender & predictor (fixture lokal).")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="Folder parquet bronze lokal")
+    parser.add_argument('--synthetic', type=int, default=363, help="Jumlah state draft acak")
+    parser.add_argument('--mpl-matches', type=int, default=30, help="Jumlah pertandingan MPL yang di-replay (0 = semua)")
+    parser.add_argument('--memory-sample', type=int, default=50, help="Jumlah state untuk pass pengukuran memori")
+    parser.add_argument('--predictor-limit', type=int, default=300, help="Batas state per dataset untuk predict_win_rate")
+    parser.add_argument('--model-path', default=MODEL_PATH)
+    parser.add_argument('--no-predictor', action='store_true')
+    parser.add_argument('--batch-rows', type=int, default=200000, help="Jumlah matchup 5v5 untuk throughput predict_many (0 = lewati)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help="File JSON hasil (default: report/benchmark/bench_<waktu>.json)")
+    parser.add_argument('--compare', default=None, help="File JSON hasil sebelumnya untuk dibandingkan")
+    args = parser.parse_args(argv)
+
+    print("--- [INFO] Benchmark: memuat fixture lokal ---")
+    stats, counters, user_perf, synergy = load_local_fixtures(args.data_dir, seed=args.seed)
+    recommender = DraftRecommender.from_frames(stats, counters, user_perf, synergy)
+    predictor = None
+    if not args.no_predictor and os.path.exists(args.model_path):
+        predictor = DraftPredictor.from_frames(stats, counters, model_path=args.model_path)
+
+    hero_names = recommender.df_stats['hero_name'].tolist()
+    datasets = {
+        'synthetic': synthetic_drafts(hero_names, args.synthetic, seed=args.seed + 1),
+        'mpl': mpl_drafts(args.data_dir, hero_names, args.mpl_matches, seed=args.seed + 2),
+    }
+
+    started = time.time()
+    results = run_benchmark(recommender, predictor, datasets, args.memory_sample, args.predictor_limit)
+    batch = None
+    if predictor is not None and args.batch_rows > 0:
+        print(f"[BENCH] predict_many / batch ({args.batch_rows} matchup 5v5)")
+        batch = batch_throughput(predictor, args.batch_rows, seed=args.seed)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'hardware': hardware_info(),
+            'predictor_model': type(predictor.model).__name__ if predictor is not None else None,
+            'duration_s': round(time.time() - started, 2),
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            'args': vars(args),
+        },
+        'datasets': {name: len(drafts) for name, drafts in datasets.items()},
+        'results': results,
+        'batch': batch,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f).get('results')
+    print_table(results, baseline)
+    if batch:
+        hw = report['meta']['hardware']
+        print(f"[INFO] Batch ({hw['cpu_model']}, {hw['cpu_available']}/{hw['cpu_count']} CPU, "
+              f"model {report['meta']['predictor_model']}):")
+        for name, m in batch.items():
+            print(f"  {name:<22}{m['rows']:>8} baris  best {m['best_rows_per_s']:>10,.0f}/s  median {m['median_rows_per_s']:>10,.0f}/s")
+
+    output = args.output or os.path.join(OUTPUT_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"[INFO] Hasil benchmark disimpan: {output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+import os
+import sys
+import time
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# Setup path agar bisa import helper
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from source.utils.lane_helper import solve_team
+from source.ml.draft_state import DraftState, ALLY, ENEMY, indices_to_bits, bits_to_mask
+
+
+class SearchTimeout(Exception):
+    """Deadline habis di tengah satu iterasi kedalaman."""
+
+
+class SearchContext:
+    """
+    Array numerik yang dibutuhkan search, diambil dari DraftRecommender.
+    Sengaja tanpa DataFrame/cache/lock agar murah di-pickle ke worker process.
+    Semua index di sini adalah index baris df_stats.
+    """
+
+    def __init__(self, recommender):
+        df = recommender.df_stats
+        self.names = df['hero_name'].to_numpy() if not df.empty else np.array([], dtype=object)
+        self.win_rate = df['win_rate'].to_numpy(dtype=float) if not df.empty else np.zeros(0)
+
+        # Lane tiap hero sebagai bitmask (lihat LANE_ROLES)
+        self.lane_bits = recommender.lane_masks.astype(np.int64)
+
+        # counter_bonus[e, c] = poin heuristik hero c saat melawan musuh e
+        # (sama dengan komponen counter di skor strategis recommend_personalized)
+        rows = recommender.row_hero_idx
+        scores = recommender.counter_matrix[np.ix_(rows, rows)]
+        exists = recommender.counter_exists[np.ix_(rows, rows)]
+        self.counter_bonus = np.where(exists & (scores >= 2.0), 25, np.where(exists & (scores >= 1.0), 15, 0)).astype(np.float32)
+
+    def heuristic(self, team_rows, opponent_rows, available):
+        """Skor strategis (meta + kebutuhan lane + counter) untuk pick berikutnya sebuah tim."""
+        _, open_lanes = solve_team(self.lane_bits[list(team_rows)])
+        score = self.win_rate * 100 + np.where((self.lane_bits & open_lanes) != 0, 40, 0)
+        if opponent_rows:
+            score = score + self.counter_bonus[list(opponent_rows)].sum(axis=0)
+        return np.where(available, score, -np.inf)
+
+
+class _Searcher:
+    """
+    Expectimax di atas urutan pick tersisa:
+    - node ALLY mengambil nilai maksimum dari `beam_ally` kandidat terbaik (heuristik),
+    - node ENEMY mengambil rata-rata berbobot (softmax heuristik) dari `beam_enemy` respon paling mungkin,
+    - daun dinilai dengan predictor.predict_many (draft parsial juga didukung); semua
+      child daun dari satu node yang di-expand dinilai dalam satu panggilan.
+    Transposition table dikunci pada bitset (ally, enemy, sisa kedalaman).
+    """
+
+    def __init__(self, ctx, predictor, banned_bits, pick_order, beam_ally, beam_enemy, temperature):
+        self.ctx = ctx
+        self.predictor = predictor
+        self.banned_bits = banned_bits
+        self.pick_order = pick_order
+        self.beam_ally = beam_ally
+        self.beam_enemy = beam_enemy
+        self.temperature = temperature
+        self.deadline = float('inf')
+        self.table = {}
+        # Baris df_stats -> hero index predictor (-1 = hero tidak dikenal predictor)
+        self.hero_idx = np.array([predictor.hero_index.get(predictor._normalize(name), -1) for name in ctx.names],
+                                 dtype=np.intp)
+
+    def available(self, ally_bits, enemy_bits):
+        return ~bits_to_mask(ally_bits | enemy_bits | self.banned_bits, len(self.ctx.names))
+
+    def leaf(self, ally, enemy):
+        return float(self.leaf_values([(ally, enemy)])[0])
+
+    def leaf_values(self, states):
+        """Win probability ALLY untuk banyak state (ally, enemy) dalam satu predict_many."""
+        left = np.full((len(states), max(max(len(a) for a, _ in states), 1)), -1, dtype=np.intp)
+        right = np.full((len(states), max(max(len(e) for _, e in states), 1)), -1, dtype=np.intp)
+        for row, (ally, enemy) in enumerate(states):
+            left[row, :len(ally)] = self.hero_idx[ally]
+            right[row, :len(enemy)] = self.hero_idx[enemy]
+        return self.predictor.predict_many(left, right)
+
+    def children(self, states, step, max_depth):
+        """
+        Nilai tiap child (ally, enemy, ally_bits, enemy_bits) di step + 1.
+        Jika child adalah daun, yang belum ada di transposition table dinilai sekaligus.
+        """
+        remaining = max_depth - step - 1
+        if remaining <= 0 or step + 1 >= len(self.pick_order):
+            missing = {}
+            for ally, enemy, ally_bits, enemy_bits in states:
+                key = (ally_bits, enemy_bits, remaining)
+                if key not in self.table:
+                    missing.setdefault(key, (ally, enemy))
+            if missing:
+                for key, value in zip(missing, self.leaf_values(list(missing.values()))):
+                    self.table[key] = float(value)
+        return [self.value(ally, enemy, ally_bits, enemy_bits, step + 1, max_depth)
+                for ally, enemy, ally_bits, enemy_bits in states]
+
+    def value(self, ally, enemy, ally_bits, enemy_bits, step, max_depth):
+        """Perkiraan win probability akhir tim ALLY dari state ini."""
+        if time.time() > self.deadline:
+            raise SearchTimeout()
+
+        remaining = max_depth - step
+        key = (ally_bits, enemy_bits, remaining)
+        cached = self.table.get(key)
+        if cached is not None:
+            return cached
+
+        if remaining <= 0 or step >= len(self.pick_order):
+            result = self.leaf(ally, enemy)
+        else:
+            side = self.pick_order[step]
+            available = self.available(ally_bits, enemy_bits)
+            if side == ALLY:
+                scores = self.ctx.heuristic(ally, enemy, available)
+                candidates = _top_k(scores, self.beam_ally)
+                result = max(self.children(
+                    [(ally + [c], enemy, ally_bits | (1 << c), enemy_bits) for c in candidates], step, max_depth
+                )) if candidates else self.leaf(ally, enemy)
+            else:
+                scores = self.ctx.heuristic(enemy, ally, available)
+                candidates = _top_k(scores, self.beam_enemy)
+                if candidates:
+                    weights = _softmax(scores[candidates], self.temperature)
+                    values = self.children(
+                        [(ally, enemy + [c], ally_bits, enemy_bits | (1 << c)) for c in candidates], step, max_depth
+                    )
+                    result = float(sum(w * v for w, v in zip(weights, values)))
+                else:
+                    result = self.leaf(ally, enemy)
+
+        self.table[key] = result
+        return result
+
+    def root_value(self, ally, enemy, root, max_depth):
+        ally_bits, enemy_bits = indices_to_bits(ally), indices_to_bits(enemy)
+        return self.value(ally + [root], enemy, ally_bits | (1 << root), enemy_bits, 1, max_depth)
+
+
+class DraftSearch:
+    """
+    Mode lookahead: melihat 2-4 pick ke depan (pick kita dan respon musuh
+    yang paling mungkin) lalu meranking kandidat berdasarkan perkiraan
+    win probability akhir, bukan skor aditif satu langkah.
+
+    Anytime: iterative deepening sampai deadline, hasil yang dikembalikan
+    berasal dari kedalaman terdalam yang selesai untuk SEMUA kandidat.
+    Dengan `workers` > 1 tiap subtree kandidat dikerjakan di process pool;
+    `start_method` ('spawn'/'fork'/'forkserver', None = default platform) menentukan
+    cara worker dibuat. Pakai 'spawn' dari proses yang punya thread lain (mis. Streamlit).
+    """
+
+    def __init__(self, recommender, predictor, root_width=8, beam_ally=5, beam_enemy=4,
+                 temperature=10.0, workers=None, start_method=None):
+        self.recommender = recommender
+        self.predictor = predictor
+        self.root_width = root_width
+        self.beam_ally = beam_ally
+        self.beam_enemy = beam_enemy
+        self.temperature = temperature
+        self.workers = workers
+        self.start_method = start_method
+        self.ctx = SearchContext(recommender)
+        self._executor = None
+
+    def _rows(self, heroes):
+        rows = []
+        for hero in (heroes or []):
+            row = self.recommender.hero_row.get(self.recommender._normalize_name(hero)) if hero else None
+            if row is not None:
+                rows.append(row)
+        return rows
+
+    def search(self, my_team, enemy_team, banned_heroes, pick_order, max_depth=3, time_budget=1.5):
+        """
+        Ranking pick berikutnya untuk tim kita.
+
+        pick_order: urutan side ('ally'/'enemy') untuk slot yang masih kosong,
+                    dimulai dari slot saat ini (harus 'ally').
+        Return list dict {'hero', 'win_prob', 'depth', 'heuristic'} urut win_prob menurun.
+        """
+        if not pick_order or pick_order[0] != ALLY:
+            raise ValueError("pick_order harus dimulai dari giliran 'ally'")
+        if len(self.ctx.names) == 0:
+            return []
+
+        ally, enemy, banned = self._rows(my_team), self._rows(enemy_team), self._rows(banned_heroes)
+        # DraftState di ruang baris df_stats (bukan hero index): bit ke-r = baris r
+        state = DraftState.from_indices(len(self.ctx.names), ally, enemy, banned)
+        banned_bits = state.bans[0]
+        available = state.available_mask()
+        scores = self.ctx.heuristic(ally, enemy, available)
+        roots = _top_k(scores, self.root_width)
+        if not roots:
+            return []
+
+        max_depth = max(1, min(max_depth, len(pick_order)))
+        deadline = time.time() + time_budget
+        args = (banned_bits, list(pick_order), self.beam_ally, self.beam_enemy, self.temperature)
+
+        if self.workers and self.workers > 1:
+            per_root = self._search_parallel(ally, enemy, roots, max_depth, deadline, args)
+        else:
+            per_root = self._search_sequential(ally, enemy, roots, max_depth, deadline, args)
+
+        # Kedalaman terdalam yang selesai untuk semua kandidat (agar perbandingan adil)
+        common = set.intersection(*(set(values) for values in per_root.values()))
+        depth = max(common) if common else 0
+
+        results = []
+        for root in roots:
+            results.append({
+                'hero': self.ctx.names[root],
+                'win_prob': per_root[root][depth] if depth else None,
+                'depth': depth,
+                'heuristic': float(scores[root]),
+            })
+        if depth:
+            results.sort(key=lambda x: x['win_prob'], reverse=True)
+        return results
+
+    def _search_sequential(self, ally, enemy, roots, max_depth, deadline, args):
+        """Iterative deepening: selesaikan satu kedalaman untuk semua kandidat sebelum lanjut."""
+        searcher = _Searcher(self.ctx, self.predictor, *args)
+        searcher.deadline = deadline
+        per_root = {root: {} for root in roots}
+        ally_bits, enemy_bits = indices_to_bits(ally), indices_to_bits(enemy)
+        states = [(ally + [root], enemy, ally_bits | (1 << root), enemy_bits) for root in roots]
+        try:
+            for depth in range(1, max_depth + 1):
+                values = dict(zip(roots, searcher.children(states, 0, depth)))
+                for root, value in values.items():
+                    per_root[root][depth] = value
+        except SearchTimeout:
+            pass
+        return per_root
+
+    def _search_parallel(self, ally, enemy, roots, max_depth, deadline, args):
+        """Tiap subtree kandidat dikerjakan satu worker (iterative deepening sendiri)."""
+        executor = self._get_executor()
+        futures = {
+            root: executor.submit(_worker_search_root, ally, enemy, root, max_depth, deadline, args)
+            for root in roots
+        }
+        return {root: future.result() for root, future in futures.items()}
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(self.start_method) if self.start_method else None,
+                initializer=_worker_init,
+                initargs=(self.ctx, self.predictor),
+            )
+        return self._executor
+
+    def warm_up(self):
+        """
+        Jalankan semua worker sekarang (start + unpickle context/predictor), agar biaya
+        start tidak memakan time budget search pertama. No-op tanpa process pool.
+        """
+        if self.workers and self.workers > 1:
+            executor = self._get_executor()
+            for future in [executor.submit(_worker_ping) for _ in range(self.workers)]:
+                future.result()
+        return self
+
+    def close(self, wait=True):
+        """
+        Matikan process pool. wait=False: langsung kembali tanpa membatalkan search
+        yang sedang berjalan (dipakai saat snapshot berganti); worker berhenti setelah selesai.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=wait)
+            self._executor = None
+
+
+# --- WORKER PROCESS ---
+_WORKER = {}
+
+def _worker_init(ctx, predictor):
+    _WORKER['ctx'] = ctx
+    _WORKER['predictor'] = predictor
+
+def _worker_ping():
+    return os.getpid()
+
+def _worker_search_root(ally, enemy, root, max_depth, deadline, args):
+    """Iterative deepening satu kandidat root, return {kedalaman: nilai} yang selesai."""
+    searcher = _Searcher(_WORKER['ctx'], _WORKER['predictor'], *args)
+    searcher.deadline = deadline
+    values = {}
+    try:
+        for depth in range(1, max_depth + 1):
+            values[depth] = searcher.root_value(ally, enemy, root, depth)
+    except SearchTimeout:
+        pass
+    return values
+
+
+# --- HELPER ---
+def _top_k(scores, k):
+    """Index (int python) k skor tertinggi yang finite, urut menurun."""
+    valid = np.flatnonzero(np.isfinite(scores))
+    if valid.size > k:
+        valid = valid[np.argpartition(-scores[valid], k - 1)[:k]]
+    return valid[np.argsort(-scores[valid], kind='stable')].tolist()
+
+def _softmax(scores, temperature):
+    z = (scores - scores.max()) / temperature
+    w = np.exp(z)
+    return w / w.sum()
@@ -0,0 +1,132 @@
+import numpy as np
+
+ALLY = 'ally'
+ENEMY = 'enemy'
+SIDES = (ALLY, ENEMY)
+
+
+class DraftState:
+    """
+    State draft ringkas: pick & ban per sisi sebagai bitset lebar tetap di atas hero index
+    (hero_id registry di recommender/predictor, atau baris df_stats untuk search).
+
+    Bitset berupa int Python (bit ke-i = hero index i), jadi add/remove O(1),
+    key hashable untuk cache/transposition table tanpa sort, dan serialisasi
+    cukup 4 x ceil(n/8) byte. Urutan pick tidak disimpan; pemanggil yang butuh
+    urutan (teks alasan counter, undo) menyimpan list-nya sendiri.
+    """
+    __slots__ = ('n_heroes', 'picks', 'bans')
+
+    def __init__(self, n_heroes, picks=(0, 0), bans=(0, 0)):
+        self.n_heroes = n_heroes
+        self.picks = list(picks)  # [ally, enemy]
+        self.bans = list(bans)    # [ally, enemy]
+
+    @classmethod
+    def from_indices(cls, n_heroes, ally=(), enemy=(), bans=(), enemy_bans=()):
+        """State dari list hero index per slot (index None / negatif diabaikan)."""
+        return cls(n_heroes, (indices_to_bits(ally), indices_to_bits(enemy)),
+                   (indices_to_bits(bans), indices_to_bits(enemy_bans)))
+
+    # --- UPDATE (O(1)) ---
+    def pick(self, side, idx):
+        """Set bit pick `side`. Return True jika bit sebelumnya belum terset (berguna untuk undo)."""
+        return self._set(self.picks, _side_pos(side), idx)
+
+    def ban(self, idx, side=ALLY):
+        return self._set(self.bans, _side_pos(side), idx)
+
+    def unpick(self, side, idx):
+        self.picks[_side_pos(side)] &= ~(1 << idx)
+
+    def unban(self, idx, side=ALLY):
+        self.bans[_side_pos(side)] &= ~(1 << idx)
+
+    @staticmethod
+    def _set(bitsets, pos, idx):
+        if idx is None or idx < 0:
+            return False
+        bit = 1 << idx
+        added = not bitsets[pos] & bit
+        bitsets[pos] |= bit
+        return added
+
+    # --- READ ---
+    @property
+    def unavailable_bits(self):
+        return self.picks[0] | self.picks[1] | self.bans[0] | self.bans[1]
+
+    def is_available(self, idx):
+        return not (self.unavailable_bits >> idx) & 1
+
+    def side_bits(self, side):
+        return self.picks[_side_pos(side)]
+
+    def team_indices(self, side):
+        """Hero index pick satu sisi (urut index) sebagai array intp."""
+        return bits_to_indices(self.side_bits(side))
+
+    def available_mask(self):
+        """Mask bool sepanjang n_heroes: True jika hero belum di-pick/ban."""
+        return ~bits_to_mask(self.unavailable_bits, self.n_heroes)
+
+    def available_rows(self, row_index):
+        """Posisi baris yang masih tersedia untuk array hero index per baris (mis. row_hero_idx)."""
+        return np.flatnonzero(self.available_mask()[row_index])
+
+    # --- HASH & SERIALISASI ---
+    def key(self):
+        """Key stabil & hashable (sama antar proses, tidak bergantung urutan pick)."""
+        return (self.picks[0], self.picks[1], self.bans[0], self.bans[1])
+
+    def __eq__(self, other):
+        return isinstance(other, DraftState) and self.n_heroes == other.n_heroes and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return (f"DraftState(ally={self.team_indices(ALLY).tolist()}, enemy={self.team_indices(ENEMY).tolist()}, "
+                f"bans={bits_to_indices(self.bans[0] | self.bans[1]).tolist()})")
+
+    def copy(self):
+        return DraftState(self.n_heroes, self.picks, self.bans)
+
+    def to_bytes(self):
+        """4 bitset little-endian lebar tetap ceil(n_heroes/8) byte."""
+        width = _byte_width(self.n_heroes)
+        return b''.join(bits.to_bytes(width, 'little') for bits in self.key())
+
+    @classmethod
+    def from_bytes(cls, n_heroes, data):
+        width = _byte_width(n_heroes)
+        ally, enemy, bans, enemy_bans = (int.from_bytes(data[i * width:(i + 1) * width], 'little') for i in range(4))
+        return cls(n_heroes, (ally, enemy), (bans, enemy_bans))
+
+
+def _side_pos(side):
+    if side == ALLY:
+        return 0
+    if side == ENEMY:
+        return 1
+    raise ValueError(f"side harus salah satu dari {SIDES}, bukan {side!r}")
+
+def _byte_width(n):
+    return (n + 7) // 8 or 1
+
+def indices_to_bits(indices):
+    """List hero index -> bitset int (None / negatif diabaikan)."""
+    bits = 0
+    for idx in indices:
+        if idx is not None and idx >= 0:
+            bits |= 1 << int(idx)
+    return bits
+
+def bits_to_mask(bits, n):
+    """Bitset int -> mask bool numpy sepanjang n."""
+    raw = np.frombuffer(bits.to_bytes(_byte_width(max(n, bits.bit_length())), 'little'), dtype=np.uint8)
+    return np.unpackbits(raw, bitorder='little')[:n].astype(bool)
+
+def bits_to_indices(bits):
+    """Bitset int -> array index bit yang terset (urut naik)."""
+    return np.flatnonzero(bits_to_mask(bits, bits.bit_length()))
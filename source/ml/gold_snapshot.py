@@ -0,0 +1,101 @@
+import threading
+import time
+
+
+class HotSnapshot:
+    """
+    Pemegang snapshot data gold yang bisa di-reload tanpa restart aplikasi.
+
+    `build()` membuat objek baru yang lengkap (mis. DraftRecommender atau
+    DraftPredictor) dan objek itu tidak diubah lagi setelah dipublikasikan.
+    `signature()` mengembalikan ETag object sumber (murah, cukup stat).
+    Poller di background mengecek ETag; jika berubah, snapshot baru dibangun
+    di thread poller lalu ditukar dengan satu assignment referensi.
+
+    Pembaca cukup mengambil `.current` sekali per request (tanpa lock):
+    request yang sedang berjalan tetap memakai snapshot lama sampai selesai,
+    jadi tidak ada stall dan tidak ada data campuran lama/baru.
+    """
+
+    def __init__(self, build, signature, interval_seconds=60, name="snapshot"):
+        self._build = build
+        self._signature = signature
+        self.interval_seconds = interval_seconds
+        self.name = name
+
+        self.version = 0
+        self.loaded_at = None
+        self._current = None
+        self._build_lock = threading.Lock()  # hanya untuk sisi writer (reload)
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.refresh(force=True)
+
+    @property
+    def current(self):
+        """Snapshot aktif. Simpan ke variabel lokal dan pakai untuk seluruh request."""
+        return self._current
+
+    @property
+    def etags(self):
+        return getattr(self._current, 'source_etags', None)
+
+    def __getattr__(self, attr):
+        # Kompatibilitas: pemanggilan lama (recommender.recommend_x(...)) diteruskan ke snapshot aktif
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self._current, attr)
+
+    def refresh(self, force=False):
+        """
+        Cek ETag sumber dan bangun snapshot baru jika berubah.
+        Return True jika snapshot ditukar. Jika build gagal, snapshot lama tetap dipakai.
+        """
+        with self._build_lock:
+            etags = self._signature()
+            if not force:
+                # Sumber tidak bisa dicek (MinIO mati / object hilang): jangan reload
+                if not etags or any(tag is None for tag in etags.values()):
+                    return False
+                if etags == self.etags:
+                    return False
+
+            try:
+                snapshot = self._build()
+            except Exception as e:
+                if self._current is None:
+                    raise
+                print(f"[WARNING] Reload {self.name} gagal, tetap memakai versi {self.version}: {e}")
+                return False
+
+            # Tag dipasang sebelum publish; setelah ini snapshot dianggap immutable
+            snapshot.source_etags = etags
+            self._current = snapshot
+            self.version += 1
+            self.loaded_at = time.time()
+            if self.version > 1:
+                print(f"[INFO] {self.name} reloaded -> versi {self.version}")
+            return True
+
+    # --- BACKGROUND POLLER ---
+    def start(self):
+        """Jalankan poller ETag di daemon thread (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._poll, name=f"{self.name}-poller", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _poll(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"[WARNING] Poller {self.name} error: {e}")
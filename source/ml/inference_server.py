@@ -0,0 +1,379 @@
+"""
+Micro-batching inference server untuk predictor & recommender, dipakai bersama semua sesi Streamlit.
+
+Request dari banyak thread (sesi) masuk ke satu event loop asyncio di thread sendiri.
+Loop mengumpulkan request selama `window_ms`, lalu:
+- semua prediksi win rate dalam satu window -> satu panggilan model (predict_win_rate_many),
+- request rekomendasi dijalankan di thread pool terpisah (loop.run_in_executor), jadi satu rekomendasi
+  yang lambat tidak menahan batch prediksi maupun deadline request lain di window yang sama
+  (hasil identik tetap digabung oleh cache recommender).
+Hasil dikembalikan ke tiap pemanggil lewat Future.
+
+Backpressure: jumlah request yang belum selesai dibatasi `max_queue`, sisanya langsung ditolak (ServerBusy).
+Deadline: request yang deadline-nya lewat sebelum batch dijalankan tidak dihitung (DeadlineExceeded).
+
+Load test offline (fixture parquet lokal, tanpa MinIO):
+    python -m source.ml.inference_server --clients 32 --requests 4000 --window-ms 3
+    python -m source.ml.inference_server --clients 32 --requests 4000 --direct   # baseline LocalClient
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import os
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(BASE_DIR)
+
+RECOMMEND_METHODS = ('recommend_dynamic_ban', 'recommend_dynamic_pick', 'recommend_personalized')
+
+
+class ServerBusy(Exception):
+    """Antrian server penuh (backpressure), request ditolak tanpa diproses."""
+
+
+class DeadlineExceeded(Exception):
+    """Deadline request habis sebelum hasilnya siap."""
+
+
+class _Request:
+    __slots__ = ('kind', 'payload', 'deadline', 'future')
+
+    def __init__(self, kind, payload, deadline):
+        self.kind = kind
+        self.payload = payload
+        self.deadline = deadline
+        self.future = concurrent.futures.Future()
+
+
+class InferenceServer:
+    """
+    Worker asyncio in-process (daemon thread) yang mem-batch request inference.
+
+    `predictor` / `recommender` boleh objek langsung atau HotSnapshot;
+    snapshot aktif (`.current`) dibaca sekali per batch, jadi reload data tetap terpakai.
+    """
+
+    def __init__(self, predictor=None, recommender=None, window_ms=3.0, max_batch=256,
+                 max_queue=1024, default_timeout_ms=250, recommend_workers=4):
+        self.predictor = predictor
+        self.recommender = recommender
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self.default_timeout_ms = default_timeout_ms
+        self.recommend_workers = recommend_workers
+
+        self._loop = None
+        self._recommend_pool = None
+        self._queue = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+        self.batches = 0
+        self.processed = 0
+        self.rejected = 0
+        self.expired = 0
+        self.max_batch_seen = 0
+
+    # --- LIFECYCLE ---
+    def start(self):
+        """Jalankan event loop di daemon thread (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._ready.clear()
+            self._recommend_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.recommend_workers, thread_name_prefix="inference-recommend")
+            self._thread = threading.Thread(target=self._run_loop, name="inference-server", daemon=True)
+            self._thread.start()
+            self._ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, None)
+            self._thread.join()
+        if self._recommend_pool is not None:
+            self._recommend_pool.shutdown(wait=True)
+        self._recommend_pool = None
+        self._thread = None
+        self._loop = None
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        self._ready.set()
+        try:
+            self._loop.run_until_complete(self._serve())
+        finally:
+            self._loop.close()
+
+    # --- SISI CLIENT (thread mana pun) ---
+    def submit(self, kind, payload, timeout_ms=None):
+        """
+        Masukkan request ('predict' atau 'recommend') ke antrian.
+        Return concurrent.futures.Future. Raise ServerBusy jika antrian penuh.
+        """
+        if self._loop is None:
+            raise RuntimeError("InferenceServer belum di-start")
+        with self._lock:
+            if self._in_flight >= self.max_queue:
+                self.rejected += 1
+                raise ServerBusy(f"{self._in_flight} request masih antri")
+            self._in_flight += 1
+
+        timeout_ms = self.default_timeout_ms if timeout_ms is None else timeout_ms
+        request = _Request(kind, payload, time.monotonic() + timeout_ms / 1000)
+        request.future.add_done_callback(self._release)
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, request)
+        return request.future
+
+    def _release(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+
+    # --- SISI WORKER (event loop) ---
+    async def _serve(self):
+        while True:
+            first = await self._queue.get()
+            if first is None:
+                break
+            # Window micro-batch: tunggu sebentar agar request dari sesi lain ikut terkumpul
+            if self.window_ms > 0:
+                await asyncio.sleep(self.window_ms / 1000)
+            batch = [first]
+            stopping = False
+            while len(batch) < self.max_batch and not self._queue.empty():
+                request = self._queue.get_nowait()
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+            self._execute(batch)
+            if stopping:
+                break
+
+    def _execute(self, batch):
+        now = time.monotonic()
+        live = []
+        for request in batch:
+            if not request.future.set_running_or_notify_cancel():
+                continue  # pemanggil sudah menyerah
+            if request.deadline < now:
+                self.expired += 1
+                request.future.set_exception(DeadlineExceeded("deadline habis di antrian"))
+                continue
+            live.append(request)
+
+        self.batches += 1
+        self.processed += len(live)
+        self.max_batch_seen = max(self.max_batch_seen, len(live))
+
+        # Rekomendasi dilempar ke thread pool dulu agar berjalan bersamaan dengan batch prediksi
+        for request in live:
+            if request.kind == 'recommend':
+                self._loop.run_in_executor(self._recommend_pool, self._run_recommendation, request)
+            elif request.kind != 'predict':
+                request.future.set_exception(ValueError(f"Jenis request tidak dikenal: {request.kind}"))
+        predictions = [r for r in live if r.kind == 'predict']
+        if predictions:
+            self._run_predictions(predictions)
+
+    def _run_predictions(self, requests):
+        predictor = _current(self.predictor)
+        try:
+            if predictor is None:
+                raise RuntimeError("Predictor tidak tersedia")
+            probs = predictor.predict_win_rate_many([r.payload for r in requests])
+        except Exception as e:
+            for request in requests:
+                request.future.set_exception(e)
+            return
+        for request, prob in zip(requests, probs):
+            request.future.set_result(prob)
+
+    def _run_recommendation(self, request):
+        """Dijalankan di thread pool rekomendasi; hasil/error langsung ke Future pemanggil."""
+        method, args, kwargs = request.payload
+        try:
+            if request.deadline < time.monotonic():
+                with self._lock:
+                    self.expired += 1
+                raise DeadlineExceeded("deadline habis di antrian rekomendasi")
+            recommender = _current(self.recommender)
+            if recommender is None:
+                raise RuntimeError("Recommender tidak tersedia")
+            if method not in RECOMMEND_METHODS:
+                raise ValueError(f"Method rekomendasi tidak dikenal: {method}")
+            request.future.set_result(getattr(recommender, method)(*args, **kwargs))
+        except Exception as e:
+            request.future.set_exception(e)
+
+    def stats(self):
+        with self._lock:
+            in_flight = self._in_flight
+        return {
+            'batches': self.batches,
+            'processed': self.processed,
+            'avg_batch': self.processed / self.batches if self.batches else 0.0,
+            'max_batch': self.max_batch_seen,
+            'rejected': self.rejected,
+            'expired': self.expired,
+            'in_flight': in_flight,
+        }
+
+
+class InferenceClient:
+    """Client sinkron untuk InferenceServer (dipanggil dari script Streamlit / thread load test)."""
+
+    def __init__(self, server, timeout_ms=None):
+        self.server = server
+        self.timeout_ms = timeout_ms if timeout_ms is not None else server.default_timeout_ms
+
+    def predict_win_rate(self, team_left, team_right, timeout_ms=None):
+        return self._call('predict', (list(team_left), list(team_right)), timeout_ms)
+
+    def recommend(self, method, *args, timeout_ms=None, **kwargs):
+        return self._call('recommend', (method, args, kwargs), timeout_ms)
+
+    def _call(self, kind, payload, timeout_ms):
+        timeout_ms = self.timeout_ms if timeout_ms is None else timeout_ms
+        future = self.server.submit(kind, payload, timeout_ms)
+        try:
+            return future.result(timeout=timeout_ms / 1000)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise DeadlineExceeded(f"tidak ada hasil dalam {timeout_ms} ms")
+
+
+class LocalClient:
+    """
+    Stand-in tanpa server dengan interface yang sama: memanggil predictor/recommender langsung.
+    Dipakai sebagai baseline load test dan fallback jika server dimatikan (window 0).
+    """
+
+    def __init__(self, predictor=None, recommender=None):
+        self.predictor = predictor
+        self.recommender = recommender
+
+    def predict_win_rate(self, team_left, team_right, timeout_ms=None):
+        return _current(self.predictor).predict_win_rate(team_left, team_right)
+
+    def recommend(self, method, *args, timeout_ms=None, **kwargs):
+        if method not in RECOMMEND_METHODS:
+            raise ValueError(f"Method rekomendasi tidak dikenal: {method}")
+        return getattr(_current(self.recommender), method)(*args, **kwargs)
+
+
+def _current(source):
+    """Objek langsung atau snapshot aktif HotSnapshot."""
+    return getattr(source, 'current', source)
+
+
+# --- LOAD TEST OFFLINE ---
+def load_test(client, drafts, clients=16, requests=2000, recommend_ratio=0.3, seed=0):
+    """
+    `clients` thread menembakkan total `requests` panggilan (campuran predict / recommend)
+    ke client. Return ringkasan latency (ms), throughput, dan jumlah error per jenis.
+    """
+    per_client = [requests // clients + (1 if i < requests % clients else 0) for i in range(clients)]
+    latencies, errors = [], {}
+    lock = threading.Lock()
+    start_gate = threading.Barrier(clients + 1)
+
+    def worker(idx, n):
+        rnd = random.Random(seed + idx)
+        own_lat, own_err = [], {}
+        start_gate.wait()
+        for _ in range(n):
+            draft = rnd.choice(drafts)
+            started = time.perf_counter_ns()
+            try:
+                if rnd.random() < recommend_ratio:
+                    client.recommend('recommend_dynamic_pick', draft['my_team'], draft['enemy_team'],
+                                     draft['banned'], draft['username'])
+                else:
+                    client.predict_win_rate(draft['my_team'], draft['enemy_team'])
+                own_lat.append(time.perf_counter_ns() - started)
+            except Exception as e:
+                own_err[type(e).__name__] = own_err.get(type(e).__name__, 0) + 1
+        with lock:
+            latencies.extend(own_lat)
+            for name, count in own_err.items():
+                errors[name] = errors.get(name, 0) + count
+
+    threads = [threading.Thread(target=worker, args=(i, n)) for i, n in enumerate(per_client)]
+    for t in threads:
+        t.start()
+    start_gate.wait()
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    total = time.perf_counter() - started
+
+    lat_ms = np.array(latencies, dtype=float) / 1e6
+    return {
+        'ok': len(latencies),
+        'errors': errors,
+        'throughput_per_s': len(latencies) / total if total > 0 else 0.0,
+        'p50_ms': float(np.percentile(lat_ms, 50)) if lat_ms.size else None,
+        'p95_ms': float(np.percentile(lat_ms, 95)) if lat_ms.size else None,
+        'p99_ms': float(np.percentile(lat_ms, 99)) if lat_ms.size else None,
+    }
+
+
+def main(argv=None):
+    from source.ml.benchmark import load_local_fixtures, synthetic_drafts, DATA_DIR
+    from source.ml.recommender import DraftRecommender
+    from source.ml.predictor import DraftPredictor, MODEL_PATH
+
+    parser = argparse.ArgumentParser(description="Load test micro-batching inference server (fixture lokal).")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="Folder parquet bronze lokal")
+    parser.add_argument('--model-path', default=MODEL_PATH)
+    parser.add_argument('--clients', type=int, default=16, help="Jumlah thread pemanggil paralel")
+    parser.add_argument('--requests', type=int, default=2000, help="Total request")
+    parser.add_argument('--drafts', type=int, default=2000, help="Jumlah state draft acak")
+    parser.add_argument('--recommend-ratio', type=float, default=0.3, help="Porsi request rekomendasi")
+    parser.add_argument('--window-ms', type=float, default=3.0)
+    parser.add_argument('--max-batch', type=int, default=256)
+    parser.add_argument('--max-queue', type=int, default=1024)
+    parser.add_argument('--timeout-ms', type=float, default=250)
+    parser.add_argument('--direct', action='store_true', help="Pakai LocalClient (tanpa server) sebagai baseline")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    stats, counters, user_perf, synergy = load_local_fixtures(args.data_dir, seed=args.seed)
+    recommender = DraftRecommender.from_frames(stats, counters, user_perf, synergy)
+    predictor = DraftPredictor.from_frames(stats, counters, model_path=args.model_path)
+    drafts = [d for d in synthetic_drafts(recommender.df_stats['hero_name'].tolist(), args.drafts, seed=args.seed + 1)
+              if d['my_team'] and d['enemy_team']]
+
+    server = None
+    if args.direct:
+        client = LocalClient(predictor, recommender)
+    else:
+        server = InferenceServer(predictor, recommender, window_ms=args.window_ms, max_batch=args.max_batch,
+                                 max_queue=args.max_queue, default_timeout_ms=args.timeout_ms).start()
+        client = InferenceClient(server)
+
+    mode = 'direct' if args.direct else f"server window={args.window_ms}ms"
+    print(f"[INFO] Load test {mode}: {args.clients} client, {args.requests} request, {len(drafts)} state")
+    result = load_test(client, drafts, args.clients, args.requests, args.recommend_ratio, args.seed)
+    print(f"ok={result['ok']} errors={result['errors']} throughput={result['throughput_per_s']:.0f}/s "
+          f"p50={result['p50_ms']:.2f}ms p95={result['p95_ms']:.2f}ms p99={result['p99_ms']:.2f}ms")
+    if server is not None:
+        print(f"[INFO] Server stats: {server.stats()}")
+        server.stop()
+    print(f"[INFO] Cache predictor: {predictor.cache_stats()}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
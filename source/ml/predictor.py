@@ -1,4 +1,6 @@
 import pickle
+import itertools
+import json
 import pandas as pd
 import numpy as np
 import os
@@ -8,24 +10,63 @@ import sys
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 sys.path.append(BASE_DIR)
 
-from source.utils.minio_helper import read_df_from_minio
+from source.utils.minio_helper import read_df_from_minio, get_object_etag
+from source.utils.lane_helper import lane_masks, is_lane_complete, lanes_complete_many
+from source.ml.tree_model import TreeEnsemble, native_model_path, native_model_json
+from source.ml.shared_snapshot import SharedSnapshot
+from source.ml.recommendation_cache import RecommendationCache
+from source.ml.draft_state import DraftState
+from source.utils.helper_bronze import normalize_hero_name
+from source.utils.hero_registry import frame_hero_ids, hero_keys
 
 BUCKET_NAME = "mlbb-lake"
 MODEL_PATH = os.path.join(BASE_DIR, "model_draft_mlbb.pkl")
+NATIVE_MODEL_PATH = native_model_path(MODEL_PATH)
 
 GOLD_LEADERBOARD = "gold/hero_leaderboard.parquet"
 GOLD_COUNTER = "gold/hero_counter_lookup.parquet"
+SNAPSHOT_SOURCES = [GOLD_LEADERBOARD, GOLD_COUNTER]
+
+# Versi data predictor (unik per proses), dipakai sebagai bagian key cache pemanggil
+_DATA_VERSIONS = itertools.count(1)
+
+# Jumlah matchup (tak berurut) yang disimpan di cache predict_win_rate
+MATCHUP_CACHE_SIZE = 8192
+
+# Array hasil _prepare_data yang ikut snapshot shared / serving bundle
+SHARED_ARRAYS = ['hero_known', 'hero_win_rate', 'hero_tier', 'hero_lanes', 'counter_matrix']
+
+
+def load_model(model_path=MODEL_PATH):
+    """
+    Return (model, feature_names, model_version).
+    Booster native JSON di samping .pkl (hasil export training) diutamakan:
+    di-load dalam milidetik dan dievaluasi dengan TreeEnsemble tanpa sklearn.
+    Artifact pickle hanya dipakai jika file native belum ada.
+    """
+    native_path = native_model_path(model_path)
+    if os.path.exists(native_path):
+        model = TreeEnsemble.load(native_path)
+        if model.feature_names:
+            return model, model.feature_names, _file_version(native_path)
+        print(f"[WARNING] {native_path} tanpa feature_names, fallback ke pickle")
+
+    if not os.path.exists(model_path):
+        raise FileNotFoundError("Model V3 tidak ditemukan. Jalankan train model dulu.")
+    with open(model_path, "rb") as f:
+        artifact = pickle.load(f)
+    return artifact['model'], artifact['model_columns'], _file_version(model_path)
+
+
+def _file_version(path):
+    """Tanda versi file model: nama + mtime + ukuran (berubah setiap kali model dilatih ulang)."""
+    stat = os.stat(path)
+    return f"{os.path.basename(path)}:{stat.st_mtime_ns}-{stat.st_size}"
 
 
 class DraftPredictor:
     def __init__(self):
-        if not os.path.exists(MODEL_PATH):
-            raise FileNotFoundError("Model V3 tidak ditemukan. Jalankan train model dulu.")
-
-        with open(MODEL_PATH, "rb") as f:
-            artifact = pickle.load(f)
-            self.model = artifact['model']
-            self.feature_names = artifact['model_columns']
+        self.model, self.feature_names, self.model_version = load_model(MODEL_PATH)
 
         # Load Gold Data
         self.hero_stats = read_df_from_minio(BUCKET_NAME, GOLD_LEADERBOARD, file_format="parquet")
@@ -34,58 +75,173 @@ class DraftPredictor:
         if self.hero_stats is None or self.counter_lookup is None:
             raise RuntimeError("Gold data tidak lengkap")
 
+        self._prepare_data()
+
+    @classmethod
+    def from_frames(cls, hero_stats, counter_lookup, model_path=MODEL_PATH):
+        """Bangun predictor dari DataFrame Gold yang sudah ada (tanpa MinIO), mis. fixture lokal."""
+        self = cls.__new__(cls)
+        self.model, self.feature_names, self.model_version = load_model(model_path)
+        self.hero_stats = hero_stats.copy()
+        self.counter_lookup = counter_lookup.copy()
+        self._prepare_data()
+        return self
+
+    @classmethod
+    def from_shared(cls, snapshot):
+        """
+        Cold start dari serving bundle / snapshot shared (path atau SharedSnapshot):
+        array fitur zero-copy dari mmap dan model native dari bundle, tanpa MinIO, parquet, maupun pickle.
+        """
+        if not isinstance(snapshot, SharedSnapshot):
+            snapshot = SharedSnapshot(snapshot)
+        meta = snapshot.meta['predictor']
+
+        self = cls.__new__(cls)
+        self.hero_stats = None
+        self.counter_lookup = None
+        self.model = TreeEnsemble(json.loads(snapshot.arrays['pred.model'].tobytes().decode('utf-8')))
+        self.feature_names = meta['feature_names']
+        self.model_version = meta['model_version']
+        self.hero_index = dict(meta['hero_index'])
+        self.hero_names = meta['hero_names']
+        for name in SHARED_ARRAYS:
+            setattr(self, name, snapshot.arrays[f"pred.{name}"])
+        self.data_version = next(_DATA_VERSIONS)
+        self.cache = RecommendationCache(max_size=MATCHUP_CACHE_SIZE, ttl_seconds=None)
+        return self
+
+    def shared_payload(self):
+        """(arrays, meta) untuk snapshot shared: array berawalan 'pred.' + model native sebagai bytes JSON."""
+        arrays = {f"pred.{name}": getattr(self, name) for name in SHARED_ARRAYS}
+        model_bytes = json.dumps(native_model_json(self.model)).encode('utf-8')
+        arrays['pred.model'] = np.frombuffer(model_bytes, dtype=np.uint8)
+        meta = {
+            'hero_index': list(self.hero_index.items()),
+            'hero_names': list(self.hero_names),
+            'feature_names': list(self.feature_names),
+            'model_version': self.model_version,
+        }
+        return arrays, {'predictor': meta}
+
+    @staticmethod
+    def source_signature():
+        """ETag gold sumber + tanda file model lokal (mtime, size) untuk HotSnapshot."""
+        signature = {path: get_object_etag(BUCKET_NAME, path) for path in SNAPSHOT_SOURCES}
+        for path in (MODEL_PATH, NATIVE_MODEL_PATH):
+            if os.path.exists(path):
+                signature[path] = _file_version(path)
+        if MODEL_PATH not in signature and NATIVE_MODEL_PATH not in signature:
+            signature[MODEL_PATH] = None
+        return signature
+
     def _normalize(self, name):
-        return str(name).lower().replace(" ", "").replace("-", "")
+        return normalize_hero_name(str(name))
+
+    def _prepare_data(self):
+        """
+        Array fitur sejajar hero index + matrix counter dense, dibangun sekali saat init.
+        Jika gold membawa hero_id registry (hero_id, Target_ID/Counter_ID), hero index = hero_id.
+        Data lama tanpa id: hero dari hero_stats mendapat index lebih dulu (baris pertama
+        per nama), hero yang hanya ada di counter_lookup ditaruh setelahnya. Setiap array
+        punya satu slot kosong di akhir sehingga index -1 (padding tim parsial)
+        otomatis bernilai 0 / tidak dikenal.
+        """
+        # Key kanonik (gold lama bisa berisi 'yu zhong' / 'x.borg' dari normalizer lama)
+        stats = self.hero_stats.dropna(subset=['hero_name_normalized'])
+        stats = stats.assign(hero_name_normalized=hero_keys(stats['hero_name_normalized']).to_numpy()).drop_duplicates(
+            subset=['hero_name_normalized'], keep='first')
+        pairs = self.counter_lookup.dropna(subset=['Counter_Name', 'Target_Name'])
+        pairs = pairs.assign(Counter_Name=hero_keys(pairs['Counter_Name']).to_numpy(),
+                             Target_Name=hero_keys(pairs['Target_Name']).to_numpy())
+
+        self.hero_index = {}
+        stat_ids = frame_hero_ids(stats)
+        pair_ids = [frame_hero_ids(pairs, col) for col in ('Counter_ID', 'Target_ID')]
+        if stat_ids is not None and all(ids is not None for ids in pair_ids):
+            for key, hero_id in zip(stats['hero_name_normalized'], stat_ids.tolist()):
+                self.hero_index.setdefault(key, hero_id)
+            for key_col, ids in zip(('Counter_Name', 'Target_Name'), pair_ids):
+                for key, hero_id in zip(pairs[key_col], ids.tolist()):
+                    self.hero_index.setdefault(key, hero_id)
+        else:
+            for key in stats['hero_name_normalized']:
+                self.hero_index.setdefault(key, len(self.hero_index))
+            for key in pd.unique(pairs[['Counter_Name', 'Target_Name']].values.ravel()):
+                self.hero_index.setdefault(key, len(self.hero_index))
+        stat_idx = stats['hero_name_normalized'].map(self.hero_index).to_numpy(dtype=np.intp)
+        n_heroes = max(self.hero_index.values(), default=-1) + 2  # + slot padding untuk index -1
+
+        # Statistik per hero (hanya hero_stats; sisanya ditandai tidak dikenal)
+        self.hero_known = np.zeros(n_heroes, dtype=bool)
+        self.hero_known[stat_idx] = True
+        self.hero_win_rate = np.zeros(n_heroes)
+        self.hero_win_rate[stat_idx] = stats['win_rate'].to_numpy(dtype=float)
+        self.hero_tier = np.zeros(n_heroes)
+        self.hero_tier[stat_idx] = stats['tier_score'].to_numpy(dtype=float)
+        self.hero_lanes = np.zeros(n_heroes, dtype=np.uint8)
+        if 'lane' in stats.columns:
+            self.hero_lanes[stat_idx] = lane_masks(stats['lane'])
+
+        # counter_matrix[h, e] = skor hero h meng-counter hero e (pasangan duplikat: baris pertama)
+        self.counter_matrix = np.zeros((n_heroes, n_heroes))
+        pairs = pairs.drop_duplicates(subset=['Counter_Name', 'Target_Name'], keep='first')
+        c_idx = pairs['Counter_Name'].map(self.hero_index).to_numpy(dtype=np.intp)
+        t_idx = pairs['Target_Name'].map(self.hero_index).to_numpy(dtype=np.intp)
+        self.counter_matrix[c_idx, t_idx] = pairs['Score'].to_numpy(dtype=float)
+
+        # Nama tampilan hero (untuk ranking kandidat) sejajar hero index, None untuk hero tanpa statistik
+        name_col = 'hero_name_raw' if 'hero_name_raw' in stats.columns else 'hero_name_normalized'
+        self.hero_names = [None] * (n_heroes - 1)
+        for idx, name in zip(stat_idx.tolist(), stats[name_col]):
+            self.hero_names[idx] = name
+        self.data_version = next(_DATA_VERSIONS)
 
-    def _get_hero_row(self, hero):
-        key = self._normalize(hero)
-        row = self.hero_stats[self.hero_stats['hero_name_normalized'] == key]
-        return row.iloc[0] if not row.empty else None
+        # Memo predict_win_rate per matchup; terikat ke data snapshot ini (objek baru saat reload)
+        self.cache = RecommendationCache(max_size=MATCHUP_CACHE_SIZE, ttl_seconds=None)
 
-    def _calc_team_stats(self, heroes):
-        win_rates = []
-        meta_scores = []
-        roles = []
+    def encode_teams(self, teams, team_size=5):
+        """List tim (list nama hero) -> array hero index (N x team_size), -1 untuk slot kosong/tidak dikenal."""
+        encoded = np.full((len(teams), team_size), -1, dtype=np.intp)
+        for row, heroes in enumerate(teams):
+            idx = self._team_index(heroes)[:team_size]
+            encoded[row, :idx.size] = idx
+        return encoded
 
-        for h in heroes:
-            row = self._get_hero_row(h)
-            if row is not None:
-                win_rates.append(row['win_rate'])
-                meta_scores.append(row['tier_score'])
-                roles.append(row['role'])
+    def draft_state(self, my_team=None, enemy_team=None, banned_heroes=None):
+        """DraftState (bitset per hero index predictor) dari list nama hero."""
+        return DraftState.from_indices(len(self.hero_names), self._team_index(my_team or []),
+                                       self._team_index(enemy_team or []), self._team_index(banned_heroes or []))
 
-        avg_win_rate = np.mean(win_rates) if win_rates else 0
-        avg_meta = np.mean(meta_scores) if meta_scores else 0
+    def _team_index(self, heroes):
+        """Hero index tiap hero tim (hero tidak dikenal dibuang)."""
+        idx = [self.hero_index.get(self._normalize(h)) for h in heroes]
+        return np.array([i for i in idx if i is not None], dtype=np.intp)
 
-        has_front = any(r in ['Tank', 'Fighter', 'Support'] for r in roles)
-        has_damage = any(r in ['Marksman', 'Mage', 'Assassin'] for r in roles)
-        role_balance = 1 if (has_front and has_damage) else 0
+    def _calc_team_stats(self, team_idx):
+        known = team_idx[self.hero_known[team_idx]]
+
+        avg_win_rate = self.hero_win_rate[known].mean() if known.size else 0
+        avg_meta = self.hero_tier[known].mean() if known.size else 0
+
+        # Role balance: semua hero masih bisa ditempatkan di lane berbeda (assignment 5 lane valid)
+        role_balance = is_lane_complete(self.hero_lanes[known])
 
         return avg_win_rate, avg_meta, role_balance
 
-    def _calc_counter_score(self, team, enemy):
-        score = 0
-        for h in team:
-            for e in enemy:
-                h_n = self._normalize(h)
-                e_n = self._normalize(e)
-                row = self.counter_lookup[
-                    (self.counter_lookup['Counter_Name'] == h_n) &
-                    (self.counter_lookup['Target_Name'] == e_n)
-                ]
-                if not row.empty:
-                    score += row['Score'].iloc[0]
-        return score
+    def _calc_counter_score(self, team_idx, enemy_idx):
+        return self.counter_matrix[team_idx][:, enemy_idx].sum()
 
-    def predict_win_rate(self, team_left, team_right):
-        # if len(team_left) != 5 or len(team_right) != 5:
-        #     raise ValueError("Setiap tim harus terdiri dari 5 hero")
+    def build_features(self, team_left, team_right):
+        """Baris fitur model (urut self.feature_names) sebagai array numpy 1 x F."""
+        return self._features(self._team_index(team_left), self._team_index(team_right))
 
-        left_wr, left_meta, left_role = self._calc_team_stats(team_left)
-        right_wr, right_meta, right_role = self._calc_team_stats(team_right)
+    def _features(self, left_idx, right_idx):
+        left_wr, left_meta, left_role = self._calc_team_stats(left_idx)
+        right_wr, right_meta, right_role = self._calc_team_stats(right_idx)
 
-        counter_left = self._calc_counter_score(team_left, team_right)
-        counter_right = self._calc_counter_score(team_right, team_left)
+        counter_left = self._calc_counter_score(left_idx, right_idx)
+        counter_right = self._calc_counter_score(right_idx, left_idx)
 
         input_data = {
             'diff_team_strength': 0.0,  # default netral
@@ -98,12 +254,173 @@ class DraftPredictor:
             'is_role_balanced_left': left_role,
             'is_role_balanced_right': right_role
         }
+        return np.array([[input_data[name] for name in self.feature_names]], dtype=float)
+
+    def build_features_many(self, left_idx, right_idx):
+        """
+        Matrix fitur (N x F) untuk banyak matchup sekaligus.
+        left_idx/right_idx: array hero index (N x K), -1 = slot kosong.
+        """
+        left_wr, left_meta, left_role = self._team_stats_many(left_idx)
+        right_wr, right_meta, right_role = self._team_stats_many(right_idx)
+
+        # Gather (N, K, K) pasangan hero; padding -1 jatuh ke baris/kolom nol matrix
+        counter_left = self.counter_matrix[left_idx[:, :, None], right_idx[:, None, :]].sum(axis=(1, 2))
+        counter_right = self.counter_matrix[right_idx[:, :, None], left_idx[:, None, :]].sum(axis=(1, 2))
+
+        columns = {
+            'diff_team_strength': np.zeros(len(left_idx)),  # default netral
+            'diff_counter': counter_left - counter_right,
+            'diff_meta': left_meta - right_meta,
+            'diff_role_balance': left_role - right_role,
+            'diff_win_rate': left_wr - right_wr,
+            'avg_meta_score_team_left': left_meta,
+            'avg_meta_score_team_right': right_meta,
+            'is_role_balanced_left': left_role,
+            'is_role_balanced_right': right_role
+        }
+        return np.column_stack([columns[name] for name in self.feature_names]).astype(float)
+
+    def _team_stats_many(self, team_idx):
+        known = self.hero_known[team_idx]
+        count = known.sum(axis=1)
+        safe = np.maximum(count, 1)
+        avg_win_rate = np.where(count > 0, self.hero_win_rate[team_idx].sum(axis=1) / safe, 0.0)
+        avg_meta = np.where(count > 0, self.hero_tier[team_idx].sum(axis=1) / safe, 0.0)
+        role_balance = lanes_complete_many(self.hero_lanes[team_idx])
+        return avg_win_rate, avg_meta, role_balance
+
+    def predict_many(self, left_teams, right_teams, batch_size=65536):
+        """
+        Win probability tim kiri untuk banyak matchup dalam satu panggilan.
+        left_teams/right_teams: array hero index (N x K, -1 = slot kosong, lihat encode_teams)
+        atau list tim berisi nama hero. Tim parsial didukung.
+        Return array probabilitas (N,).
+        """
+        left_idx, right_idx = self._as_team_index(left_teams), self._as_team_index(right_teams)
+        if len(left_idx) != len(right_idx):
+            raise ValueError("Jumlah tim kiri dan kanan harus sama")
+        if len(left_idx) == 0:
+            return np.zeros(0)
+
+        probs = []
+        for start in range(0, len(left_idx), batch_size):
+            stop = start + batch_size
+            features = self.build_features_many(left_idx[start:stop], right_idx[start:stop])
+            probs.append(self.model.predict_proba(features)[:, 1])
+        return np.concatenate(probs)
+
+    def _as_team_index(self, teams):
+        if isinstance(teams, np.ndarray) and np.issubdtype(teams.dtype, np.integer):
+            return np.atleast_2d(teams).astype(np.intp, copy=False)
+        return self.encode_teams(teams)
+
+    def marginal_win_probs(self, my_team, enemy_team, candidates):
+        """
+        Win probability saat ini dan win probability jika tiap kandidat (nama hero)
+        diambil di slot ally berikutnya, dihitung dalam satu batch predict_many.
+        Return (base_prob, array prob sejajar `candidates`).
+        """
+        cand_idx = np.array([self.hero_index.get(self._normalize(h), -1) for h in candidates], dtype=np.intp)
+        return self._marginal_win_probs(self._team_index(my_team), self._team_index(enemy_team), cand_idx)
+
+    def _marginal_win_probs(self, base_idx, enemy_idx, cand_idx):
+        # Baris 0 = draft saat ini, baris 1.. = draft + satu kandidat
+        left = np.full((cand_idx.size + 1, base_idx.size + 1), -1, dtype=np.intp)
+        left[:, :base_idx.size] = base_idx
+        left[1:, -1] = cand_idx
+        right = np.broadcast_to(enemy_idx, (cand_idx.size + 1, enemy_idx.size))
+
+        probs = self.predict_many(left, right)
+        return float(probs[0]), probs[1:]
+
+    def rank_candidates(self, my_team, enemy_team, banned_heroes=None, top_k=None):
+        """
+        Ranking semua hero yang masih tersedia berdasarkan kenaikan win probability
+        (delta vs draft saat ini) jika diambil di slot ally berikutnya.
+        Return list dict {'hero', 'win_prob', 'delta'} urut delta menurun.
+        """
+        base_idx, enemy_idx = self._team_index(my_team or []), self._team_index(enemy_team or [])
+        state = DraftState.from_indices(len(self.hero_names), base_idx.tolist(), enemy_idx.tolist(),
+                                        self._team_index(banned_heroes or []).tolist())
+        cand_idx = np.flatnonzero(state.available_mask() & self.hero_known[:len(self.hero_names)])
+        if cand_idx.size == 0:
+            return []
+
+        base, probs = self._marginal_win_probs(base_idx, enemy_idx, cand_idx)
+        delta = probs - base
+        order = np.argsort(-delta, kind='stable')[:top_k]
+        return [{'hero': self.hero_names[cand_idx[i]], 'win_prob': float(probs[i]), 'delta': float(delta[i])}
+                for i in order]
+
+    def predict_win_rate(self, team_left, team_right):
+        """
+        Win probability tim kiri (draft parsial didukung), di-memo per matchup.
+
+        Key: versi model + tuple hero index terurut kedua tim, dengan pasangan tim
+        dikanonisasi (tim "lebih kecil" dulu). Saat miss, kedua orientasi (A vs B
+        dan B vs A) dihitung dalam satu batch 2 baris dan disimpan bersama, jadi
+        tiap matchup tak berurut cukup dievaluasi sekali. Nilai orientasi balik
+        tetap output model apa adanya, bukan 1 - p (model tidak simetris kiri/kanan).
+        """
+        key, flipped, first, second = self._matchup_key(self._team_index(team_left), self._team_index(team_right))
+        probs = self.cache.get(key)
+        if probs is None:
+            features = np.vstack([self._features(first, second), self._features(second, first)])
+            probs = tuple(self.model.predict_proba(features)[:, 1])
+            self.cache.put(key, probs)
+        return probs[1] if flipped else probs[0]
+
+    def predict_win_rate_many(self, matchups):
+        """
+        Versi batch predict_win_rate untuk list (team_left, team_right), memakai cache matchup yang sama.
+        Semua matchup yang miss (unik, kedua orientasi) dievaluasi dalam satu panggilan model.
+        Return list probabilitas sejajar `matchups`.
+        """
+        results = [None] * len(matchups)
+        pending, missing = [], {}
+        for pos, (team_left, team_right) in enumerate(matchups):
+            key, flipped, first, second = self._matchup_key(self._team_index(team_left), self._team_index(team_right))
+            probs = self.cache.get(key)
+            if probs is None:
+                missing.setdefault(key, (first, second))
+                pending.append((pos, key, flipped))
+            else:
+                results[pos] = probs[1] if flipped else probs[0]
+
+        if missing:
+            # Baris 2i = A vs B, baris 2i+1 = B vs A
+            lefts, rights = [], []
+            for first, second in missing.values():
+                lefts += [first, second]
+                rights += [second, first]
+            probs = self.model.predict_proba(self.build_features_many(_pad_index(lefts), _pad_index(rights)))[:, 1]
+            computed = {}
+            for i, key in enumerate(missing):
+                computed[key] = (probs[2 * i], probs[2 * i + 1])
+                self.cache.put(key, computed[key])
+            for pos, key, flipped in pending:
+                results[pos] = computed[key][1] if flipped else computed[key][0]
+        return results
+
+    def _matchup_key(self, left_idx, right_idx):
+        """Key cache kanonik (tim "lebih kecil" dulu) -> (key, flipped, tim_pertama, tim_kedua)."""
+        left_key, right_key = tuple(sorted(left_idx.tolist())), tuple(sorted(right_idx.tolist()))
+        if right_key < left_key:
+            return (self.model_version, right_key, left_key), True, right_idx, left_idx
+        return (self.model_version, left_key, right_key), False, left_idx, right_idx
+
+    def cache_stats(self):
+        """Statistik cache matchup (hits, misses, hit_rate, size, max_size)."""
+        return self.cache.stats()
 
-        df_input = pd.DataFrame([input_data])
-        df_input = df_input[self.feature_names]
 
-        prob = self.model.predict_proba(df_input)[0][1]
-        return prob
+def _pad_index(teams):
+    """List array hero index (panjang beda-beda) -> array (N x K) dengan padding -1."""
+    padded = np.full((len(teams), max(max(len(t) for t in teams), 1)), -1, dtype=np.intp)
+    for row, idx in enumerate(teams):
+        padded[row, :len(idx)] = idx
+    return padded
 
 
 # TEST MANUAL
@@ -113,5 +430,5 @@ if __name__ == "__main__":
     team_left = ['Ling', 'Nana', 'Tigreal', 'Layla', 'Saber']
     team_right = ['Fanny', 'Gusion', 'Franco', 'Miya', 'Chou']
 
-    prob = predictor.predict(team_left, team_right)
+    prob = predictor.predict_win_rate(team_left, team_right)
     print(f"Probabilitas Menang Tim Kiri: {prob*100:.2f}%")
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class RecommendationCache:
+    """
+    Cache LRU (ukuran terbatas + TTL) untuk hasil rekomendasi.
+    `ttl_seconds=None` berarti entry tidak kedaluwarsa (hanya dibuang oleh LRU).
+
+    Key dibuat oleh pemanggil dari state draft yang sudah dikanonisasi
+    (lihat make_key), jadi rerun Streamlit yang tidak mengubah draft,
+    user lain dengan set ban yang sama, dan opening pick yang sama
+    cukup dihitung sekali. Aman dipakai bersama oleh banyak sesi (lock).
+    """
+
+    def __init__(self, max_size=1024, ttl_seconds=300):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Lock tidak bisa di-pickle (mis. predictor dikirim ke worker proses spawn);
+        # yang dikirim hanya konfigurasinya, isi cache tidak ikut.
+        return {'max_size': self.max_size, 'ttl_seconds': self.ttl_seconds}
+
+    def __setstate__(self, state):
+        # Di proses tujuan cache dibangun ulang dalam keadaan kosong
+        self.__init__(**state)
+
+    @staticmethod
+    def make_key(method, hero_groups, username=None, user_profile=None, data_version=None, ordered_groups=()):
+        """
+        Key kanonik: id hero diurutkan per grup slot (tim kita, musuh, ban),
+        username yang dinormalisasi, hash profil user, dan versi data gold.
+        Grup di `ordered_groups` tidak diurutkan (urutannya mempengaruhi hasil).
+        """
+        groups = tuple(tuple(group) if pos in ordered_groups else tuple(sorted(group))
+                       for pos, group in enumerate(hero_groups))
+        user = str(username).strip().lower() if username is not None else None
+        return (method, groups, user, profile_hash(user_profile), data_version)
+
+    def get(self, key):
+        """Ambil value dari cache, None jika tidak ada atau sudah kedaluwarsa."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds is not None else float('inf')
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Kosongkan cache (dipanggil saat data gold di-reload)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+            }
+
+
+def profile_hash(user_profile):
+    """Hash stabil profil user; urutan isi list tidak berpengaruh ke skor, jadi ikut diurutkan."""
+    if not user_profile:
+        return None
+    canonical = {k: sorted(map(str, v)) if isinstance(v, (list, tuple, set)) else v
+                 for k, v in user_profile.items()}
+    payload = json.dumps(canonical, sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=8).hexdigest()
@@ -1,7 +1,6 @@
 import pandas as pd
 import os
 import sys
-import re
 import numpy as np
 from datetime import datetime
 
@@ -11,12 +10,19 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.
 # Coba import fungsi MinIO. 
 # Jika error (misal dijalankan lokal tanpa minio), pakai dummy agar tidak crash.
 try:
-    from source.utils.minio_helper import read_df_from_minio, upload_df_to_minio
+    from source.utils.minio_helper import read_df_from_minio, upload_df_to_minio, get_object_etag
     MINIO_AVAILABLE = True
 except ImportError:
     MINIO_AVAILABLE = False
     print("[WARNING] MinIO Helper not found. Running in Offline Mode.")
 
+from source.ml.recommendation_cache import RecommendationCache
+from source.ml.shared_snapshot import SharedSnapshot, write_snapshot
+from source.ml.draft_state import DraftState, ALLY, ENEMY, SIDES
+from source.utils.lane_helper import LANE_KEYWORDS, LOWEST_LANE, lane_masks, solve_team
+from source.utils.helper_bronze import normalize_hero_name
+from source.utils.hero_registry import frame_hero_ids
+
 BUCKET_NAME = "mlbb-lake"
 
 # --- KONFIGURASI PATH BARU ---
@@ -31,42 +37,194 @@ RAW_HISTORY_PATH = "raw/user_history/match_history_user.csv"
 GOLD_USER_STATS_PATH = "gold/user_history/user_hero_performance.parquet"
 GOLD_USER_SYNERGY_PATH = "gold/user_history/user_team_synergy.parquet"
 
+# Urutan role standar: (keyword di kolom lane, label rekomendasi); posisi = bit di lane mask
+LANE_ROLES = list(zip(LANE_KEYWORDS, ["Exp Lane", "Gold Lane", "Mid Lane", "Roamer", "Jungler"]))
+
+# Kode alasan rekomendasi. Scoring hanya mencatat kode + argumen numerik,
+# teks baru dirender (REASON_TEMPLATES) untuk baris yang lolos ke hasil akhir.
+(R_OFTEN_BANNED, R_HEAVY_COUNTER, R_FILL_ROLE, R_SIGNATURE_WR, R_OFTEN_USED, R_BAD_HISTORY,
+ R_HARD_COUNTER, R_COUNTER, R_WEAK_VS, R_META, R_GOOD_STATS, R_ROLE_MATCH, R_SIMILAR_STYLE,
+ R_COMFORT, R_SIGNATURE, R_FREQUENT, R_SKILL_ISSUE, R_HISTORY, R_MAIN_ROLE,
+ R_HIGH_SYNERGY, R_BAD_SYNERGY, R_NOT_YOUR_ROLE, R_MODEL_DELTA) = range(23)
+
+REASON_TEMPLATES = {
+    R_OFTEN_BANNED: "⚠️ Sering diban ({:.1f}%)",
+    R_HEAVY_COUNTER: "🛑 Counter berat {}",
+    R_FILL_ROLE: "✅ Isi {}",
+    R_SIGNATURE_WR: "🌟 Hero Andalan (WR {:.0%})",
+    R_OFTEN_USED: "👤 Sering dipakai ({}x) (WR {:.0%})",
+    R_BAD_HISTORY: "📉 Riwayat buruk (WR {:.0%})",
+    R_HARD_COUNTER: "⚔️ Hard Counter {}",
+    R_COUNTER: "🛡️ Counter {}",
+    R_WEAK_VS: "⚠️ Lemah vs {}",
+    R_META: "🔥 Meta (WR {:.1f}%)",
+    R_GOOD_STATS: "📈 Good Stats (WR {:.1f}%)",
+    R_ROLE_MATCH: "✨ Sesuai Role",
+    R_SIMILAR_STYLE: "🎭 Mirip Hero Favorit",
+    R_COMFORT: "❤️ Comfort Pick",
+    R_SIGNATURE: "🌟 Hero Andalan",
+    R_FREQUENT: "👤 Sering dipakai",
+    R_SKILL_ISSUE: "📉 Skill issue",
+    R_HISTORY: "📝 History: {} match",
+    R_MAIN_ROLE: "🎯 Role Utama",
+    R_HIGH_SYNERGY: "🤝 Sinergi Tinggi",
+    R_BAD_SYNERGY: "⚠️ Bad Synergy",
+    R_NOT_YOUR_ROLE: "⚠️ (Bukan Role Anda)",
+    R_MODEL_DELTA: "📊 Model {:+.1%}",
+}
+
+# Bobot komponen model di skor strategis: poin per +1.0 win probability (1% = 3 poin).
+# Belum divalidasi terhadap skala komponen heuristik, jadi blend model opt-in (default mati di app)
+MODEL_DELTA_WEIGHT = 300
+# Delta minimum (absolut) agar alasan model ditampilkan
+MODEL_DELTA_REASON = 0.01
+
+# Object gold yang membentuk satu snapshot recommender (dicek ETag-nya oleh poller)
+SNAPSHOT_SOURCES = [GLOBAL_STATS_PATH, COUNTER_DATA_PATH, GOLD_USER_STATS_PATH, GOLD_USER_SYNERGY_PATH]
+
+# Array hasil _prepare_data yang dibagi lewat snapshot shared memory (publish_shared / from_shared)
+SHARED_ARRAYS = ['row_hero_idx', 'counter_matrix', 'counter_exists', 'lane_masks',
+                 'user_has_stats', 'user_picks', 'user_win_rate', 'synergy_wr', 'synergy_matches']
+
 class DraftRecommender:
     def __init__(self):
         print("--- [INFO] Initializing Draft Recommender (ETL Architecture) ---")
+
+        # Cache hasil rekomendasi (dikosongkan otomatis setiap data gold di-reload)
+        self.cache = RecommendationCache()
+        self.data_version = 0
         
         # 1. Load Data Statistik Global & Counter
         if MINIO_AVAILABLE:
             self.df_stats = read_df_from_minio(BUCKET_NAME, GLOBAL_STATS_PATH, file_format='parquet')
             self.df_counters = read_df_from_minio(BUCKET_NAME, COUNTER_DATA_PATH, file_format='parquet')
-            
-            # 2. Load User Stats dari GOLD Layer
-            self.df_user_perf = read_df_from_minio(BUCKET_NAME, GOLD_USER_STATS_PATH, file_format='parquet')
-            
-            # data sinergi
-            self.df_synergy = read_df_from_minio(BUCKET_NAME, GOLD_USER_SYNERGY_PATH, file_format='parquet')
-            
-            if self.df_user_perf is None or self.df_user_perf.empty:
-                print("[INFO] User Gold data not found. New user or pipeline hasn't run.")
-                self.df_user_perf = pd.DataFrame(columns=['hero_id', 'total_picks', 'win_rate'])
-            else:
-                print(f"[INFO] Loaded User Stats for {len(self.df_user_perf)} heroes from Gold.")
-            
-            if self.df_synergy is None: self.df_synergy = pd.DataFrame()
-            
         else:
             # fallback jika MinIO mati (misal pakai CSV lokal/offline)
             self.df_stats = pd.DataFrame()
             self.df_counters = pd.DataFrame()
-            self.df_user_perf = pd.DataFrame()
+
+        # 2. Load User Stats & Sinergi dari GOLD Layer
+        self._load_user_data()
         
         # 3. (Cleaning & Formatting)
         self._prepare_data()
 
+    @classmethod
+    def from_frames(cls, df_stats, df_counters, df_user_perf=None, df_synergy=None):
+        """
+        Bangun recommender langsung dari DataFrame format Gold (tanpa MinIO),
+        mis. fixture parquet lokal untuk benchmark.
+        """
+        self = cls.__new__(cls)
+        self.cache = RecommendationCache()
+        self.data_version = 0
+        self.df_stats = df_stats.copy() if df_stats is not None else pd.DataFrame()
+        self.df_counters = df_counters.copy() if df_counters is not None else pd.DataFrame()
+        self.df_user_perf = df_user_perf if df_user_perf is not None else pd.DataFrame(columns=['hero_id', 'total_picks', 'win_rate'])
+        self.df_synergy = df_synergy if df_synergy is not None else pd.DataFrame()
+        self._prepare_data()
+        return self
+
+    @classmethod
+    def from_shared(cls, snapshot):
+        """
+        Attach ke snapshot numerik yang dipublish publish_shared (path atau SharedSnapshot).
+        Matrix counter & user adalah view read-only atas mmap (zero-copy, dibagi antar proses);
+        tidak ada akses MinIO maupun decode parquet.
+        """
+        if not isinstance(snapshot, SharedSnapshot):
+            snapshot = SharedSnapshot(snapshot)
+        meta = snapshot.meta['recommender']
+        arrays = {name[len('rec.'):]: array for name, array in snapshot.arrays.items() if name.startswith('rec.')}
+
+        self = cls.__new__(cls)
+        self.cache = RecommendationCache()
+        self.data_version = 0
+        self.shared_version = snapshot.version
+        self.df_stats = _frame_from_shared(meta['stats'], arrays)
+        self.df_counters = pd.DataFrame()
+        self.df_user_perf = pd.DataFrame(columns=['hero_id', 'total_picks', 'win_rate'])
+        self.df_synergy = pd.DataFrame()
+
+        self.hero_index = dict(meta['hero_index'])
+        self.registry_ids = meta.get('registry_ids', False)
+        self.n_heroes = arrays['counter_matrix'].shape[0]
+        self.hero_row = {}
+        for row_pos, key in enumerate(self.df_stats['join_key'] if not self.df_stats.empty else []):
+            self.hero_row.setdefault(key, row_pos)
+        self.user_stats_row = {user: row for user, row in meta['user_stats_row']}
+        self.synergy_row = {user: row for user, row in meta['synergy_row']}
+        for name in SHARED_ARRAYS:
+            setattr(self, name, arrays[name])
+
+        self._build_text_index()
+        self._bump_data_version()
+        return self
+
+    def publish_shared(self, path):
+        """Tulis snapshot numerik recommender ini ke file mmap (lihat shared_snapshot.py). Return versi."""
+        arrays, meta = self.shared_payload()
+        return write_snapshot(path, arrays, meta)
+
+    def shared_payload(self):
+        """(arrays, meta) snapshot numerik: array berawalan 'rec.', meta di key 'recommender'."""
+        stats_meta, stats_arrays = _frame_to_shared(self.df_stats)
+        arrays = {name: getattr(self, name) for name in SHARED_ARRAYS}
+        arrays.update(stats_arrays)
+        meta = {
+            'stats': stats_meta,
+            'hero_index': list(self.hero_index.items()),
+            'registry_ids': self.registry_ids,
+            'user_stats_row': list(self.user_stats_row.items()),
+            'synergy_row': list(self.synergy_row.items()),
+        }
+        return {f"rec.{name}": array for name, array in arrays.items()}, {'recommender': meta}
+
+    @staticmethod
+    def source_signature():
+        """ETag object gold sumber snapshot (untuk HotSnapshot), tanpa membaca isinya."""
+        if not MINIO_AVAILABLE:
+            return {}
+        return {path: get_object_etag(BUCKET_NAME, path) for path in SNAPSHOT_SOURCES}
+
+    def _load_user_data(self):
+        """Membaca statistik user & sinergi dari Gold (dipakai saat init dan reload)."""
+        if not MINIO_AVAILABLE:
+            self.df_user_perf = pd.DataFrame()
+            self.df_synergy = pd.DataFrame()
+            return
+
+        self.df_user_perf = read_df_from_minio(BUCKET_NAME, GOLD_USER_STATS_PATH, file_format='parquet')
+        
+        # data sinergi
+        self.df_synergy = read_df_from_minio(BUCKET_NAME, GOLD_USER_SYNERGY_PATH, file_format='parquet')
+        
+        if self.df_user_perf is None or self.df_user_perf.empty:
+            print("[INFO] User Gold data not found. New user or pipeline hasn't run.")
+            self.df_user_perf = pd.DataFrame(columns=['hero_id', 'total_picks', 'win_rate'])
+        else:
+            print(f"[INFO] Loaded User Stats for {len(self.df_user_perf)} heroes from Gold.")
+        
+        if self.df_synergy is None: self.df_synergy = pd.DataFrame()
+
+    def reload_user_data(self):
+        """
+        Baca ulang Gold user (hasil DAG user-learning) dan bangun ulang index per user.
+        Mengubah objek ini di tempat; untuk aplikasi multi-sesi pakai HotSnapshot.
+        """
+        self._load_user_data()
+        self._build_user_index()
+        self._bump_data_version()
+
+    def _bump_data_version(self):
+        """Tandai data gold berubah: versi naik dan cache rekomendasi dikosongkan."""
+        self.data_version += 1
+        self.cache.clear()
+
     def _normalize_name(self, name):
-        """Membersihkan nama hero untuk pencarian (hapus spasi/simbol, lowercase)."""
+        """Key kanonik nama hero (normalize_hero_name, di-cache per nama), "" untuk nama kosong."""
         if pd.isna(name) or name is None: return ""
-        return re.sub(r'[^a-zA-Z0-9]', '', str(name)).lower()
+        return normalize_hero_name(str(name)) or ""
 
     # MANAJEMEN DATA USER (WRITE RAW -> READ GOLD)
     def save_match_result(self, my_team, enemy_team, result_status, user_hero_played, username):
@@ -111,35 +269,16 @@ class DraftRecommender:
 
     def get_user_hero_stats(self, hero_name, username):
         """
-        Mengambil statistik hero KHUSUS untuk username tertentu.
+        Mengambil statistik hero KHUSUS untuk username tertentu (lookup O(1) via index user).
         """
-        if self.df_user_perf.empty:
+        user_pos = self._user_row(self.user_stats_row, username)
+        hero_idx = self._hero_idx(hero_name)
+        if user_pos is None or hero_idx is None:
             return 0, 0.0
-        
-        hero_clean = self._normalize_name(hero_name)
-        user_clean = str(username).strip().lower()
-        
-        # --- PERBAIKAN: Cek apakah kolom 'username' ada ---
-        if 'username' in self.df_user_perf.columns:
-            # Jika kolom ada, filter berdasarkan User DAN Hero
-            row = self.df_user_perf[
-                (self.df_user_perf['hero_id'] == hero_clean) & 
-                (self.df_user_perf['username'] == user_clean)
-            ]
-        else:
-            # Jika kolom BELUM ada (Data Lama), anggap ini data milik 'adri' (default)
-            # Jadi kalau login sebagai 'adri', dia baca data lama. Kalau user lain, 0.
-            if user_clean == 'adri': 
-                row = self.df_user_perf[self.df_user_perf['hero_id'] == hero_clean]
-            else:
-                return 0, 0.0
-        
-        if not row.empty:
-            picks = int(row.iloc[0]['total_picks'])
-            wr = float(row.iloc[0]['win_rate'])
-            return picks, wr
-            
-        return 0, 0.0
+
+        if not self.user_has_stats[user_pos, hero_idx]:
+            return 0, 0.0
+        return int(self.user_picks[user_pos, hero_idx]), float(self.user_win_rate[user_pos, hero_idx])
 
     # DATA (GLOBAL & COUNTER)
     def _prepare_data(self):
@@ -164,6 +303,9 @@ class DraftRecommender:
             for col in ['win_rate', 'ban_rate']:
                 if col in self.df_stats.columns:
                     self.df_stats[col] = self.df_stats[col].fillna(0.0).astype(float)
+
+            # Index posisional agar baris kandidat bisa langsung dipetakan ke array
+            self.df_stats = self.df_stats.reset_index(drop=True)
         else:
             self.df_stats = pd.DataFrame()
 
@@ -182,444 +324,844 @@ class DraftRecommender:
         else:
             self.df_counters = pd.DataFrame()
 
+        # 3. Hero Index & Counter Matrix (dibangun sekali saat load)
+        self._build_counter_matrix()
+
+        # 4. Index statistik per user (username -> array sejajar hero index)
+        self._build_user_index()
+
+        # 5. Cache kolom teks untuk scoring vektor (role/lane)
+        self._build_text_index()
+
+        # 6. Lane tiap baris df_stats sebagai bitmask 5-bit (lihat LANE_ROLES)
+        if 'lane' in self.df_stats.columns:
+            self.lane_masks = lane_masks(self.df_stats['lane'])
+        else:
+            self.lane_masks = np.zeros(len(self.df_stats), dtype=np.uint8)
+
+        self._bump_data_version()
+
+    def _build_text_index(self):
+        """Token role per baris df_stats + cache mask 'kolom mengandung kata' (dibangun dari df_stats)."""
+        self._contains_cache = {}
+        if not self.df_stats.empty:
+            roles = self.df_stats['role'].astype(str).str.lower().str.replace('/', ',')
+            self._role_tokens = [set(x.strip() for x in r.split(',')) for r in roles]
+        else:
+            self._role_tokens = []
+
+    def _build_counter_matrix(self):
+        """
+        Membangun peta hero -> index dan matrix counter dense (float32, H x H).
+        counter_matrix[t, c] = skor hero c meng-counter hero t,
+        counter_exists[t, c] = True jika pasangan itu ada di data counter.
+
+        Jika data gold membawa hero_id registry (df_stats.hero_id, counter Target_ID/Counter_ID),
+        index hero = hero_id sehingga array langsung di-index id; slot id tanpa hero tidak terpakai.
+        Data lama tanpa id: hero dari df_stats mendapat index lebih dulu (urut baris),
+        hero yang hanya muncul di data counter ditaruh setelahnya.
+        """
+        self.hero_index = {}
+        self.hero_row = {}  # join_key -> baris pertama di df_stats
+        stat_keys = self.df_stats['join_key'].tolist() if not self.df_stats.empty else []
+        has_counters = not self.df_counters.empty and 'target_key' in self.df_counters.columns
+
+        stat_ids = frame_hero_ids(self.df_stats)
+        counter_ids = [frame_hero_ids(self.df_counters, col) for col in ('Target_ID', 'Counter_ID')] if has_counters else []
+        # True jika index hero = hero_id registry (bukan posisi); menentukan cara baca hero_id frame user
+        self.registry_ids = stat_ids is not None and all(ids is not None for ids in counter_ids)
+        if self.registry_ids:
+            for key, hero_id in zip(stat_keys, stat_ids.tolist()):
+                self.hero_index.setdefault(key, hero_id)
+            for key_col, ids in zip(('target_key', 'counter_key'), counter_ids):
+                for key, hero_id in zip(self.df_counters[key_col], ids.tolist()):
+                    self.hero_index.setdefault(key, hero_id)
+        else:
+            for key in stat_keys:
+                self.hero_index.setdefault(key, len(self.hero_index))
+            if has_counters:
+                for key in pd.unique(self.df_counters[['target_key', 'counter_key']].values.ravel()):
+                    self.hero_index.setdefault(key, len(self.hero_index))
+
+        for row_pos, key in enumerate(stat_keys):
+            self.hero_row.setdefault(key, row_pos)
+        # Index hero untuk tiap baris df_stats (dipakai untuk gather kandidat)
+        self.row_hero_idx = np.array([self.hero_index[k] for k in stat_keys], dtype=np.intp)
+
+        self.n_heroes = n_heroes = max(self.hero_index.values(), default=-1) + 1
+        self.counter_matrix = np.zeros((n_heroes, n_heroes), dtype=np.float32)
+        self.counter_exists = np.zeros((n_heroes, n_heroes), dtype=bool)
+
+        if has_counters:
+            # Pasangan duplikat: ambil baris pertama (sama seperti lookup lama)
+            pairs = self.df_counters.drop_duplicates(subset=['target_key', 'counter_key'], keep='first')
+            t_idx = pairs['target_key'].map(self.hero_index).to_numpy(dtype=np.intp)
+            c_idx = pairs['counter_key'].map(self.hero_index).to_numpy(dtype=np.intp)
+            self.counter_matrix[t_idx, c_idx] = pairs['score'].fillna(0.0).to_numpy(dtype=np.float32)
+            self.counter_exists[t_idx, c_idx] = True
+
+    def _hero_idx(self, hero_name):
+        """Index hero di counter matrix, None jika hero tidak dikenal."""
+        if not hero_name: return None
+        return self.hero_index.get(self._normalize_name(hero_name))
+
+    def _canonical_group(self, heroes, keep_order=False):
+        """
+        Pasangan (hero index, nama) dari satu grup slot, diurutkan berdasarkan hero index
+        (kecuali keep_order, untuk grup yang urutannya ikut menentukan teks alasan).
+        Hero yang tidak dikenal dibuang karena tidak mempengaruhi skor apa pun.
+        """
+        pairs = []
+        for hero in (heroes or []):
+            hero_idx = self._hero_idx(hero)
+            if hero_idx is not None:
+                pairs.append((hero_idx, hero))
+        return pairs if keep_order else sorted(pairs)
+
+    def _cached(self, method, hero_groups, username, user_profile, compute, ordered=()):
+        """
+        Jalankan `compute` lewat RecommendationCache. Draft dikanonisasi dulu
+        (urutan hero index per grup) sehingga hasil hanya bergantung pada key.
+        Grup di `ordered` (posisi di hero_groups) tetap memakai urutan pick, karena
+        urutan alasan counter mengikuti urutan hero tersebut.
+        """
+        groups = [self._canonical_group(group, keep_order=pos in ordered) for pos, group in enumerate(hero_groups)]
+        key = RecommendationCache.make_key(
+            method, [[hero_idx for hero_idx, _ in group] for group in groups],
+            username, user_profile, self.data_version, ordered_groups=ordered
+        )
+        result = self.cache.get(key)
+        if result is None:
+            result = compute(*[[hero for _, hero in group] for group in groups])
+            self.cache.put(key, result)
+        return _copy_recs(result)
+
+    def _column_contains(self, column, keyword):
+        """Mask bool per baris df_stats: apakah `keyword` ada di teks kolom (lowercase). Di-memo per load data."""
+        key = (column, keyword)
+        mask = self._contains_cache.get(key)
+        if mask is None:
+            text = self.df_stats[column].astype(str).str.lower()
+            mask = text.str.contains(keyword, regex=False).to_numpy(dtype=bool)
+            self._contains_cache[key] = mask
+        return mask
+
+    def _any_column_contains(self, column, keywords):
+        """OR dari _column_contains untuk beberapa keyword sekaligus."""
+        mask = np.zeros(len(self.df_stats), dtype=bool)
+        for keyword in keywords:
+            mask |= self._column_contains(column, keyword)
+        return mask
+
+    def _role_token_mask(self, token):
+        """Mask bool per baris df_stats: apakah hero punya role `token` (hasil split 'Fighter/Tank')."""
+        key = ('role_token', token)
+        mask = self._contains_cache.get(key)
+        if mask is None:
+            mask = np.array([token in tokens for tokens in self._role_tokens], dtype=bool)
+            self._contains_cache[key] = mask
+        return mask
+
+    def _build_user_index(self):
+        """
+        Membangun index statistik per user dari df_user_perf dan df_synergy.
+        Tiap user mendapat satu baris matrix (U x H) yang sejajar dengan hero index,
+        jadi lookup user cukup satu dict get dan tidak bergantung jumlah user lain.
+        """
+        n_heroes = self.n_heroes
+
+        # 1. Statistik hero user. Data lama (tanpa kolom username) dianggap milik 'adri'
+        perf = self.df_user_perf
+        if perf is not None and not perf.empty and 'username' not in perf.columns:
+            perf = perf.assign(username='adri')
+        (self.user_stats_row, self.user_has_stats,
+         (self.user_picks, self.user_win_rate)) = self._pivot_user_frame(
+            perf, n_heroes, [('total_picks', np.int32), ('win_rate', np.float64)])
+
+        # 2. Sinergi user. Data lama (tanpa kolom username) berlaku untuk semua user (key None)
+        synergy = self.df_synergy
+        if synergy is not None and not synergy.empty:
+            if 'username' not in synergy.columns:
+                synergy = synergy.assign(username=None)
+            else:
+                synergy = synergy[synergy['username'].notna()]
+        (self.synergy_row, _,
+         (self.synergy_wr, self.synergy_matches)) = self._pivot_user_frame(
+            synergy, n_heroes, [('synergy_wr', np.float64), ('matches_together', np.int32)])
+
+    def _pivot_user_frame(self, df, n_heroes, value_cols):
+        """Pivot frame (username, hero_id, nilai...) jadi dict username -> baris & matrix U x H per kolom nilai."""
+        user_row = {}
+        if df is None or df.empty:
+            return user_row, np.zeros((0, n_heroes), dtype=bool), [np.zeros((0, n_heroes), dtype=dt) for _, dt in value_cols]
+
+        hero_pos = self._hero_positions(df)
+        known = df[hero_pos.notna()].assign(_hero_pos=hero_pos[hero_pos.notna()].astype(int))
+        # Duplikat (user, hero): ambil baris pertama, sama seperti lookup lama
+        known = known.drop_duplicates(subset=['username', 'hero_id'], keep='first')
+
+        usernames = pd.unique(df['username'])
+        user_row = {u: i for i, u in enumerate(usernames)}
+        u_pos = known['username'].map(user_row).to_numpy(dtype=np.intp)
+        h_pos = known['_hero_pos'].to_numpy(dtype=np.intp)
+
+        has_row = np.zeros((len(usernames), n_heroes), dtype=bool)
+        has_row[u_pos, h_pos] = True
+        matrices = []
+        for col, dtype in value_cols:
+            matrix = np.zeros((len(usernames), n_heroes), dtype=dtype)
+            matrix[u_pos, h_pos] = known[col].to_numpy(dtype=float).astype(dtype)
+            matrices.append(matrix)
+        return user_row, has_row, matrices
+
+    def _hero_positions(self, df):
+        """
+        Hero tiap baris frame user -> index hero (NaN jika tidak dikenal).
+        Gold user baru berisi hero_id registry (int16) + hero_key; gold lama berisi key nama di hero_id.
+        Id registry hanya dipakai langsung jika index hero juga berbasis registry; kalau index
+        masih posisional (gold hero/counter lama), hero dicocokkan lewat key nama.
+        """
+        ids = pd.to_numeric(df['hero_id'], errors='coerce')
+        numeric = ids.notna().all()
+        if numeric and self.registry_ids:
+            known_ids = set(self.hero_index.values())
+            return ids.where(ids.isin(known_ids))
+        if 'hero_key' in df.columns:
+            return df['hero_key'].map(self.hero_index)
+        if numeric:
+            print("[WARNING] hero_id user berupa id registry tapi data hero/counter belum punya id; statistik user diabaikan.")
+            return pd.Series(np.nan, index=df.index)
+        return df['hero_id'].map(self.hero_index)
+
+    def _user_row(self, row_map, username):
+        """Baris user di matrix statistik; fallback ke key None (data lama lintas user)."""
+        user_clean = str(username).strip().lower()
+        if user_clean in row_map:
+            return row_map[user_clean]
+        return row_map.get(None)
+
+    def _user_perf_vectors(self, username):
+        """Statistik user (total pick, win rate) sebagai array sejajar baris df_stats."""
+        user_pos = self._user_row(self.user_stats_row, username)
+        if user_pos is None:
+            n_rows = len(self.df_stats)
+            return np.zeros(n_rows, dtype=np.int32), np.zeros(n_rows)
+        return self.user_picks[user_pos, self.row_hero_idx], self.user_win_rate[user_pos, self.row_hero_idx]
+
+    def _synergy_vectors(self, username):
+        """Statistik sinergi user (synergy_wr, matches_together) sebagai array sejajar baris df_stats."""
+        user_pos = self._user_row(self.synergy_row, username)
+        if user_pos is None:
+            n_rows = len(self.df_stats)
+            return np.zeros(n_rows), np.zeros(n_rows, dtype=np.int32)
+        return self.synergy_wr[user_pos, self.row_hero_idx], self.synergy_matches[user_pos, self.row_hero_idx]
+
     def get_hero_info(self, hero_name):
          if self.df_stats.empty: return None
-         search_key = self._normalize_name(hero_name)
-         row = self.df_stats[self.df_stats['join_key'] == search_key]
-         return row.iloc[0] if not row.empty else None
+         row_pos = self.hero_row.get(self._normalize_name(hero_name))
+         return self.df_stats.iloc[row_pos] if row_pos is not None else None
+
+    def get_hero_lane_mask(self, hero_name):
+        """Bitmask lane (lihat LANE_ROLES) satu hero, 0 jika hero/lane tidak dikenal."""
+        row_pos = self.hero_row.get(self._normalize_name(hero_name)) if hero_name else None
+        return int(self.lane_masks[row_pos]) if row_pos is not None else 0
+
+    def get_team_open_lanes(self, current_team):
+        """
+        Bitmask lane yang masih terbuka setelah assignment lane terbaik tim
+        (hero flex hanya menutup salah satu lane-nya).
+        """
+        _, open_lanes = solve_team([self.get_hero_lane_mask(hero) for hero in (current_team or [])])
+        return open_lanes
 
     def get_team_missing_roles(self, current_team):
         """Menganalisa role apa yang belum ada di tim."""
-        filled_lanes = []
-        for hero in current_team:
-            if not hero: continue
-            info = self.get_hero_info(hero)
-            if info is not None and 'lane' in info:
-                raw_lane = str(info['lane']).lower()
-                filled_lanes.append(raw_lane)
-        
-        filled_string = " ".join(filled_lanes)
-        needed_roles = []
-        
-        # Logika sederhana cek role standard
-        if "exp" not in filled_string: needed_roles.append("Exp Lane")
-        if "gold" not in filled_string: needed_roles.append("Gold Lane")
-        if "mid" not in filled_string: needed_roles.append("Mid Lane")
-        if "roam" not in filled_string: needed_roles.append("Roamer")
-        if "jung" not in filled_string: needed_roles.append("Jungler")
-        
-        return needed_roles
+        return lanes_to_roles(self.get_team_open_lanes(current_team))
 
     # REKOMENDASI (BAN & PICK)
 
     def recommend_dynamic_ban(self, my_team, enemy_team, banned_heroes):
+        """Rekomendasi Ban: Fokus pada Meta & Counter (hasil di-cache per state draft)."""
+        return self._cached('ban', (my_team, enemy_team, banned_heroes), None, None,
+                            self._recommend_dynamic_ban, ordered=(0,))
+
+    def recommend_dynamic_pick(self, my_team, enemy_team, banned_heroes, username):
+        """Rekomendasi Pick global + performa user (hasil di-cache per state draft & user)."""
+        return self._cached('pick', (my_team, enemy_team, banned_heroes), username, None,
+                            lambda my, enemy, banned: self._recommend_dynamic_pick(my, enemy, banned, username),
+                            ordered=(1,))
+
+    def recommend_personalized(self, my_team, enemy_team, banned_heroes, user_profile, username, predictor=None):
+        """
+        Rekomendasi personal & tim (hasil di-cache per state draft, user & profil).
+        Jika `predictor` (DraftPredictor) diberikan, delta win probability model
+        tiap kandidat ikut menjadi komponen skor strategis.
+        """
+        method = 'personalized' if predictor is None else ('personalized', 'model', predictor.data_version)
+        return self._cached(method, (my_team, enemy_team, banned_heroes), username, user_profile,
+                            lambda my, enemy, banned: self._recommend_personalized(my, enemy, banned, user_profile, username, predictor),
+                            ordered=(1,))
+
+    def draft_state(self, my_team=None, enemy_team=None, banned_heroes=None):
+        """DraftState (bitset per hero index) dari list nama hero; hero tidak dikenal diabaikan."""
+        return DraftState.from_indices(
+            self.n_heroes,
+            [self._hero_idx(h) for h in (my_team or [])],
+            [self._hero_idx(h) for h in (enemy_team or [])],
+            [self._hero_idx(h) for h in (banned_heroes or [])],
+        )
+
+    def _available_rows(self, my_team, enemy_team, banned_heroes):
+        """Posisi baris df_stats yang masih bisa dipilih (belum di-pick/ban)."""
+        return self.draft_state(my_team, enemy_team, banned_heroes).available_rows(self.row_hero_idx)
+
+    def _stat_column(self, column, default=0.0):
+        """Kolom numerik df_stats sebagai array float (default jika kolom tidak ada)."""
+        if column in self.df_stats.columns:
+            return self.df_stats[column].to_numpy(dtype=float)
+        return np.full(len(self.df_stats), default)
+
+    def _recommend_dynamic_ban(self, my_team, enemy_team, banned_heroes):
         """Rekomendasi Ban: Fokus pada Meta & Counter."""
         if self.df_stats.empty: return []
         
         # Filter hero yang sudah tidak tersedia
-        all_unavailable = (my_team or []) + (enemy_team or []) + (banned_heroes or [])
-        unavailable_keys = set([self._normalize_name(h) for h in all_unavailable if h])
-        
-        candidates = self.df_stats[~self.df_stats['join_key'].isin(unavailable_keys)].copy()
-        if candidates.empty: return []
+        rows = self._available_rows(my_team, enemy_team, banned_heroes)
+        if rows.size == 0: return []
 
         # 1. Base Score: Ban Rate Global
-        if 'ban_rate' in candidates.columns:
-            candidates['ban_score'] = candidates['ban_rate'] * 100
-            candidates['reasons'] = candidates['ban_rate'].apply(lambda x: [f"⚠️ Sering diban ({x:.1f}%)"])
-        else:
-            candidates['ban_score'] = 0
-            candidates['reasons'] = [[] for _ in range(len(candidates))]
+        has_ban_rate = 'ban_rate' in self.df_stats.columns
+        ban_rate = self._stat_column('ban_rate')[rows]
+        ban_score = ban_rate * 100
 
         # 2. Counter Logic: Ban hero yang mengancam pick kita (jika ada)
-        if my_team and not self.df_counters.empty:
+        # threats[i] = mask kandidat yang meng-counter berat hero kita ke-i
+        threats = []
+        if my_team and self.counter_matrix.size:
+            cand_heroes = self.row_hero_idx[rows]
             for my_hero in my_team:
-                if not my_hero: continue
-                my_key = self._normalize_name(my_hero)
-                # Cari hero yang skor counternya tinggi terhadap hero kita
-                threats = self.df_counters[
-                    (self.df_counters['target_key'] == my_key) & 
-                    (self.df_counters['score'] > 2.0)
-                ]
-                
-                for _, row in threats.iterrows():
-                    counter_key = row['counter_key']
-                    match_idx = candidates.index[candidates['join_key'] == counter_key].tolist()
-                    for idx in match_idx:
-                        candidates.at[idx, 'ban_score'] += 80 # Prioritas tinggi
-                        candidates.at[idx, 'reasons'].insert(0, f"🛑 Counter berat {my_hero}")
-
-        # Ambil Top 25
-        recommendations = candidates.sort_values(by='ban_score', ascending=False).head(25)
-        
+                my_idx = self._hero_idx(my_hero)
+                if my_idx is None: continue
+                # Hero yang skor counternya tinggi terhadap hero kita (satu baris matrix)
+                threat = self.counter_exists[my_idx, cand_heroes] & (self.counter_matrix[my_idx, cand_heroes] > 2.0)
+                ban_score += np.where(threat, 80, 0) # Prioritas tinggi
+                threats.append((my_hero, threat))
+
+        # Ambil Top 25, alasan hanya dirender untuk hasil akhir
         results = []
-        for _, row in recommendations.iterrows():
-            reason_str = " • ".join(list(dict.fromkeys(row['reasons']))[:2])
-            results.append({'hero': row['hero_name'], 'reason': reason_str})
+        for pos in _top_k(ban_score, 25):
+            reasons = [(R_HEAVY_COUNTER, my_hero) for my_hero, threat in reversed(threats) if threat[pos]]
+            if has_ban_rate:
+                reasons.append((R_OFTEN_BANNED, ban_rate[pos]))
+            results.append({'hero': self.df_stats['hero_name'].iat[rows[pos]],
+                            'reason': _render_reasons(reasons, 2, " • ")})
             
         return results
 
-    def recommend_dynamic_pick(self, my_team, enemy_team, banned_heroes, username):
+    def _recommend_dynamic_pick(self, my_team, enemy_team, banned_heroes, username):
         """
         Rekomendasi Pick dengan Rumus:
         Skor = (Data Eksternal * 40%) + (Kebutuhan Tim * 30%) + (User Performance * 30%)
         """
         if self.df_stats.empty: return []
         
-        all_unavailable = (my_team or []) + (enemy_team or []) + (banned_heroes or [])
-        unavailable_keys = set([self._normalize_name(h) for h in all_unavailable if h])
-        
-        candidates = self.df_stats[~self.df_stats['join_key'].isin(unavailable_keys)].copy()
-        
-        if candidates.empty: return []
-
-        # Inisialisasi kolom
-        candidates['score_external'] = 0.0
-        candidates['score_team'] = 0.0
-        candidates['score_user'] = 0.0
-        candidates['reasons'] = [[] for _ in range(len(candidates))]
+        rows = self._available_rows(my_team, enemy_team, banned_heroes)
+        if rows.size == 0: return []
 
         # 1. KOMPONEN DATA EKSTERNAL (40%) - Meta & Counter
-        if 'win_rate' in candidates.columns:
-            # Win rate 50% -> skor 50. 
-            candidates['score_external'] = candidates['win_rate'] * 100
+        # Win rate 50% -> skor 50. 
+        win_rate = self._stat_column('win_rate', default=np.nan)[rows]
+        if 'win_rate' in self.df_stats.columns:
+            score_external = win_rate * 100
         else:
-            candidates['score_external'] = 50.0
+            score_external = np.full(rows.size, 50.0)
 
-        # Logika Counter vs Musuh
-        if enemy_team and not self.df_counters.empty:
+        # Logika Counter vs Musuh: kode per musuh (2 = hard, 1 = counter) + mask lemah
+        counter_codes = []
+        if enemy_team and self.counter_matrix.size:
+            cand_heroes = self.row_hero_idx[rows]
             for enemy in enemy_team:
-                if not enemy: continue
-                enemy_key = self._normalize_name(enemy)
-                
-                # Bonus: Hero ini meng-counter musuh
-                good_counters = self.df_counters[self.df_counters['target_key'] == enemy_key]
-                for _, row in good_counters.iterrows():
-                    match_idx = candidates.index[candidates['join_key'] == row['counter_key']].tolist()
-                    for idx in match_idx:
-                        score = float(row['score'])
-                        if score >= 2.0:
-                            candidates.at[idx, 'score_external'] += 30 
-                            candidates.at[idx, 'reasons'].append(f"⚔️ Hard Counter {enemy}")
-                        elif score >= 1.0:
-                            candidates.at[idx, 'score_external'] += 15
-                            candidates.at[idx, 'reasons'].append(f"🛡️ Counter {enemy}")
-
-                # Penalty: Hero ini lemah lawan musuh
-                threats = self.df_counters[self.df_counters['counter_key'] == enemy_key]
-                for _, row in threats.iterrows():
-                     match_idx = candidates.index[candidates['join_key'] == row['target_key']].tolist()
-                     for idx in match_idx:
-                         candidates.at[idx, 'score_external'] -= 20
-                         candidates.at[idx, 'reasons'].append(f"⚠️ Lemah vs {enemy}")
+                enemy_idx = self._hero_idx(enemy)
+                if enemy_idx is None: continue
+
+                # Bonus: Hero ini meng-counter musuh (baris musuh di matrix)
+                scores = self.counter_matrix[enemy_idx, cand_heroes]
+                exists = self.counter_exists[enemy_idx, cand_heroes]
+                code = np.where(exists & (scores >= 2.0), 2, np.where(exists & (scores >= 1.0), 1, 0))
+                score_external += np.where(code == 2, 30, np.where(code == 1, 15, 0))
+
+                # Penalty: Hero ini lemah lawan musuh (kolom musuh di matrix)
+                is_weak = self.counter_exists[cand_heroes, enemy_idx]
+                score_external -= np.where(is_weak, 20, 0)
+                counter_codes.append((enemy, code, is_weak))
 
         # 2. KOMPONEN KEBUTUHAN TIM (30%) - Role Filling
+        # Kandidat mengisi lane pertama (urutan LANE_ROLES) yang masih terbuka di assignment tim
+        need_role = np.full(rows.size, -1)
         if my_team:
-            missing_roles = self.get_team_missing_roles(my_team)
-            if missing_roles:
-                for idx, row in candidates.iterrows():
-                    if 'lane' in row:
-                        hero_lane = str(row['lane']).lower()
-                        for role in missing_roles:
-                            keyword = role.split()[0].lower() # e.g. "gold"
-                            if keyword in hero_lane:
-                                candidates.at[idx, 'score_team'] = 100.0
-                                candidates.at[idx, 'reasons'].insert(0, f"✅ Isi {role}")
-                                break
+            open_lanes = self.get_team_open_lanes(my_team)
+            need_role = LOWEST_LANE[self.lane_masks[rows] & open_lanes]
+            score_team = np.where(need_role >= 0, 100.0, 0.0)
         else:
             # First pick bebas
-            candidates['score_team'] = 100.0
+            score_team = np.full(rows.size, 100.0)
 
         # 3. KOMPONEN KECOCOKAN USER (30%) - Data dari Gold Layer
-        for idx, row in candidates.iterrows():
-            hero_name = row['hero_name']
-            
-            # Panggil fungsi yang sekarang membaca dari Gold Parquet
-            u_pick, u_wr = self.get_user_hero_stats(hero_name, username)
-            
-            user_score = 50.0 # Default netral
-            
-            if u_pick > 0:
-                if u_wr > 0.6: # Jago (>60% WR)
-                    user_score = 100.0
-                    candidates.at[idx, 'reasons'].insert(0, f"🌟 Hero Andalan (WR {u_wr:.0%})")
-                elif u_pick >= 3: # Comfort Pick
-                    user_score = 80.0
-                    candidates.at[idx, 'reasons'].append(f"👤 Sering dipakai ({u_pick}x) (WR {u_wr:.0%})")
-                elif u_wr < 0.4 and u_pick >= 2: # Kurang bisa
-                    user_score = 20.0
-                    candidates.at[idx, 'reasons'].append(f"📉 Riwayat buruk (WR {u_wr:.0%})")
-                else: 
-                    user_score = 60.0 # Biasa
-            
-            candidates.at[idx, 'score_user'] = user_score
+        u_pick, u_wr = self._user_perf_vectors(username)
+        u_pick, u_wr = u_pick[rows], u_wr[rows]
+        has_history = u_pick > 0
+        is_mastered = has_history & (u_wr > 0.6)               # Jago (>60% WR)
+        is_frequent = has_history & ~is_mastered & (u_pick >= 3)  # Comfort Pick
+        is_struggling = has_history & ~is_mastered & ~is_frequent & (u_wr < 0.4) & (u_pick >= 2)  # Kurang bisa
+        score_user = np.where(is_mastered, 100.0, np.where(is_frequent, 80.0, np.where(is_struggling, 20.0,
+                     np.where(has_history, 60.0, 50.0))))  # 60 = biasa, 50 = default netral
 
         # HITUNG TOTAL SKOR AKHIR
-        candidates['final_score'] = (
-            (candidates['score_external'] * 0.40) + 
-            (candidates['score_team']     * 0.30) + 
-            (candidates['score_user']     * 0.30)
+        final_score = (
+            (score_external * 0.40) + 
+            (score_team     * 0.30) + 
+            (score_user     * 0.30)
         )
 
-        # Tambahkan label Meta jika WR tinggi
-        for idx in candidates[candidates['win_rate'] > 0.54].index:
-            wr = candidates.at[idx, 'win_rate']
-            candidates.at[idx, 'reasons'].append(f"🔥 Meta (WR {wr:.1f}%)")
-
-        # Sort & Format Output
-        recommendations = candidates.sort_values(by='final_score', ascending=False).head(25)
-        
+        # Top 25; alasan disusun langsung dalam urutan prioritas
+        # (✅ isi role, 🌟 andalan, 👤 sering, ⚔️ hard counter, 🛡️ counter, 🔥 meta, ⚠️ lemah, lainnya)
         results = []
-        priority_icons = ["✅", "🌟", "👤", "⚔️", "🛡️", "🔥", "⚠️"]
-        
-        for _, row in recommendations.iterrows():
-            unique_reasons = []
-            seen = set()
-            raw_reasons = row['reasons']
-            
-            # Sorting alasan agar icon penting muncul duluan
-            sorted_reasons = sorted(raw_reasons, key=lambda x: next((i for i, k in enumerate(priority_icons) if k in x), 99))
-            
-            for r in sorted_reasons:
-                if r not in seen:
-                    unique_reasons.append(r)
-                    seen.add(r)
-            
-            final_reason = " \n".join(unique_reasons[:3]) 
-            results.append({'hero': row['hero_name'], 'reason': final_reason})
+        for pos in _top_k(final_score, 25):
+            reasons = []
+            if need_role[pos] >= 0:
+                reasons.append((R_FILL_ROLE, LANE_ROLES[need_role[pos]][1]))
+            if is_mastered[pos]:
+                reasons.append((R_SIGNATURE_WR, u_wr[pos]))
+            elif is_frequent[pos]:
+                reasons.append((R_OFTEN_USED, u_pick[pos], u_wr[pos]))
+            reasons += [(R_HARD_COUNTER, enemy) for enemy, code, _ in counter_codes if code[pos] == 2]
+            reasons += [(R_COUNTER, enemy) for enemy, code, _ in counter_codes if code[pos] == 1]
+            if win_rate[pos] > 0.54:
+                reasons.append((R_META, win_rate[pos]))
+            reasons += [(R_WEAK_VS, enemy) for enemy, _, is_weak in counter_codes if is_weak[pos]]
+            if is_struggling[pos]:
+                reasons.append((R_BAD_HISTORY, u_wr[pos]))
+
+            results.append({'hero': self.df_stats['hero_name'].iat[rows[pos]],
+                            'reason': _render_reasons(reasons, 3, " \n")})
             
         return results
     
-    def recommend_personalized(self, my_team, enemy_team, banned_heroes, user_profile, username):
+    def _recommend_personalized(self, my_team, enemy_team, banned_heroes, user_profile, username, predictor=None):
         """
         Menghasilkan rekomendasi Terpisah:
         1. User Recs (Top 10) -> Prioritas Comfort Hero & Mastery (Past Experience)
         2. Team Recs (Top 25) -> Fokus ke Meta, Synergy, DAN Exploration (Future Potential)
+
+        Semua skor dihitung per kolom (array sejajar kandidat), teks alasan
+        hanya dirangkai untuk baris yang lolos ke hasil akhir.
         """
+        if self.df_stats.empty: return [], []
+
         # 1. Filter hero yang tersedia
-        all_unavailable = (my_team or []) + (enemy_team or []) + (banned_heroes or [])
-        unavailable_keys = set([self._normalize_name(h) for h in all_unavailable if h])
-        candidates = self.df_stats[~self.df_stats['join_key'].isin(unavailable_keys)].copy()
-        
-        if candidates.empty: return [], []
+        rows = self._available_rows(my_team, enemy_team, banned_heroes)
 
-        # 2. Ambil data profil user & NORMALISASI
-        raw_preferred = user_profile.get('main_roles', [])
-        preferred_roles = [r.lower() for r in raw_preferred]
-        
+        if rows.size == 0: return [], []
+
+        profile = self._personal_profile(user_profile, username)
+        open_lanes = self.get_team_open_lanes(my_team)
+        enemy_codes = []
+        for enemy in (enemy_team or []):
+            code = self._counter_code(enemy)
+            if code is not None:
+                enemy_codes.append((enemy, code))
+
+        model_delta = self._model_deltas(rows, my_team, enemy_team, predictor) if predictor is not None else None
+        return self._score_personalized(rows, profile, open_lanes, enemy_codes, model_delta)
+
+    def _model_deltas(self, rows, my_team, enemy_team, predictor):
+        """Delta win probability model jika tiap baris kandidat diambil di slot ally berikutnya (satu batch)."""
+        candidates = self.df_stats['hero_name'].to_numpy()[rows]
+        base, probs = predictor.marginal_win_probs(my_team or [], enemy_team or [], candidates)
+        return probs - base
+
+    def _personal_profile(self, user_profile, username):
+        """
+        Vektor yang hanya bergantung pada user (bukan state draft), sejajar baris df_stats.
+        Dipisah agar DraftSession cukup menghitungnya sekali per sesi.
+        """
+        # Ambil data profil user & NORMALISASI
+        preferred_roles = [r.lower() for r in user_profile.get('main_roles', [])]
         comfort_heroes = user_profile.get('comfort_heroes', [])
-        
-        raw_avoid = user_profile.get('avoid_roles', [])
-        avoid_roles = [r.lower() for r in raw_avoid]
+        avoid_roles = [r.lower() for r in user_profile.get('avoid_roles', [])]
 
-        current_user = str(username).strip().lower()
-        
-        # 3. EKSTRAKSI ROLE DARI COMFORT HEROES
-        # cari tahu user suka main role spesifik apa dari comfort pick-nya?"
+        # EKSTRAKSI ROLE DARI COMFORT HEROES
         # misal: comfort hero adalah Ruby (Fighter/Tank). maka user suka fighter dan tank
+        is_comfort = self.df_stats['hero_name'].isin(comfort_heroes).to_numpy()
+        is_similar_style = np.zeros(len(self.df_stats), dtype=bool)
         comfort_specific_roles = set()
-        if comfort_heroes:
-            # Ambil data role dari dataframe stats berdasarkan nama hero comfort
-            comfort_rows = self.df_stats[self.df_stats['hero_name'].isin(comfort_heroes)]
-            for _, c_row in comfort_rows.iterrows():
-                # Split role "Fighter/Tank" jadi ["fighter", "tank"]
-                # Biar sistem tau user suka main hero tipe apa secara spesifik
-                c_roles = str(c_row['role']).lower().replace('/', ',').split(',')
-                for r in c_roles:
-                    comfort_specific_roles.add(r.strip())
+        for c_row in np.flatnonzero(is_comfort):
+            comfort_specific_roles |= self._role_tokens[c_row]
+        for token in comfort_specific_roles:
+            is_similar_style |= self._role_token_mask(token)
+
+        u_pick, u_wr = self._user_perf_vectors(username)
+        syn_wr, syn_matches = self._synergy_vectors(username)
+
+        return {
+            'hero_names': self.df_stats['hero_name'].to_numpy(),
+            'win_rate': self.df_stats['win_rate'].to_numpy(dtype=float),
+            'u_pick': u_pick,
+            'u_wr': u_wr,
+            'is_user_role': self._any_column_contains('role', preferred_roles),
+            'is_similar_style': is_similar_style,
+            'is_comfort': is_comfort,
+            'is_avoid': self._any_column_contains('role', avoid_roles),
+            'syn_wr': syn_wr,
+            'syn_matches': syn_matches,
+        }
+
+    def _counter_code(self, enemy):
+        """Kode counter tiap baris df_stats vs satu musuh: 2 = Hard Counter, 1 = Counter, 0 = tidak ada."""
+        enemy_idx = self._hero_idx(enemy)
+        if enemy_idx is None or not self.counter_matrix.size:
+            return None
+        scores = self.counter_matrix[enemy_idx, self.row_hero_idx]
+        exists = self.counter_exists[enemy_idx, self.row_hero_idx]
+        return np.where(exists & (scores >= 2.0), 2, np.where(exists & (scores >= 1.0), 1, 0))
+
+    def _score_personalized(self, rows, profile, open_lanes, enemy_codes, model_delta=None):
+        """
+        Inti scoring personalized untuk baris kandidat `rows`.
+        `open_lanes` adalah bitmask lane tim kita yang masih terbuka (get_team_open_lanes).
+        `model_delta` (opsional) adalah delta win probability model sejajar `rows`.
+        `enemy_codes` berisi pasangan (nama musuh, kode counter per baris) sesuai urutan musuh.
+        """
+        hero_names = profile['hero_names'][rows]
+        win_rate = profile['win_rate'][rows]
+        u_pick, u_wr = profile['u_pick'][rows], profile['u_wr'][rows]
+        is_user_role = profile['is_user_role'][rows]
+        is_similar_style = profile['is_similar_style'][rows]
+
+        # --- PHASE A: SKOR STRATEGIS (BASE) ---
+        strat_score = win_rate * 100
+
+        # Kebutuhan Tim (Need): lane terbuka pertama yang bisa diisi hero
+        need_role = LOWEST_LANE[self.lane_masks[rows] & open_lanes]
+        is_needed = need_role >= 0
+        strat_score += np.where(is_needed, 40, 0)
+
+        # Counter Musuh: satu gather baris matrix per musuh
+        enemy_names = [enemy for enemy, _ in enemy_codes]
+        counter_codes = [code[rows] for _, code in enemy_codes]
+        for code in counter_codes:
+            strat_score += np.where(code == 2, 25, np.where(code == 1, 15, 0))
+
+        # Komponen Model: kenaikan win probability jika hero ini diambil sekarang
+        if model_delta is not None:
+            strat_score += model_delta * MODEL_DELTA_WEIGHT
+
+        # PERSONALIZED EXPLORATION (Sesuai Role User)
+        # Hero sesuai role user TAPI jarang/belum pernah dipakai (u_pick < 5) dapat boost
+        # Syarat: user jarang pakai & Stats Global tidak hancur (>47%)
+        can_explore = (u_pick < 5) & (win_rate > 0.47)
+        exploration_boost = np.where(can_explore & is_user_role, 25, 0) + np.where(can_explore & is_similar_style, 15, 0)
+        strat_score += exploration_boost
+
+        # --- PHASE B: SKOR PERSONAL ---
+        has_history = u_pick > 0
+        is_mastered = has_history & (u_wr > 0.6)
+        is_frequent = has_history & ~is_mastered & (u_pick >= 3)
+        is_struggling = has_history & ~is_mastered & ~is_frequent & (u_wr < 0.4) & (u_pick >= 2)
+        is_comfort = profile['is_comfort'][rows]
+
+        user_score = strat_score.copy()
+        user_score += np.where(is_mastered, 50, np.where(is_frequent, 30, np.where(is_struggling, -20, 0)))
+        user_score += np.where(is_comfort, 40, 0)
+        user_score += np.where(is_user_role, 15, 0)
+
+        # --- PHASE C: SINERGI & FILTER ---
+        syn_wr, syn_matches = profile['syn_wr'][rows], profile['syn_matches'][rows]
+        is_high_synergy = (syn_matches >= 2) & (syn_wr > 0.6)
+        is_bad_synergy = (syn_matches >= 2) & ~is_high_synergy & (syn_wr < 0.4)
+
+        team_score = strat_score + np.where(is_high_synergy, 35, np.where(is_bad_synergy, -15, 0))
+
+        is_avoid = profile['is_avoid'][rows]
+        valid_for_user = (is_comfort | has_history | is_user_role) & ~(is_avoid & ~(is_comfort | has_history))
+        valid_for_team = (team_score > 60) | is_needed
+
+        # --- PHASE D: TOP-K (stabil, urutan kandidat dipertahankan saat seri) ---
+        # User: comfort dulu, lalu yang punya history, lalu skor
+        user_pos = np.flatnonzero(valid_for_user)
+        user_group = is_comfort[user_pos] * 2 + has_history[user_pos]
+        user_pos = user_pos[_top_k(user_score[user_pos], 15, user_group)]
+
+        # Team: sinergi tinggi dulu, lalu skor
+        team_pos = np.flatnonzero(valid_for_team)
+        team_pos = team_pos[_top_k(team_score[team_pos], 35, is_high_synergy[team_pos])]
+
+        # --- PHASE E: RENDER ALASAN (hanya baris terpilih) ---
+        def strat_reasons(pos):
+            reasons = []
+            if is_needed[pos]:
+                reasons.append((R_FILL_ROLE, LANE_ROLES[need_role[pos]][1]))
+            if win_rate[pos] > 0.54:
+                reasons.append((R_META, win_rate[pos]))
+            elif win_rate[pos] > 0.51:
+                reasons.append((R_GOOD_STATS, win_rate[pos]))
+            for enemy, code in zip(enemy_names, counter_codes):
+                if code[pos] == 2:
+                    reasons.append((R_HARD_COUNTER, enemy))
+                elif code[pos] == 1:
+                    reasons.append((R_COUNTER, enemy))
+            if model_delta is not None and abs(model_delta[pos]) >= MODEL_DELTA_REASON:
+                reasons.append((R_MODEL_DELTA, model_delta[pos]))
+            if can_explore[pos]:
+                if is_user_role[pos]:
+                    reasons.append((R_ROLE_MATCH,))
+                elif is_similar_style[pos]:
+                    reasons.append((R_SIMILAR_STYLE,))
+            return reasons
 
         user_recs = []
+        for pos in user_pos:
+            user_reasons = []
+            if is_comfort[pos]:
+                user_reasons.append((R_COMFORT,))
+            if is_mastered[pos]:
+                user_reasons.append((R_SIGNATURE,))
+            elif is_frequent[pos]:
+                user_reasons.append((R_FREQUENT,))
+            elif is_struggling[pos]:
+                user_reasons.append((R_SKILL_ISSUE,))
+            elif has_history[pos]:
+                user_reasons.append((R_HISTORY, u_pick[pos]))
+            if is_user_role[pos] and not user_reasons:
+                user_reasons.append((R_MAIN_ROLE,))
+
+            display_reason = _render_reasons((user_reasons + strat_reasons(pos)[:2])[:3], 3, " • ", dedupe=False)
+            if has_history[pos] and u_wr[pos] < 0.45:
+                display_reason = f"⛔ {display_reason}"
+
+            user_recs.append({
+                'hero': hero_names[pos],
+                'score': float(user_score[pos]),
+                'wr': float(u_wr[pos]),
+                'pick_count': int(u_pick[pos]),
+                'is_comfort': bool(is_comfort[pos]),
+                'has_history': bool(has_history[pos]),
+                'reason': display_reason
+            })
+
         team_recs = []
+        for pos in team_pos:
+            reasons = strat_reasons(pos)
+            if is_high_synergy[pos]:
+                reasons.insert(0, (R_HIGH_SYNERGY,))
+            elif is_bad_synergy[pos]:
+                reasons.append((R_BAD_SYNERGY,))
+            # Logic text avoid (Prioritaskan Main Role)
+            if is_avoid[pos] and not is_user_role[pos]:
+                reasons.append((R_NOT_YOUR_ROLE,))
 
-        for idx, row in candidates.iterrows():
-            hero_name = row['hero_name']
-            
-            # normalisasi nama hero
-            role = str(row['role']).lower()
-            current_hero_roles = [x.strip() for x in role.replace('/', ',').split(',')]
-            
-            hero_key = row['join_key']
-            is_high_synergy = False
-            
-            # Stats user
-            u_pick, u_wr = self.get_user_hero_stats(hero_name, username)
-            
-            # --- PHASE A: HITUNG SKOR STRATEGIS (BASE) ---
-            meta_score = row['win_rate'] * 100 
-            strat_score = meta_score
-            strat_reasons = []
-
-            # 1. Meta Status
-            if row['win_rate'] > 0.54:
-                strat_reasons.append(f"🔥 Meta (WR {row['win_rate']:.1f}%)")
-            elif row['win_rate'] > 0.51:
-                strat_reasons.append(f"📈 Good Stats (WR {row['win_rate']:.1f}%)")
-
-            # 2. Kebutuhan Tim (Need)
-            missing_roles = self.get_team_missing_roles(my_team)
-            hero_lane = str(row['lane']).lower()
-            is_needed = False
-            for needed in missing_roles:
-                if needed.split()[0].lower() in hero_lane: 
-                    strat_score += 40 
-                    strat_reasons.insert(0, f"✅ Isi {needed}")
-                    is_needed = True
-                    break
-            
-            # 3. Counter Musuh
-            if enemy_team and not self.df_counters.empty:
-                for enemy in enemy_team:
-                    if not enemy: continue
-                    enemy_key = self._normalize_name(enemy)
-                    c_row = self.df_counters[
-                        (self.df_counters['target_key'] == enemy_key) & 
-                        (self.df_counters['counter_key'] == hero_key)
-                    ]
-                    if not c_row.empty:
-                        score_val = float(c_row.iloc[0]['score'])
-                        if score_val >= 2.0:
-                            strat_score += 25
-                            strat_reasons.append(f"⚔️ Hard Counter {enemy}")
-                        elif score_val >= 1.0:
-                            strat_score += 15
-                            strat_reasons.append(f"🛡️ Counter {enemy}")
-
-            # --- [BARU] 4. PERSONALIZED EXPLORATION (Sesuai Role User) ---
-            # Jika hero ini sesuai role user TAPI user jarang/belum pernah pakai (u_pick < 5),
-            # Berikan boost agar masuk rekomendasi Tim sebagai "Saran Eksplorasi".
-            
-            # apakah sesuai dengan role utama? (Assassin/Fighter)
-            is_user_role = any(r in role for r in preferred_roles)
-            
-            # apakah mirip dengan comfort pick? (Martis/Arlott)
-            is_similar_style = any(r in comfort_specific_roles for r in current_hero_roles)
-            
-            # apakah user jarang pakai? agar menjadi eksplorasi atau saran
-            is_new_experience = (u_pick < 5)
-            
-            if is_new_experience:
-                exploration_boost = 0
-                
-                # Syarat: Stats Global tidak hancur (>47%)
-                if row['win_rate'] > 0.47:
-                    
-                    # Boost A: Sesuai Main Role (Kita naikkan jadi 25 poin)
-                    # Ini biar Assassin/Fighter naik ke atas mengalahkan Tank Meta
-                    if is_user_role:
-                        exploration_boost += 25
-                        strat_reasons.append("✨ Sesuai Role")
-                    
-                    # Boost B: Mirip Comfort Pick (Kita tambah 15 poin lagi)
-                    # Ini biar Paquito/Lancelot makin kuat skornya
-                    if is_similar_style:
-                        exploration_boost += 15
-                        # Cuma tambah teks jika belum ada teks "Sesuai Role" biar ga penuh
-                        if not is_user_role: 
-                            strat_reasons.append("🎭 Mirip Hero Favorit")
-                
-                # Masukkan boost ke skor strategis (untuk Tab Kanan)
-                strat_score += exploration_boost
-
-            # --- PHASE B: SKOR PERSONAL ---
-            user_score = strat_score 
-            user_reasons = []
+            team_recs.append({
+                'hero': hero_names[pos],
+                'score': float(team_score[pos]),
+                'is_high_synergy': bool(is_high_synergy[pos]),
+                'reason': _render_reasons(reasons, 3, " • ", dedupe=False)
+            })
+
+        return user_recs, team_recs
+
+
+def _frame_to_shared(df):
+    """DataFrame kecil (df_stats) -> (meta JSON, array kolom numerik) untuk snapshot shared."""
+    meta, arrays = {'columns': [], 'values': {}}, {}
+    for column in df.columns:
+        series = df[column]
+        meta['columns'].append(column)
+        if series.dtype.kind in 'biuf':
+            arrays[f"stats.{column}"] = series.to_numpy()
+        else:
+            meta['values'][column] = series.astype(object).where(series.notna(), None).tolist()
+    return meta, arrays
+
+def _frame_from_shared(meta, arrays):
+    if not meta['columns']:
+        return pd.DataFrame()
+    data = {}
+    for column in meta['columns']:
+        data[column] = meta['values'][column] if column in meta['values'] else arrays[f"stats.{column}"]
+    return pd.DataFrame(data, columns=meta['columns'])
+
+def lanes_to_roles(lanes):
+    """Bitmask lane -> label role (urutan LANE_ROLES)."""
+    return [role for bit, (_, role) in enumerate(LANE_ROLES) if lanes & (1 << bit)]
+
+
+def _top_k(score, k, group=None):
+    """
+    Posisi k kandidat teratas tanpa sort penuh (argpartition), diurutkan menurun.
+    `group` (opsional, int/bool) adalah prioritas di atas skor: grup lebih tinggi selalu duluan.
+    Seri dipecah oleh urutan kandidat, sama seperti sort stabil.
+    """
+    if group is None:
+        group = np.zeros(score.size, dtype=np.int8)
+    group = np.asarray(group, dtype=np.int64)
+
+    picked = []
+    for g in np.unique(group)[::-1]:
+        need = k - sum(p.size for p in picked)
+        if need <= 0: break
+        pos = np.flatnonzero(group == g)
+        if pos.size > need:
+            sub = score[pos]
+            kth = sub[np.argpartition(-sub, need - 1)[need - 1]]
+            above = pos[sub > kth]
+            ties = pos[sub == kth][:need - above.size]
+            pos = np.concatenate([above, ties])
+        picked.append(pos[np.lexsort((pos, -score[pos]))])
+    return np.concatenate(picked) if picked else np.zeros(0, dtype=np.intp)
+
+
+def _render_reasons(reasons, limit, sep, dedupe=True):
+    """Ubah list (kode alasan, argumen...) jadi teks; duplikat dibuang (urutan pertama dipertahankan)."""
+    texts = [REASON_TEMPLATES[code].format(*args) for code, *args in reasons]
+    if dedupe:
+        texts = list(dict.fromkeys(texts))
+    return sep.join(texts[:limit])
+
+
+def _copy_recs(result):
+    """Salinan dangkal hasil rekomendasi agar isi cache tidak ikut berubah oleh pemanggil."""
+    if isinstance(result, tuple):
+        return tuple(_copy_recs(part) for part in result)
+    return [dict(rec) for rec in result]
+
+
+class DraftSession:
+    """
+    State draft inkremental di atas DraftRecommender.
+
+    Draft hanya berubah satu pick/ban per langkah, jadi sesi ini menyimpan
+    vektor yang sudah dihitung (profil user, kode counter per musuh, DraftState
+    hero yang terpakai, lane mask pick kita) dan hanya menerapkan delta-nya.
+    Hasil rekomendasi sama persis dengan recommend_personalized untuk state
+    draft yang sama.
+    """
+    SIDES = SIDES
+
+    def __init__(self, recommender, username, user_profile):
+        self.recommender = recommender
+        self.username = username
+        self.user_profile = user_profile
+
+        self.my_team = []
+        self.enemy_team = []
+        self.banned_heroes = []
+        self._history = []
+
+        n_rows = len(recommender.df_stats)
+        self.state = DraftState(recommender.n_heroes)     # bitset pick/ban per hero index
+        self._enemy_codes = []                            # (nama musuh, kode counter) urut pick musuh
+        self._ally_lanes = []                             # lane mask tiap pick tim kita
+        self._profile = recommender._personal_profile(user_profile, username) if n_rows else None
+
+    # --- DELTA UPDATE ---
+    def add_pick(self, side, hero):
+        """Tambah pick untuk 'ally' atau 'enemy'."""
+        if side not in self.SIDES:
+            raise ValueError(f"side harus salah satu dari {self.SIDES}, bukan {side!r}")
+        if not hero: return
+
+        # Bit hanya dilepas saat undo jika aksi ini yang menyetelnya (hero dobel tetap terblokir)
+        idx = self.recommender._hero_idx(hero)
+        added = self.state.pick(side, idx)
+        if side == ALLY:
+            self.my_team.append(hero)
+            self._ally_lanes.append(self.recommender.get_hero_lane_mask(hero))
+            self._history.append(('pick', side, hero, idx if added else None, None))
+        else:
+            self.enemy_team.append(hero)
+            code = self.recommender._counter_code(hero)
+            if code is not None:
+                self._enemy_codes.append((hero, code))
+            self._history.append(('pick', side, hero, idx if added else None, code is not None))
+
+    def add_ban(self, hero):
+        """Tambah ban (berlaku untuk kedua tim)."""
+        if not hero: return
+        idx = self.recommender._hero_idx(hero)
+        added = self.state.ban(idx)
+        self.banned_heroes.append(hero)
+        self._history.append(('ban', None, hero, idx if added else None, None))
+
+    def undo(self):
+        """Batalkan aksi terakhir (pick/ban). Return (aksi, side, hero) atau None jika kosong."""
+        if not self._history:
+            return None
+
+        action, side, hero, idx, payload = self._history.pop()
+        if action == 'ban':
+            if idx is not None: self.state.unban(idx)
+            self.banned_heroes.pop()
+        elif side == ALLY:
+            if idx is not None: self.state.unpick(side, idx)
+            self.my_team.pop()
+            self._ally_lanes.pop()
+        else:
+            if idx is not None: self.state.unpick(side, idx)
+            self.enemy_team.pop()
+            if payload:
+                self._enemy_codes.pop()
+        return action, side, hero
+
+    def sync(self, actions):
+        """
+        Samakan sesi dengan draft dari luar (mis. slot Streamlit).
+        actions: list (aksi, side, hero) urut draft sebenarnya,
+                 ('ban', None, hero) atau ('pick', 'ally'/'enemy', hero).
+        Prefix yang sama dengan history dipertahankan, sisanya di-undo lalu diisi ulang
+        sesuai urutan, jadi history (dan undo) selalu mengikuti urutan draft.
+        """
+        actions = [(action, side if action == 'pick' else None, hero) for action, side, hero in actions if hero]
+        current = self.actions
+        common = 0
+        while common < min(len(current), len(actions)) and current[common] == actions[common]:
+            common += 1
+
+        while len(self._history) > common:
+            self.undo()
+        for action, side, hero in actions[common:]:
+            if action == 'ban':
+                self.add_ban(hero)
+            else:
+                self.add_pick(side, hero)
+
+    # --- READ ---
+    @property
+    def actions(self):
+        """History aksi (aksi, side, hero) urut draft."""
+        return [(action, side, hero) for action, side, hero, _, _ in self._history]
+
+    @property
+    def open_lanes(self):
+        """Bitmask lane tim kita yang masih terbuka (assignment lane terbaik)."""
+        return solve_team(self._ally_lanes)[1]
+
+    @property
+    def missing_roles(self):
+        return lanes_to_roles(self.open_lanes)
+
+    def available_rows(self):
+        """Index baris df_stats yang masih bisa dipilih."""
+        return self.state.available_rows(self.recommender.row_hero_idx)
+
+    def recommendations(self, predictor=None):
+        """(user_recs, team_recs) untuk state draft saat ini, sama dengan recommend_personalized."""
+        if self._profile is None:
+            return [], []
+        rows = self.available_rows()
+        if rows.size == 0:
+            return [], []
+        model_delta = None
+        if predictor is not None:
+            model_delta = self.recommender._model_deltas(rows, self.my_team, self.enemy_team, predictor)
+        return self.recommender._score_personalized(rows, self._profile, self.open_lanes, self._enemy_codes, model_delta)
 
-            is_comfort = hero_name in comfort_heroes
-            has_history = (u_pick > 0) 
-            
-            if u_pick > 0:
-                if u_wr > 0.6: 
-                    user_score += 50
-                    user_reasons.insert(0, f"🌟 Hero Andalan")
-                elif u_pick >= 3: 
-                    user_score += 30
-                    user_reasons.append(f"👤 Sering dipakai")
-                elif u_wr < 0.4 and u_pick >= 2: 
-                    user_score -= 20
-                    user_reasons.append(f"📉 Skill issue")
-                else: 
-                    user_reasons.append(f"📝 History: {u_pick} match")
-            
-            if is_comfort:
-                user_score += 40
-                user_reasons.insert(0, "❤️ Comfort Pick")
-            
-            if is_user_role:
-                user_score += 15
-                if not user_reasons: user_reasons.append("🎯 Role Utama")
-
-            # --- PHASE C: FINALISASI ---
-            combined_user_reasons = user_reasons + strat_reasons[:2] 
-            is_avoid = any(r in role for r in avoid_roles)
-            valid_for_user = (is_comfort or has_history or is_user_role)
-            
-            # List USER
-            if valid_for_user:
-                if is_avoid and not (is_comfort or has_history):
-                    pass 
-                else:
-                    display_reason = " • ".join(combined_user_reasons[:3])
-                    if has_history and u_wr < 0.45:
-                        display_reason = f"⛔ {display_reason}"
-
-                    user_recs.append({
-                        'hero': hero_name,
-                        'score': user_score,
-                        'wr': u_wr,
-                        'pick_count': u_pick,
-                        'is_comfort': is_comfort,
-                        'has_history': has_history,
-                        'reason': display_reason
-                    })
-            
-            # List TEAM (Sinergi Check)
-            if not self.df_synergy.empty:
-                if 'username' in self.df_synergy.columns:
-                    syn_row = self.df_synergy[
-                        (self.df_synergy['hero_id'] == hero_key) &
-                        (self.df_synergy['username'] == current_user)
-                    ]
-                else:
-                    syn_row = self.df_synergy[self.df_synergy['hero_id'] == hero_key]
-                
-                if not syn_row.empty:
-                    syn_wr = float(syn_row.iloc[0]['synergy_wr'])
-                    matches = int(syn_row.iloc[0]['matches_together'])
-                    
-                    if matches >= 2:
-                        if syn_wr > 0.6:
-                            strat_score += 35 
-                            strat_reasons.insert(0, f"🤝 Sinergi Tinggi")
-                            is_high_synergy = True
-                        elif syn_wr < 0.4:
-                            strat_score -= 15
-                            strat_reasons.append(f"⚠️ Bad Synergy")
-            
-            if strat_score > 60 or is_needed:
-                final_strat_reasons = strat_reasons
-                
-                # Logic text avoid (Updated: Prioritaskan Main Role)
-                if is_avoid and not is_user_role:
-                    final_strat_reasons.append("⚠️ (Bukan Role Anda)")
-                
-                team_recs.append({
-                    'hero': hero_name,
-                    'score': strat_score,
-                    'is_high_synergy': is_high_synergy,
-                    'reason': " • ".join(final_strat_reasons[:3])
-                })
-
-        # --- PHASE D: SORTING ---
-        user_recs = sorted(
-            user_recs, 
-            key=lambda x: (x['is_comfort'], x['has_history'], x['score']), 
-            reverse=True
-        )[:15]
-        
-        team_recs = sorted(
-            team_recs, 
-            key=lambda x: (x['is_high_synergy'], x['score']), 
-            reverse=True
-        )[:35]
-        
-        return user_recs, team_recs
\ No newline at end of file
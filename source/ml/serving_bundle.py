@@ -0,0 +1,93 @@
+"""
+Serving bundle: satu artifact berversi berisi semua yang dibutuhkan aplikasi untuk cold start.
+
+Isi (format file snapshot di shared_snapshot.py, bisa langsung di-mmap):
+- registry hero yang sudah dinormalisasi + array statistik df_stats,
+- matrix counter dense & array user (recommender, prefix 'rec.'),
+- array fitur predictor + model dalam format JSON native XGBoost (prefix 'pred.').
+
+Dibuat oleh process_gold3 (data hero/counter berubah) dan process_user_data
+(statistik user berubah), lalu di-upload ke MinIO sebagai satu object.
+Aplikasi cukup download satu file dan attach:
+    DraftRecommender.from_shared(path) / DraftPredictor.from_shared(path)
+"""
+import os
+import sys
+import tempfile
+import threading
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(BASE_DIR)
+
+from source.utils.minio_helper import read_df_from_minio, upload_file_to_minio, download_file_from_minio, get_object_etag
+from source.utils.global_helper import get_timestamp
+from source.ml.shared_snapshot import write_snapshot
+from source.ml.recommender import (DraftRecommender, BUCKET_NAME, GLOBAL_STATS_PATH, COUNTER_DATA_PATH,
+                                   GOLD_USER_STATS_PATH, GOLD_USER_SYNERGY_PATH)
+from source.ml.predictor import DraftPredictor, MODEL_PATH
+
+BUNDLE_OBJECT = "gold/serving_bundle.snap"
+LOCAL_BUNDLE_PATH = os.getenv("SERVING_BUNDLE_PATH", os.path.join(tempfile.gettempdir(), "mlbb_serving_bundle.snap"))
+
+# Recommender & predictor memakai file lokal yang sama: download diserialkan, dan dilewati jika ETag belum berubah
+_FETCH_LOCK = threading.Lock()
+_FETCHED_ETAGS = {}
+
+
+def build_serving_bundle(path, df_stats, df_counters, df_user_perf=None, df_synergy=None, model_path=MODEL_PATH):
+    """Bangun recommender + predictor dari frame gold lalu tulis bundle ke `path`. Return versi bundle."""
+    recommender = DraftRecommender.from_frames(df_stats, df_counters, df_user_perf, df_synergy)
+    predictor = DraftPredictor.from_frames(df_stats, df_counters, model_path=model_path)
+
+    arrays, meta = recommender.shared_payload()
+    pred_arrays, pred_meta = predictor.shared_payload()
+    arrays.update(pred_arrays)
+    meta.update(pred_meta)
+    meta['bundle'] = {'created_at': get_timestamp(), 'heroes': len(recommender.df_stats)}
+    return write_snapshot(path, arrays, meta)
+
+
+def publish_serving_bundle(df_stats=None, df_counters=None, df_user_perf=None, df_synergy=None, model_path=MODEL_PATH):
+    """
+    Bangun bundle dan upload ke MinIO (BUNDLE_OBJECT).
+    Frame yang tidak diberikan dibaca dari gold di MinIO. Return True jika berhasil.
+    """
+    if df_stats is None:
+        df_stats = read_df_from_minio(BUCKET_NAME, GLOBAL_STATS_PATH, file_format='parquet')
+    if df_counters is None:
+        df_counters = read_df_from_minio(BUCKET_NAME, COUNTER_DATA_PATH, file_format='parquet')
+    if df_user_perf is None:
+        df_user_perf = read_df_from_minio(BUCKET_NAME, GOLD_USER_STATS_PATH, file_format='parquet')
+    if df_synergy is None:
+        df_synergy = read_df_from_minio(BUCKET_NAME, GOLD_USER_SYNERGY_PATH, file_format='parquet')
+    if df_stats is None or df_counters is None:
+        print("[WARNING] Serving bundle tidak dibuat: leaderboard / counter lookup gold belum ada.")
+        return False
+
+    fd, tmp_path = tempfile.mkstemp(suffix=".snap")
+    os.close(fd)
+    try:
+        version = build_serving_bundle(tmp_path, df_stats, df_counters, df_user_perf, df_synergy, model_path)
+        ok = upload_file_to_minio(tmp_path, BUCKET_NAME, BUNDLE_OBJECT)
+        if ok:
+            print(f"[INFO] Serving bundle versi {version} ({os.path.getsize(tmp_path) / 1024:.0f} KB) -> {BUNDLE_OBJECT}")
+        return ok
+    finally:
+        os.remove(tmp_path)
+
+
+def fetch_serving_bundle(local_path=LOCAL_BUNDLE_PATH):
+    """Download bundle dari MinIO ke file lokal (sebaiknya di /dev/shm). Return path, error jika gagal."""
+    with _FETCH_LOCK:
+        etag = get_object_etag(BUCKET_NAME, BUNDLE_OBJECT)
+        if etag is not None and _FETCHED_ETAGS.get(local_path) == etag and os.path.exists(local_path):
+            return local_path
+        if not download_file_from_minio(BUCKET_NAME, BUNDLE_OBJECT, local_path):
+            raise RuntimeError(f"Serving bundle {BUNDLE_OBJECT} tidak bisa di-download")
+        _FETCHED_ETAGS[local_path] = etag
+        return local_path
+
+
+def bundle_signature():
+    """ETag object bundle (untuk HotSnapshot)."""
+    return {BUNDLE_OBJECT: get_object_etag(BUCKET_NAME, BUNDLE_OBJECT)}
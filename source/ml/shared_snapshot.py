@@ -0,0 +1,142 @@
+"""
+Snapshot numerik recommender dalam satu file memory-mapped, dipakai bersama banyak proses.
+
+Satu publisher (proses yang membaca MinIO) menulis array hero/counter/user ke file,
+sebaiknya di /dev/shm. Replica Streamlit / worker cukup attach (np.memmap read-only):
+page yang sama dipakai semua proses (memori tidak bertambah per worker) dan
+startup tidak perlu decode parquet.
+
+Format file:
+    header  : magic (8 byte) | versi (uint64) | offset meta (uint64) | panjang meta (uint64)
+    array   : data mentah tiap array, rata 64 byte
+    meta    : JSON (tabel array {nama: dtype, shape, offset} + metadata bebas dari publisher)
+
+File baru selalu ditulis ke file sementara lalu di-rename (atomic): pembaca lama tetap
+memegang inode lama, pembaca baru melihat versi baru. Versi di header naik monoton,
+jadi pembaca cukup membaca header (read_snapshot_version) untuk tahu ada snapshot baru.
+
+Publish dari MinIO (ulang otomatis saat ETag gold berubah):
+    python -m source.ml.shared_snapshot --path /dev/shm/mlbb_recommender.snap --watch
+Publish dari fixture parquet lokal (offline):
+    python -m source.ml.shared_snapshot --path /tmp/mlbb_recommender.snap --local
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(BASE_DIR)
+
+MAGIC = b"MLBBSNP1"
+HEADER = struct.Struct("<8sQQQ")
+ALIGN = 64
+
+
+def write_snapshot(path, arrays, meta=None, version=None):
+    """
+    Tulis dict {nama: ndarray} + meta (JSON-able) ke `path` secara atomic.
+    Versi default: waktu sekarang (ns), minimal versi file lama + 1. Return versi.
+    """
+    if version is None:
+        version = max(time.time_ns(), (read_snapshot_version(path) or 0) + 1)
+
+    table, offset = {}, _aligned(HEADER.size)
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        table[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _aligned(offset + array.nbytes)
+    meta_bytes = json.dumps({'arrays': table, 'meta': meta or {}}, default=str).encode('utf-8')
+
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, version, offset, len(meta_bytes)))
+        for name, array in arrays.items():
+            f.seek(table[name]['offset'])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.seek(offset)
+        f.write(meta_bytes)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return version
+
+
+def read_snapshot_version(path):
+    """Versi snapshot dari header saja (murah), None jika file tidak ada / bukan snapshot."""
+    try:
+        with open(path, "rb") as f:
+            magic, version, _, _ = HEADER.unpack(f.read(HEADER.size))
+    except (OSError, struct.error):
+        return None
+    return version if magic == MAGIC else None
+
+
+class SharedSnapshot:
+    """
+    Attach read-only ke file snapshot. `arrays` berisi view zero-copy atas mmap
+    (read-only, jadi aman dibagi antar thread/proses); `meta` adalah dict metadata publisher.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._mmap = np.memmap(path, mode='r', dtype=np.uint8)
+        magic, self.version, meta_offset, meta_len = HEADER.unpack(self._mmap[:HEADER.size].tobytes())
+        if magic != MAGIC:
+            raise ValueError(f"{path} bukan file snapshot ({magic!r})")
+
+        payload = json.loads(self._mmap[meta_offset:meta_offset + meta_len].tobytes().decode('utf-8'))
+        self.meta = payload['meta']
+        self.arrays = {}
+        for name, spec in payload['arrays'].items():
+            dtype, shape = np.dtype(spec['dtype']), tuple(spec['shape'])
+            count = int(np.prod(shape)) if shape else 1
+            self.arrays[name] = np.frombuffer(self._mmap, dtype=dtype, count=count, offset=spec['offset']).reshape(shape)
+
+    def is_stale(self):
+        """True jika file di path sudah diganti snapshot yang lebih baru."""
+        latest = read_snapshot_version(self.path)
+        return latest is not None and latest > self.version
+
+
+def _aligned(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def main(argv=None):
+    from source.ml.recommender import DraftRecommender
+
+    parser = argparse.ArgumentParser(description="Publish snapshot numerik recommender ke file memory-mapped.")
+    parser.add_argument('--path', default=os.getenv("SHARED_SNAPSHOT_PATH", "/dev/shm/mlbb_recommender.snap"))
+    parser.add_argument('--local', action='store_true', help="Pakai fixture parquet lokal (tanpa MinIO)")
+    parser.add_argument('--watch', action='store_true', help="Publish ulang setiap ETag gold berubah")
+    parser.add_argument('--interval', type=int, default=60, help="Interval cek ETag (detik) untuk --watch")
+    args = parser.parse_args(argv)
+
+    if args.local:
+        from source.ml.benchmark import load_local_fixtures
+        recommender = DraftRecommender.from_frames(*load_local_fixtures())
+        version = recommender.publish_shared(args.path)
+        print(f"[INFO] Snapshot versi {version} dipublish ke {args.path}")
+        return
+
+    from source.ml.gold_snapshot import HotSnapshot
+    hot = HotSnapshot(DraftRecommender, DraftRecommender.source_signature, interval_seconds=args.interval, name="publisher")
+    published = None
+    while True:
+        if hot.version != published:
+            published = hot.version
+            version = hot.current.publish_shared(args.path)
+            print(f"[INFO] Snapshot versi {version} dipublish ke {args.path}")
+        if not args.watch:
+            break
+        time.sleep(args.interval)
+        hot.refresh()
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ from xgboost import XGBClassifier
 # Menambahkan path project ke sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 from source.utils.minio_helper import read_df_from_minio
+from source.ml.tree_model import export_native_model
 
 BUCKET_NAME = "mlbb-lake"
 # Pastikan file ini sesuai dengan output terakhir process_gold2.py
@@ -139,5 +140,9 @@ def train_win_predictor():
         pickle.dump(artifact, f)
     print(f"--SAVED: Model Saved as {MODEL_FILENAME}.")
 
+    # Booster native (JSON XGBoost) untuk inference cepat tanpa pickle/sklearn (lihat tree_model.py)
+    native_path = export_native_model(best_model, model_columns, MODEL_FILENAME)
+    print(f"--SAVED: Native booster saved as {native_path}.")
+
 if __name__ == "__main__":
     train_win_predictor()
\ No newline at end of file
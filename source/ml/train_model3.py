@@ -9,6 +9,7 @@ from xgboost import XGBClassifier
 # Path helper
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 from source.utils.minio_helper import read_df_from_minio
+from source.ml.tree_model import export_native_model
 
 BUCKET_NAME = "mlbb-lake"
 INPUT_FILE = "gold/gold_training_dataset_v3.parquet"  # File output dari process_gold3.py
@@ -122,5 +123,9 @@ def train_enhanced_predictor():
         pickle.dump(artifact, f)
     print(f"--SAVED: Model Saved as {MODEL_FILENAME}.")
 
+    # Booster native (JSON XGBoost) untuk inference cepat tanpa pickle/sklearn (lihat tree_model.py)
+    native_path = export_native_model(best_model, model_columns, MODEL_FILENAME)
+    print(f"--SAVED: Native booster saved as {native_path}.")
+
 if __name__ == "__main__":
     train_enhanced_predictor()
\ No newline at end of file
@@ -0,0 +1,182 @@
+import json
+import os
+import pickle
+import sys
+import numpy as np
+
+# Path helper
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+
+def native_model_path(model_path):
+    """Lokasi booster native (JSON XGBoost) untuk sebuah artifact .pkl: nama sama, ekstensi .json."""
+    return os.path.splitext(model_path)[0] + ".json"
+
+
+def export_native_model(model, model_columns, model_path):
+    """
+    Simpan booster XGBoost dalam format JSON native di samping artifact pickle.
+    Nama fitur (model_columns) ikut disimpan di booster, jadi file ini cukup
+    untuk inference tanpa sklearn/pickle (lihat TreeEnsemble).
+    Return path file JSON.
+    """
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    booster.feature_names = list(model_columns)
+    path = native_model_path(model_path)
+    booster.save_model(path)
+    return path
+
+
+def native_model_json(model):
+    """Dict JSON native booster dari TreeEnsemble atau XGBClassifier / Booster (hasil unpickle)."""
+    if isinstance(model, TreeEnsemble):
+        return model.model_json
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    return json.loads(booster.save_raw('json'))
+
+
+class TreeEnsemble:
+    """
+    Evaluator ringan untuk booster XGBoost (gbtree, binary:logistic) dari JSON native.
+
+    Tiap pohon disusun ulang menjadi pohon biner lengkap sedalam `depth`
+    (layout heap: anak node i = 2i+1 / 2i+2). Leaf yang lebih dangkal diisi
+    split dummy (threshold +inf, selalu ke kiri) dan nilainya disalin ke semua
+    slot leaf di bawahnya. Traversal jadi aritmatika index murni untuk
+    (baris x pohon) sekaligus dengan NumPy, tanpa xgboost/sklearn/DMatrix.
+    Perbandingan memakai float32 seperti XGBoost (x < threshold ke kiri,
+    NaN mengikuti default_left).
+
+    Batch besar (>= `inplace_min_rows`) diteruskan ke Booster.inplace_predict
+    jika xgboost terpasang (multi-thread); hasil keduanya sama sampai toleransi float32.
+    Interface `predict_proba` sama dengan XGBClassifier sehingga bisa dipakai
+    langsung sebagai `DraftPredictor.model`.
+    """
+
+    def __init__(self, model_json, inplace_min_rows=2048):
+        learner = model_json['learner']
+        objective = learner['objective']['name']
+        if objective != 'binary:logistic':
+            raise ValueError(f"Objective {objective} belum didukung TreeEnsemble")
+        booster = learner['gradient_booster']
+        if booster['name'] != 'gbtree':
+            raise ValueError(f"Booster {booster['name']} belum didukung TreeEnsemble")
+
+        self.model_json = model_json
+        self.inplace_min_rows = inplace_min_rows
+        self._booster = None
+        self.feature_names = learner.get('feature_names') or None
+        # base_score disimpan dalam ruang probabilitas, mis. "[5.5757576E-1]"
+        base_score = float(str(learner['learner_model_param']['base_score']).strip('[]'))
+        self.base_margin = np.float32(np.log(base_score / (1 - base_score)))
+
+        trees = booster['model']['trees']
+        self.n_trees = len(trees)
+        self.depth = max(_tree_depth(tree['left_children'], tree['right_children']) for tree in trees)
+        n_inner, n_leaf = (1 << self.depth) - 1, 1 << self.depth
+
+        feature = np.zeros((self.n_trees, n_inner), dtype=np.int64)
+        threshold = np.full((self.n_trees, n_inner), np.inf, dtype=np.float32)
+        default_left = np.ones((self.n_trees, n_inner), dtype=bool)
+        leaf_value = np.zeros((self.n_trees, n_leaf), dtype=np.float32)
+        for t, tree in enumerate(trees):
+            stack = [(0, 0, 0)]  # (node asli, posisi heap, level)
+            while stack:
+                node, pos, level = stack.pop()
+                left = tree['left_children'][node]
+                if left < 0:
+                    # Untuk leaf, split_conditions berisi nilai leaf
+                    span = 1 << (self.depth - level)
+                    first = (pos + 1) * span - 1 - n_inner
+                    leaf_value[t, first:first + span] = tree['split_conditions'][node]
+                    continue
+                feature[t, pos] = tree['split_indices'][node]
+                threshold[t, pos] = tree['split_conditions'][node]
+                default_left[t, pos] = tree['default_left'][node]
+                stack.append((left, 2 * pos + 1, level + 1))
+                stack.append((tree['right_children'][node], 2 * pos + 2, level + 1))
+
+        self.feature = feature.ravel()
+        self.threshold = threshold.ravel()
+        self.default_left = default_left.ravel()
+        self.leaf_value = leaf_value.ravel()
+        self._inner_offset = np.arange(self.n_trees, dtype=np.int64) * n_inner
+        self._leaf_offset = np.arange(self.n_trees, dtype=np.int64) * n_leaf - n_inner
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), **kwargs)
+
+    @classmethod
+    def from_booster(cls, model, **kwargs):
+        """Dari XGBClassifier / Booster yang sudah ada di memori (mis. hasil unpickle)."""
+        return cls(native_model_json(model), **kwargs)
+
+    def predict_margin(self, X, chunk_size=4096):
+        """Skor margin (log-odds) per baris untuk matrix fitur (N x F)."""
+        X = np.ascontiguousarray(np.atleast_2d(X), dtype=np.float32)
+        margin = np.empty(X.shape[0], dtype=np.float32)
+        # Per chunk agar array (baris x pohon) tetap muat di cache
+        for start in range(0, X.shape[0], chunk_size):
+            margin[start:start + chunk_size] = self._margin_chunk(X[start:start + chunk_size])
+        return margin
+
+    def _margin_chunk(self, X):
+        flat = X.ravel()
+        offset = (np.arange(X.shape[0], dtype=np.int64) * X.shape[1])[:, None]
+        pos = np.zeros((X.shape[0], self.n_trees), dtype=np.int64)
+        for _ in range(self.depth):
+            node = pos + self._inner_offset
+            value = flat[offset + self.feature[node]]
+            # NaN < threshold selalu False, jadi cukup OR dengan default_left untuk missing
+            go_left = (value < self.threshold[node]) | (np.isnan(value) & self.default_left[node])
+            pos = 2 * pos + 2 - go_left
+        return self.leaf_value[pos + self._leaf_offset].sum(axis=1, dtype=np.float32) + self.base_margin
+
+    def predict_proba(self, X):
+        """Probabilitas (N x 2) seperti XGBClassifier.predict_proba."""
+        X = np.atleast_2d(X)
+        booster = self._inplace_booster() if X.shape[0] >= self.inplace_min_rows else None
+        if booster is not None:
+            prob = booster.inplace_predict(np.asarray(X, dtype=np.float32))
+        else:
+            prob = 1.0 / (1.0 + np.exp(-self.predict_margin(X).astype(np.float64)))
+        prob = np.asarray(prob, dtype=np.float32)
+        return np.column_stack([1 - prob, prob])
+
+    def _inplace_booster(self):
+        """Booster xgboost (lazy, hanya untuk batch besar); None jika xgboost tidak terpasang."""
+        if self._booster is None:
+            try:
+                import xgboost
+                booster = xgboost.Booster()
+                booster.load_model(bytearray(json.dumps(self.model_json).encode('utf-8')))
+                self._booster = booster
+            except Exception as e:
+                print(f"[WARNING] inplace_predict tidak tersedia, batch besar tetap lewat NumPy: {e}")
+                self._booster = False
+        return self._booster or None
+
+
+def _tree_depth(left_children, right_children):
+    """Kedalaman maksimum satu pohon (jumlah split dari root ke leaf terdalam)."""
+    depth, stack = 0, [(0, 0)]
+    while stack:
+        node, level = stack.pop()
+        if left_children[node] < 0:
+            depth = max(depth, level)
+            continue
+        stack.append((left_children[node], level + 1))
+        stack.append((right_children[node], level + 1))
+    return depth
+
+
+if __name__ == "__main__":
+    # Export booster native dari artifact pickle yang sudah ada:
+    #   python source/ml/tree_model.py model_draft_mlbb.pkl
+    for model_path in sys.argv[1:]:
+        with open(model_path, "rb") as f:
+            artifact = pickle.load(f)
+        path = export_native_model(artifact['model'], artifact['model_columns'], model_path)
+        print(f"--SAVED: Native booster saved as {path}.")
@@ -7,15 +7,23 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 # helper functions
-from source.utils.minio_helper import read_df_from_minio, upload_df_to_minio
+from source.utils.minio_helper import (read_df_from_minio, upload_df_to_minio, upload_partitioned_df_to_minio,
+                                       read_partitioned_df_from_minio)
 from source.utils.global_helper import get_timestamp
 from source.utils.helper_bronze import normalize_hero_name, clean_percentage, get_tier_score, parse_hero_list
+from source.utils.hero_registry import HeroRegistry, hero_keys
+from source.utils.incremental import match_content_ids, carry_ingested_at
 
 # --- KONFIGURASI BUCKET ---
 BUCKET_NAME = "mlbb-lake"
 
-def process_stats_sql():
-    print("\n[1/4] Proses Hero Stats (SQL Source)")
+# Dataset match bronze (hive): .../region=ID/season=S16/part-0.parquet
+# Query "MPL ID saja" cukup membaca folder region=ID
+BRONZE_MATCHES_PREFIX = "bronze/tournament_matches/mpl_matches"
+MATCH_PARTITION_COLS = ['region', 'season']
+
+def process_stats_sql(registry):
+    print("\n[2/4] Proses Hero Stats (SQL Source)")
     
     df = read_df_from_minio(BUCKET_NAME, "raw/internal_db/hero_master.sql")
     
@@ -24,7 +32,8 @@ def process_stats_sql():
         df.columns = ['hero_name_raw', 'win_rate', 'pick_rate', 'ban_rate', 'role', 'lane', 'speciality']
         
         # kolom normalized
-        df['hero_name_normalized'] = df['hero_name_raw'].apply(normalize_hero_name)
+        df['hero_name_normalized'] = hero_keys(df['hero_name_raw'])
+        df['hero_id'] = registry.register(df['hero_name_raw'])
         
         # cleaning tipe data persentase
         for col in ['win_rate', 'pick_rate', 'ban_rate']:
@@ -48,8 +57,8 @@ def process_stats_sql():
         upload_df_to_minio(df, BUCKET_NAME, "bronze/hero_stats/bronze_hero_stats.parquet", file_format='parquet')
         print(f"--DONE, bronze_hero_stats.parquet save to MinIO {BUCKET_NAME}")
 
-def process_meta_tier():
-    print("\n[2/4] Proses Meta Tier...")
+def process_meta_tier(registry):
+    print("\n[1/4] Proses Meta Tier...")
     
     df = read_df_from_minio(BUCKET_NAME, "raw/hero_meta/meta_tier_raw.csv")
     
@@ -60,10 +69,11 @@ def process_meta_tier():
             'Tier': 'tier_raw',
             'Score': 'score',
             'Image URL': 'image_url',
-            'Hero ID': 'hero_id' # Keep ID asli
+            'Hero ID': 'source_hero_id' # ID asli scraper, jadi dasar hero_id di registry
         })
         
-        df['hero_name_normalized'] = df['hero_name_raw'].apply(normalize_hero_name)
+        df['hero_name_normalized'] = hero_keys(df['hero_name_raw'])
+        df['hero_id'] = registry.register(df['hero_name_raw'], df.get('source_hero_id'))
         
         # tier scoring
         df['tier_score'] = df['tier_raw'].apply(get_tier_score)
@@ -72,11 +82,11 @@ def process_meta_tier():
         df['data_source'] = 'web_scraping_meta'
         df['ingested_at'] = get_timestamp()
         
-        cols_to_save = ['hero_id', 'hero_name_raw', 'hero_name_normalized', 'tier_raw', 'tier_score', 'score', 'image_url', 'data_source', 'ingested_at']
+        cols_to_save = ['hero_id', 'source_hero_id', 'hero_name_raw', 'hero_name_normalized', 'tier_raw', 'tier_score', 'score', 'image_url', 'data_source', 'ingested_at']
         upload_df_to_minio(df[cols_to_save], BUCKET_NAME, "bronze/meta/bronze_hero_meta.parquet", file_format='parquet')
         print(f"--DONE, bronze_hero_meta.parquet save to MinIO {BUCKET_NAME}")
 
-def process_counter():
+def process_counter(registry):
     print("\n[3/4] Proses Hero Counter...")
     
     df = read_df_from_minio(BUCKET_NAME, "raw/counter/data_counter.csv")
@@ -89,8 +99,11 @@ def process_counter():
             'counter_name': 'counter_name_raw'
         })
         
-        df['hero_name_normalized'] = df['hero_name_raw'].apply(normalize_hero_name)
-        df['counter_name_normalized'] = df['counter_name_raw'].apply(normalize_hero_name)
+        df['hero_name_normalized'] = hero_keys(df['hero_name_raw'])
+        df['counter_name_normalized'] = hero_keys(df['counter_name_raw'])
+        # target_id dari scraper counter = 'Hero ID' mlbb.io
+        df['hero_id'] = registry.register(df['hero_name_raw'], df.get('target_id'))
+        df['counter_hero_id'] = registry.register(df['counter_name_raw'])
         
         # tier score untuk counter
         if 'tier' in df.columns:
@@ -103,7 +116,7 @@ def process_counter():
         upload_df_to_minio(df, BUCKET_NAME, "bronze/counter_hero/bronze_hero_counter.parquet", file_format='parquet')
         print(f"--DONE, bronze_hero_counter.parquet save to MinIO {BUCKET_NAME}")
 
-def process_mpl_matches():
+def process_mpl_matches(registry):
     print("\n[4/4] Proses MPL Matches (ID & PH)...")
     
     # read all tournament files
@@ -150,25 +163,44 @@ def process_mpl_matches():
                 df_combined[col_norm_name] = df_combined[col_raw_name].apply(
                     lambda x: [normalize_hero_name(hero) for hero in x]
                 )
+                
+                # 3. hero_id columns
+                # ["claude", "hylos"] -> [12, 47]
+                registry.register(df_combined[col_raw_name].explode().dropna())
+                df_combined[f"{col}_id"] = registry.id_lists(df_combined[col_norm_name])
         
         # add metadata
         df_combined['ingested_at'] = get_timestamp()
+        # season dari nama turnamen ('MPL ID S16' -> 'S16'), kunci partisi bersama region
+        df_combined['season'] = df_combined['tournament'].str.extract(r'\b(S\d+)\b', expand=False).fillna('unknown')
         
         # drop the old columns
         df_combined = df_combined.drop(columns=target_cols)
-        
-        upload_df_to_minio(df_combined, BUCKET_NAME, "bronze/tournament_matches/bronze_mpl_matches.parquet", file_format='parquet')
-        print(f"--DONE, bronze_mpl_matches.parquet save to MinIO {BUCKET_NAME}")
+
+        # match_id / content_hash disimpan di bronze; game yang tidak berubah sejak bronze sebelumnya
+        # mempertahankan ingested_at lamanya, jadi watermark silver hanya meloloskan game baru/berubah
+        df_combined['match_id'], df_combined['content_hash'] = match_content_ids(df_combined)
+        df_previous = read_partitioned_df_from_minio(BUCKET_NAME, BRONZE_MATCHES_PREFIX,
+                                                     columns=['match_id', 'content_hash', 'ingested_at'],
+                                                     partition_cols=MATCH_PARTITION_COLS)
+        df_combined['ingested_at'] = carry_ingested_at(df_combined, df_previous)
+        
+        upload_partitioned_df_to_minio(df_combined, BUCKET_NAME, BRONZE_MATCHES_PREFIX, MATCH_PARTITION_COLS)
+        print(f"--DONE, {BRONZE_MATCHES_PREFIX} save to MinIO {BUCKET_NAME}")
 
 # --- EXECUTION BLOCK ---
 if __name__ == "__main__":
     print("--- PIPELINE BRONZE LAYER ---")
     
     try:
-        process_stats_sql()
-        process_meta_tier()
-        process_counter()
-        process_mpl_matches()
+        # Meta tier duluan: 'Hero ID' scraper jadi dasar hero_id di registry
+        registry = HeroRegistry.load(BUCKET_NAME)
+        process_meta_tier(registry)
+        process_stats_sql(registry)
+        process_counter(registry)
+        process_mpl_matches(registry)
+        registry.save(BUCKET_NAME)
+        print(f"--DONE, hero registry ({len(registry)} key) save to MinIO {BUCKET_NAME}")
         print("\nBRONZE PIPELINE SUCCESS. Cek 'bronze/' folder in MinIO")
     except Exception as e:
         print(f"\nERROR: {e}")
\ No newline at end of file
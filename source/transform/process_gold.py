@@ -5,6 +5,7 @@ import sys, os
 # Setup path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 from source.utils.minio_helper import read_df_from_minio, upload_df_to_minio
+from source.utils.incremental import read_batches
 
 BUCKET_NAME = "mlbb-lake"
 
@@ -147,7 +148,8 @@ def run_gold_pipeline():
     print('--- PIPELINE TRANSFORMING GOLD LAYER ---')
     
     # load silver
-    df_silver = read_df_from_minio(BUCKET_NAME, "silver/silver_draft_enriched.parquet", file_format='parquet')
+    # Silver sekarang dipartisi per batch: gabungkan semua partisi
+    df_silver = read_batches(BUCKET_NAME, "silver/silver_draft_enriched", partition_cols=["region", "season"])
     df_master = read_df_from_minio(BUCKET_NAME, "bronze/hero_stats/bronze_hero_stats.parquet", file_format='parquet')
     
     if df_silver is None:
@@ -7,6 +7,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.
 
 # helper functions
 from source.utils.minio_helper import read_df_from_minio, upload_df_to_minio
+from source.utils.incremental import read_batches
 from source.utils.global_helper import get_timestamp
 
 # --- KONFIGURASI BUCKET ---
@@ -130,7 +131,8 @@ def run_gold_pipeline():
     
     # --- STEP 1: LOAD SILVER DATA ---
     print('\n1/4 Loading Silver Data...')
-    df_silver = read_df_from_minio(BUCKET_NAME, "silver/silver_draft_enriched.parquet", file_format='parquet')
+    # Silver sekarang dipartisi per batch: gabungkan semua partisi
+    df_silver = read_batches(BUCKET_NAME, "silver/silver_draft_enriched", partition_cols=["region", "season"])
     
     if df_silver is None:
         print("--ERROR: Data Silver tidak ditemukan. Jalankan process_silver.py dulu.")
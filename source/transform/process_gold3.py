@@ -8,10 +8,34 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.
 # helper functions
 from source.utils.minio_helper import read_df_from_minio, upload_df_to_minio
 from source.utils.global_helper import get_timestamp
+from source.utils.lane_helper import lane_masks, lanes_complete_many
+from source.utils.incremental import BATCH_KEY, list_batches, read_batches, write_batch, delete_batches, load_state
+from source.transform.process_silver import SILVER_ENRICHED_PREFIX, SILVER_PARTITION_COLS
+from source.ml.serving_bundle import publish_serving_bundle
 
 # --- KONFIGURASI BUCKET ---
 BUCKET_NAME = "mlbb-lake"
 
+# Hasil per batch silver (partisi sama dengan silver), digabung tiap run
+GOLD_TEAM_PREFIX = "gold/gold_team_features"
+GOLD_HERO_AGG_PREFIX = "gold/gold_hero_pick_agg"
+GOLD_STATE_PATH = "gold/_state/gold_batches.parquet"
+
+# Kolom silver yang dipakai gold (proyeksi: kolom lain tidak ikut di-download), hanya fase pick
+GOLD_SILVER_COLS = ['match_id', 'team_side', 'team_name', 'phase', 'hero_id', 'hero_name_normalized', 'is_winner_team',
+                    'win_rate', 'pick_rate', 'ban_rate', 'tier_score', 'counter_score', 'role', 'lane', 'speciality']
+GOLD_SILVER_FILTERS = [('phase', '==', 'pick')]
+
+# Kolom rata-rata leaderboard: kolom silver -> nama di leaderboard
+HERO_MEAN_COLS = {
+    'counter_score': 'avg_counter_score',
+    # Statistik rata-rata dari Silver (yang sudah ada win_rate, ban_rate bawaan)
+    'win_rate': 'win_rate_avg',
+    'ban_rate': 'ban_rate_avg',
+    'pick_rate': 'pick_rate_avg',
+    'tier_score': 'tier_score',
+}
+
 def transform_gold_pick_features_v3(df_silver):
     """
     STEP 1: GOLD DRAFT PICK FEATURES
@@ -49,40 +73,30 @@ def transform_gold_match_features_v3(df_gold_picks):
     """
     print('--LOGIC: Agregasi data per Tim + Cek Role Balance')
     
-    # --- HELPER: Cek Kelengkapan Role ---
-    def check_roles(roles):
-        # Logika: Tim harus punya lini depan (Tank/Fighter) DAN lini belakang (MM/Mage)
-        has_frontline = any(r in ['Tank', 'Fighter', 'Support'] for r in roles)
-        has_damage = any(r in ['Marksman', 'Mage', 'Assassin'] for r in roles)
-        return 1 if (has_frontline and has_damage) else 0
+    # Groupby per Tim per Match (satu agg, tanpa loop per tim)
+    keys = ['match_id', 'team_side']
+    grouped = df_gold_picks.groupby(keys)
+    df_match_features = grouped.agg(
+        team_name=('team_name', 'first'),
+        is_winner_team=('is_winner_team', 'first'),
+        # Statistik Rata-rata
+        avg_win_rate_team=('win_rate', 'mean'),
+        avg_meta_score_team=('tier_score', 'mean'),
+        avg_counter_score_team=('counter_score', 'mean'),
+        # Validasi Data
+        total_heroes_count=('team_side', 'size'),
+    ).reset_index()
 
-    # Groupby per Tim per Match
-    grouped = df_gold_picks.groupby(['match_id', 'team_side'])
-    aggregated_data = []
-    
-    for (match_id, side), group in grouped:
-        roles = group['role'].tolist()
-        
-        row = {
-            'match_id': match_id,
-            'team_side': side,
-            'team_name': group['team_name'].iloc[0],
-            'is_winner_team': group['is_winner_team'].iloc[0],
-            
-            # Statistik Rata-rata
-            'avg_win_rate_team': group['win_rate'].mean(),
-            'avg_meta_score_team': group['tier_score'].mean(),
-            'avg_counter_score_team': group['counter_score'].mean(),
-            
-            # Validasi Data
-            'total_heroes_count': len(group),
-            
-            # --- FITUR BARU: Role Balance ---
-            'is_role_balanced': check_roles(roles)
-        }
-        aggregated_data.append(row)
-        
-    df_match_features = pd.DataFrame(aggregated_data)
+    # --- FITUR BARU: Role Balance ---
+    # Bitmask lane per hero -> array (tim, slot), lalu cek sekaligus apakah 5 hero bisa
+    # dibagi ke lane berbeda (hero flex cukup isi salah satu lane-nya)
+    # baris dengan key NaN tidak masuk group mana pun (ngroup/cumcount NaN -> -1)
+    team_no = grouped.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+    slot = grouped.cumcount().fillna(-1).to_numpy(dtype=np.int64)
+    valid = team_no >= 0
+    team_masks = np.zeros((len(df_match_features), int(slot.max(initial=0)) + 1), dtype=np.int64)
+    team_masks[team_no[valid], slot[valid]] = lane_masks(df_gold_picks['lane'])[valid]
+    df_match_features['is_role_balanced'] = lanes_complete_many(team_masks)
     
     # Filter Data Bersih (Harus 5 hero)
     df_clean = df_match_features[df_match_features['total_heroes_count'] == 5].copy()
@@ -126,27 +140,50 @@ def transform_gold_match_level_v3(df_team):
     return df_match
 
 # data dashboard dan untuk rekomendasi
-def create_hero_leaderboard(df_silver_enriched, df_master_hero):
+def aggregate_hero_picks(df_silver_enriched):
+    """
+    Agregat parsial statistik pick per hero (jumlah & count, bukan rata-rata) supaya
+    hasil beberapa batch silver bisa dijumlahkan lalu dibagi di combine_hero_aggregates.
+    """
+    # Kita ambil data fase 'pick' saja untuk statistik performa
+    df_picks = df_silver_enriched[df_silver_enriched['phase'] == 'pick']
+    key = 'hero_id' if 'hero_id' in df_picks.columns else 'hero_name_normalized'
+    named_aggs = {
+        'total_picks': ('match_id', 'count'),
+        'total_wins': ('is_winner_team', 'sum'),
+    }
+    if key != 'hero_name_normalized':
+        named_aggs['hero_name_normalized'] = ('hero_name_normalized', 'first')
+    for col in HERO_MEAN_COLS:
+        named_aggs[f'{col}_sum'] = (col, 'sum')
+        named_aggs[f'{col}_n'] = (col, 'count')
+    return df_picks.groupby(key).agg(**named_aggs).reset_index()
+
+def combine_hero_aggregates(df_hero_agg, key):
+    """Jumlahkan agregat parsial (per batch) lalu hitung rata-rata seperti groupby().mean()."""
+    sum_cols = ['total_picks', 'total_wins'] + [f'{col}_{part}' for col in HERO_MEAN_COLS for part in ('sum', 'n')]
+    totals = df_hero_agg.groupby(key)[sum_cols].sum()
+    stats_agg = totals[['total_picks', 'total_wins']].copy()
+    for col, name in HERO_MEAN_COLS.items():
+        count = totals[f'{col}_n']
+        stats_agg[name] = (totals[f'{col}_sum'] / count).where(count > 0)
+    return stats_agg.reset_index()
+
+def create_hero_leaderboard(df_silver_enriched, df_master_hero, df_hero_agg=None):
     """
     Membuat Leaderboard yang mencakup SELURUH hero (bahkan yang 0 pick).
     Teknik: Left Join antara Master Hero (Kiri) dengan Statistik Match (Kanan).
+    df_hero_agg: agregat parsial per batch (aggregate_hero_picks); jika None dihitung dari silver.
     """
     print("--LOGIC: Creating Full Hero Leaderboard (Master + Stats)")
     
     # 1. Hitung Statistik dari Match (Hanya untuk hero yang laku)
-    # Kita ambil data fase 'pick' saja untuk statistik performa
-    df_picks = df_silver_enriched[df_silver_enriched['phase'] == 'pick']
+    if df_hero_agg is None:
+        df_hero_agg = aggregate_hero_picks(df_silver_enriched)
     
-    stats_agg = df_picks.groupby('hero_name_normalized').agg(
-        total_picks=('match_id', 'count'),
-        total_wins=('is_winner_team', 'sum'),
-        avg_counter_score=('counter_score', 'mean'),
-        # Statistik rata-rata dari Silver (yang sudah ada win_rate, ban_rate bawaan)
-        win_rate_avg=('win_rate', 'mean'),
-        ban_rate_avg=('ban_rate', 'mean'),
-        pick_rate_avg=('pick_rate', 'mean'),
-        tier_score=('tier_score', 'mean')
-    ).reset_index()
+    # Kunci join: hero_id dari registry (silver lama tanpa hero_id: nama normalisasi)
+    key = 'hero_id' if 'hero_id' in df_hero_agg.columns and 'hero_id' in df_master_hero.columns else 'hero_name_normalized'
+    stats_agg = combine_hero_aggregates(df_hero_agg, key)
 
     # 2. Siapkan Master Data (Daftar Absen Hero)
     # Pastikan kita punya kolom kunci yang sama: 'hero_name_normalized'
@@ -157,11 +194,12 @@ def create_hero_leaderboard(df_silver_enriched, df_master_hero):
 
     # Ambil kolom-kolom penting dari master (Nama Asli, Role, Lane, dll)
     # Asumsi kolom di master: ['hero_name_raw', 'role', 'lane', 'hero_name_normalized']
-    master_base = df_master_hero[['hero_name_raw', 'hero_name_normalized', 'role', 'lane']].drop_duplicates(subset=['hero_name_normalized'])
+    master_cols = ['hero_id', 'hero_name_raw', 'hero_name_normalized', 'role', 'lane'] if key == 'hero_id' else ['hero_name_raw', 'hero_name_normalized', 'role', 'lane']
+    master_base = df_master_hero[master_cols].drop_duplicates(subset=[key])
 
     # 3. THE MAGIC STEP: LEFT JOIN
     # Kiri: Master (Lengkap) | Kanan: Stats (Bolong-bolong)
-    leaderboard = pd.merge(master_base, stats_agg, on='hero_name_normalized', how='left')
+    leaderboard = pd.merge(master_base, stats_agg, on=key, how='left')
     
     # 4. Handling Data Kosong (Hero yang tidak pernah dipick/ban)
     # Hero seperti 'Aamon' akan punya stats NaN. Kita isi dengan 0.
@@ -186,29 +224,64 @@ def create_counter_matrix(df_counter_silver):
     if df_counter_silver is None or df_counter_silver.empty:
         return pd.DataFrame()
         
-    lookup = df_counter_silver[['hero_name_normalized', 'counter_name_normalized', 'score']].copy()
+    id_cols = ['hero_id', 'counter_hero_id'] if 'counter_hero_id' in df_counter_silver.columns else []
+    lookup = df_counter_silver[['hero_name_normalized', 'counter_name_normalized', 'score'] + id_cols].copy()
     lookup.rename(columns={
         'hero_name_normalized': 'Target_Name', 
         'counter_name_normalized': 'Counter_Name',
-        'score': 'Score'
+        'score': 'Score',
+        'hero_id': 'Target_ID',
+        'counter_hero_id': 'Counter_ID'
     }, inplace=True)
     return lookup
 
 def run_gold3_pipeline():
     print('--- PIPELINE GOLD LAYER V3 (ENHANCED FEATURES) ---')
     
-    # 1. Load Silver
-    print('\n1. Loading Silver Data...')
-    df_silver = read_df_from_minio(BUCKET_NAME, "silver/silver_draft_enriched.parquet", file_format='parquet')
+    # 1. Batch silver yang baru / berubah sejak run terakhir (dibandingkan lewat ETag partisi)
+    print('\n1. Loading Silver Data (batch baru)...')
+    silver_batches = list_batches(BUCKET_NAME, SILVER_ENRICHED_PREFIX)
     # 2. load bronze untuk master data
     df_master = read_df_from_minio(BUCKET_NAME, "bronze/hero_stats/bronze_hero_stats.parquet", file_format='parquet')
     
-    if df_silver is None: return
+    if not silver_batches: return
     if df_master is None: return
 
+    df_state = load_state(BUCKET_NAME, GOLD_STATE_PATH, columns=[BATCH_KEY, 'silver_etag'])
+    done = dict(zip(df_state[BATCH_KEY], df_state['silver_etag']))
+    todo = sorted(b for b, etag in silver_batches.items() if done.get(b) != etag)
+    removed = set(done) - set(silver_batches)
+    print(f"   [INFO] {len(todo)} batch silver diproses, {len(removed)} batch dihapus, {len(silver_batches) - len(todo)} batch dari run sebelumnya.")
+
+    # Agregat per batch: statistik pick hero & fitur tim (step 5-6)
+    for batch_id in todo:
+        df_silver = read_batches(BUCKET_NAME, SILVER_ENRICHED_PREFIX, [batch_id], columns=GOLD_SILVER_COLS,
+                                 filters=GOLD_SILVER_FILTERS, partition_cols=SILVER_PARTITION_COLS)
+        if df_silver is None:
+            continue
+        write_batch(aggregate_hero_picks(df_silver), BUCKET_NAME, GOLD_HERO_AGG_PREFIX, batch_id)
+
+        # 5. Pick Features
+        print(f'\n5. Process Pick Features (batch={batch_id})...')
+        df_gold_picks = transform_gold_pick_features_v3(df_silver)
+        
+        # 6. Match Features (Role & Stats)
+        print('\n6. Process Team Agregation (Role & Stats)...')
+        write_batch(transform_gold_match_features_v3(df_gold_picks), BUCKET_NAME, GOLD_TEAM_PREFIX, batch_id)
+
+    for prefix in (GOLD_HERO_AGG_PREFIX, GOLD_TEAM_PREFIX):
+        delete_batches(BUCKET_NAME, prefix, removed)
+    df_state = pd.DataFrame({BATCH_KEY: list(silver_batches), 'silver_etag': list(silver_batches.values())})
+    upload_df_to_minio(df_state, BUCKET_NAME, GOLD_STATE_PATH, file_format='parquet')
+
+    # Gabung agregat semua batch (kecil: hero x batch dan 2 baris per match)
+    df_hero_agg = read_batches(BUCKET_NAME, GOLD_HERO_AGG_PREFIX)
+    df_gold_team = read_batches(BUCKET_NAME, GOLD_TEAM_PREFIX)
+    if df_hero_agg is None or df_gold_team is None: return
+
     # 3. Create Leaderboard (FULL HERO)
     print('\n2. Process Hero Leaderboard...')
-    df_dashboard = create_hero_leaderboard(df_silver, df_master)
+    df_dashboard = create_hero_leaderboard(None, df_master, df_hero_agg)
     upload_df_to_minio(df_dashboard, BUCKET_NAME, "gold/hero_leaderboard.parquet", file_format='parquet')
     print(f"DONE: Leaderboard saved ({len(df_dashboard)} heroes). Aamon harusnya ada sekarang.")
 
@@ -221,14 +294,12 @@ def run_gold3_pipeline():
         upload_df_to_minio(df_lookup, BUCKET_NAME, "gold/hero_counter_lookup.parquet", file_format='parquet')
         print("DONE: Counter Lookup saved.")
 
-    # 5. Pick Features
-    print('\n5. Process Pick Features...')
-    df_gold_picks = transform_gold_pick_features_v3(df_silver)
-    
-    # 6. Match Features (Role & Stats)
-    print('\n6. Process Team Agregation (Role & Stats)...')
-    df_gold_team = transform_gold_match_features_v3(df_gold_picks)
-    
+    # 4b. Serving bundle (registry hero + statistik + counter + model) untuk cold start aplikasi
+    try:
+        publish_serving_bundle(df_dashboard, df_lookup if not df_lookup.empty else None)
+    except Exception as e:
+        print(f"[WARNING] Serving bundle gagal dibuat: {e}")
+
     # 7. Final Training Data (Team Strength)
     print('\n7. Process Final Training Data (Team Strength)...')
     df_training = transform_gold_match_level_v3(df_gold_team)
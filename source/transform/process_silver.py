@@ -6,12 +6,22 @@ import ast
 # Setup path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-from source.utils.minio_helper import read_df_from_minio, upload_df_to_minio
+from source.utils.minio_helper import read_df_from_minio, upload_df_to_minio, read_partitioned_df_from_minio
 from source.utils.global_helper import get_timestamp
-from source.utils.helper_silver import calculate_avg_counter_score
+from source.utils.hero_registry import HeroRegistry
+from source.transform.process_bronze import BRONZE_MATCHES_PREFIX, MATCH_PARTITION_COLS
+from source.utils.incremental import (BATCH_KEY, match_content_ids, frame_signature, new_batch_id, list_batches,
+                                      write_batch, delete_batches, drop_matches_from_batches, load_state,
+                                      select_changed_matches, update_state, stale_by_batch)
 
 BUCKET_NAME = "mlbb-lake"
 
+# Output silver dipartisi per batch run, lalu per region/season seperti bronze (lihat source/utils/incremental.py)
+SILVER_DRAFT_PREFIX = "silver/silver_draft_heroes"
+SILVER_ENRICHED_PREFIX = "silver/silver_draft_enriched"
+SILVER_PARTITION_COLS = MATCH_PARTITION_COLS
+SILVER_STATE_PATH = "silver/_state/silver_matches.parquet"
+
 def ensure_list(val):
     """
     Memaksa input menjadi list python standar [].
@@ -46,123 +56,175 @@ def ensure_list(val):
     return []
 # -------------------------------------------------
 
+DRAFT_LIST_COLS = ['left_picks_normalized', 'left_bans_normalized', 'right_picks_normalized', 'right_bans_normalized']
+DRAFT_COLS = ['match_id', 'region', 'tournament', 'team_side', 'team_name', 'phase', 'order',
+              'hero_name_normalized', 'is_winner_team', 'source_file', 'ingested_at']
+
+def as_lists(values):
+    """
+    Versi kolom dari ensure_list: sel list / numpy array (hasil parquet) dipakai apa adanya,
+    hanya sel lain (string "['a', 'b']", NaN, None) yang lewat ensure_list per sel.
+    """
+    is_seq = values.map(type).isin([list, np.ndarray])
+    if is_seq.all():
+        return values
+    values = values.copy()
+    values[~is_seq] = pd.Series([ensure_list(v) for v in values[~is_seq]], index=values.index[~is_seq], dtype=object)
+    return values
+
+def match_ids(df_matches):
+    """match_id stabil dari bronze (hash konten) jika ada, selain itu posisi baris + 1 (data lama)."""
+    if 'match_id' in df_matches.columns:
+        return df_matches['match_id'].to_numpy()
+    return (df_matches.index + 1).to_numpy()
+
 def transform_explode_draft(df_matches):
+    """
+    Satu baris per hero per fase (pick/ban) per sisi, tanpa loop per match:
+    tiap kolom list di-explode, `order` dari cumcount per (match, sisi, fase),
+    is_winner_team dari perbandingan string vektor. Urutan baris sama seperti
+    versi loop: per match -> left pick, left ban, right pick, right ban.
+    Kolom list ikut dinormalisasi di df_matches (dipakai hitung skor counter).
+    """
     print('--LOGIC: Explode drafts')
-    exploded_rows = []
-    
-    # Kita apply ensure_list dulu ke semua kolom target agar aman
-    target_cols = ['left_picks_normalized', 'left_bans_normalized', 'right_picks_normalized', 'right_bans_normalized']
-    for col in target_cols:
+    for col in DRAFT_LIST_COLS:
         if col in df_matches.columns:
-            df_matches[col] = df_matches[col].apply(ensure_list)
+            df_matches[col] = as_lists(df_matches[col])
 
-    for idx, row in df_matches.iterrows():
-        match_id = idx + 1
-        winner = row['winner_match']
-        
-        sides = [
-            ('left', row['team_left'], row['left_picks_normalized'], row['left_bans_normalized']),
-            ('right', row['team_right'], row['right_picks_normalized'], row['right_bans_normalized'])
-        ]
-        
-        for side_name, team_name, picks, bans in sides:
-            is_winner = (str(winner).strip().lower() == str(team_name).strip().lower())
-            
-            # Karena sudah diapply ensure_list, picks PASTI berupa list (bisa kosong)
-            for i, hero in enumerate(picks):
-                exploded_rows.append({
-                    'match_id': match_id,
-                    'region': row['region'],
-                    'tournament': row['tournament'],
-                    'team_side': side_name,
-                    'team_name': team_name,
-                    'phase': 'pick',
-                    'order': i + 1,
-                    'hero_name_normalized': hero,
-                    'is_winner_team': is_winner,
-                    'source_file': row['source_file'],
-                    'ingested_at': row['ingested_at']
-                })
-            
-            for i, hero in enumerate(bans):
-                exploded_rows.append({
-                    'match_id': match_id,
-                    'region': row['region'],
-                    'tournament': row['tournament'],
-                    'team_side': side_name,
-                    'team_name': team_name,
-                    'phase': 'ban',
-                    'order': i + 1,
-                    'hero_name_normalized': hero,
-                    'is_winner_team': is_winner,
-                    'source_file': row['source_file'],
-                    'ingested_at': row['ingested_at']
-                })
-        
-    return pd.DataFrame(exploded_rows)
+    winner = df_matches['winner_match'].astype(str).str.strip().str.lower()
+    parts = []
+    for block, (side, team_col, phase) in enumerate([('left', 'team_left', 'pick'), ('left', 'team_left', 'ban'),
+                                                     ('right', 'team_right', 'pick'), ('right', 'team_right', 'ban')]):
+        list_col = f"{side}_{phase}s_normalized"
+        part = pd.DataFrame({
+            'match_id': match_ids(df_matches),
+            'region': df_matches['region'].to_numpy(),
+            'tournament': df_matches['tournament'].to_numpy(),
+            'season': df_matches['season'].to_numpy() if 'season' in df_matches.columns else None,
+            'team_side': side,
+            'team_name': df_matches[team_col].to_numpy(),
+            'phase': phase,
+            'hero_name_normalized': df_matches[list_col].to_numpy(),
+            'is_winner_team': (winner == df_matches[team_col].astype(str).str.strip().str.lower()).to_numpy(),
+            'source_file': df_matches['source_file'].to_numpy(),
+            'ingested_at': df_matches['ingested_at'].to_numpy(),
+            '_row': np.arange(len(df_matches)),
+            '_block': block,
+        })
+        # hero_id dari bronze (list sejajar list nama) jika ada
+        id_col = f"{side}_{phase}s_id"
+        explode_cols = ['hero_name_normalized']
+        if id_col in df_matches.columns:
+            part['hero_id'] = as_lists(df_matches[id_col]).to_numpy()
+            explode_cols.append('hero_id')
+
+        # List kosong tidak menghasilkan baris (explode akan memberi NaN)
+        part = part[part['hero_name_normalized'].map(len).to_numpy() > 0]
+        part = part.explode(explode_cols)
+        part['order'] = part.groupby(level=0).cumcount() + 1
+        parts.append(part.reset_index(drop=True))
+
+    # season (kunci partisi) hanya ada di bronze baru
+    draft_cols = DRAFT_COLS[:3] + ['season'] + DRAFT_COLS[3:] if 'season' in df_matches.columns else DRAFT_COLS
+    if not parts or all(part.empty for part in parts):
+        return pd.DataFrame(columns=draft_cols)
+
+    df_draft = pd.concat(parts, ignore_index=True)
+    df_draft = df_draft.sort_values(['_row', '_block', 'order'], kind='stable').reset_index(drop=True)
+    if 'hero_id' in df_draft.columns:
+        df_draft['hero_id'] = df_draft['hero_id'].astype(np.int16)
+    id_cols = ['hero_id'] if 'hero_id' in df_draft.columns else []
+    return df_draft[draft_cols + id_cols]
+
+def team_matrix(lists, width, fill):
+    """Kolom list per match -> array (N, width) rata kiri, slot kosong diisi `fill`; plus panjang tiap list."""
+    lengths = lists.map(len).to_numpy() if len(lists) else np.zeros(0, dtype=np.int64)
+    flat = np.concatenate([np.asarray(v, dtype=object) for v in lists if len(v)]) if lengths.sum() else np.empty(0, dtype=object)
+    out = np.full((len(lists), width), fill, dtype=object)
+    rows = np.repeat(np.arange(len(lists)), lengths)
+    cols = np.arange(len(flat)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    out[rows, cols] = flat
+    return out, lengths
 
 def transform_calculate_scores(df_matches, df_counter):
     """
     TABLE 1: Menghitung skor counter terhadap tim lawan
+    Skor = rata-rata (keuntungan - kerugian) hero vs tiap musuh. Semua match di-encode jadi
+    array hero index (N, 2, 5), lalu skor 10 pick per match diambil sekaligus dari matrix
+    counter dense (satu gather). Pakai hero_id registry jika tersedia, selain itu index dari nama.
     """
     print('--LOGIC: Hitung skor counter')
-    
-    counter_dict = {}
-    if df_counter is not None:
-        for hero, counter, score in zip(df_counter['hero_name_normalized'], df_counter['counter_name_normalized'], df_counter['score']):
-            # paksa string & lowercase saat bikin kamus
-            #  h = str(hero).strip().lower()
-            #  c = str(counter).strip().lower()
-            #  counter_dict[(h, c)] = score
-        
-            counter_dict[(hero, counter)] = score
-        
-    match_counter_scores = []
-    
-    # hitung skor per match
-    for idx, row in df_matches.iterrows():
-        match_id = idx + 1
-        left_heroes = row.get('left_picks_normalized', [])
-        right_heroes = row.get('right_picks_normalized', [])
-        
-        # validasi tipe data list
-        if not isinstance(left_heroes, (list, np.ndarray)): left_heroes = []
-        if not isinstance(right_heroes, (list, np.ndarray)): right_heroes = []
+    sides = ['left', 'right']
+    empty = pd.Series([[]] * len(df_matches), index=df_matches.index, dtype=object)
+    pick_lists = {side: as_lists(df_matches.get(f'{side}_picks_normalized', empty)) for side in sides}
+    width = max([int(lists.map(len).max()) for lists in pick_lists.values() if len(lists)] + [0])
+    if width == 0:
+        return pd.DataFrame(columns=['match_id', 'team_side', 'hero_name_normalized', 'counter_score'])
 
-        # skor tim kiri (vs Kanan)
-        for hero_raw, hero_clean in zip(left_heroes, left_heroes):
-            score = calculate_avg_counter_score(hero_clean, right_heroes, counter_dict)
-        
-        match_counter_scores.append({
-            'match_id': match_id, 
-            'team_side': 'left', 
-            'hero_name_normalized': hero_raw, 
-            'counter_score': score
-        })
-        
-    # skor tim kanan (vs Kiri)
-    for hero_raw, hero_clean in zip(right_heroes, right_heroes):
-        score = calculate_avg_counter_score(hero_clean, left_heroes, counter_dict)
-        match_counter_scores.append({
-            'match_id': match_id, 
-            'team_side': 'right', 
-            'hero_name_normalized': hero_raw, 
-            'counter_score': score
-        })
+    names, lengths = zip(*(team_matrix(pick_lists[side], width, None) for side in sides))
+    names, lengths = np.stack(names, axis=1), np.stack(lengths, axis=1)  # (N, 2, width), (N, 2)
+
+    has_counter = df_counter is not None and not df_counter.empty
+    use_ids = (has_counter and {'hero_id', 'counter_hero_id'} <= set(df_counter.columns)
+               and all(f'{side}_picks_id' in df_matches.columns for side in sides))
+    if use_ids:
+        ids = np.stack([team_matrix(as_lists(df_matches[f'{side}_picks_id']), width, -1)[0] for side in sides], axis=1).astype(np.int64)
+        hero_idx, counter_idx = (df_counter[col].to_numpy(dtype=np.int64) for col in ('hero_id', 'counter_hero_id'))
+    else:
+        # Index dari nama: factorize gabungan nama counter & match (None -> -1)
+        counter_names = [df_counter[col].to_numpy(dtype=object) for col in ('hero_name_normalized', 'counter_name_normalized')] if has_counter else [np.empty(0, dtype=object)] * 2
+        codes, _ = pd.factorize(np.concatenate(counter_names + [names.ravel()]))
+        n_counter = len(counter_names[0])
+        hero_idx, counter_idx = codes[:n_counter], codes[n_counter:2 * n_counter]
+        ids = codes[2 * n_counter:].reshape(names.shape)
+
+    # Matrix net dense; index terakhir = pad (slot kosong / hero tidak dikenal) bernilai 0
+    pad = max(int(ids.max()), int(hero_idx.max(initial=-1)), int(counter_idx.max(initial=-1))) + 1
+    advantage = np.zeros((pad + 1, pad + 1), dtype=np.float64)
+    if has_counter:
+        known = (hero_idx >= 0) & (counter_idx >= 0)
+        advantage[hero_idx[known], counter_idx[known]] = df_counter['score'].to_numpy(dtype=np.float64)[known]
+    net = advantage - advantage.T
+    ids = np.where(ids < 0, pad, ids)
 
-    return pd.DataFrame(match_counter_scores)
+    # (N, 2, width, width): hero sisi s vs tiap slot musuh (sisi kebalikan)
+    enemy = ids[:, ::-1]
+    total = net[ids[:, :, :, None], enemy[:, :, None, :]].sum(axis=-1)
+    enemy_count = lengths[:, ::-1, None]
+    scores = np.round(np.divide(total, enemy_count, out=np.zeros_like(total), where=enemy_count > 0), 2)
+
+    # Hanya slot yang terisi; urutan: per match -> pick kiri lalu pick kanan
+    filled = np.arange(width)[None, None, :] < lengths[:, :, None]
+    match_id = np.broadcast_to(match_ids(df_matches)[:, None, None], filled.shape)
+    team_side = np.broadcast_to(np.array(sides, dtype=object)[None, :, None], filled.shape)
+    df_scores = pd.DataFrame({
+        'match_id': match_id[filled],
+        'team_side': team_side[filled],
+        'hero_name_normalized': names[filled],
+        'counter_score': scores[filled],
+    })
+    if use_ids:
+        df_scores['hero_id'] = np.where(ids[filled] == pad, -1, ids[filled]).astype(np.int16)
+    return df_scores
+
+def with_hero_id(df, registry, key_col='hero_name_normalized', id_col='hero_id'):
+    """Tambahkan kolom hero_id dari registry jika belum ada (bronze lama / hasil hitung per nama)."""
+    if df is not None and id_col not in df.columns:
+        df = df.copy()
+        df[id_col] = registry.ids_for_keys(df[key_col]) if not df.empty else pd.Series(dtype='int16')
+    return df
 
 def transform_enrich_draft(df_draft, df_stats, df_meta, df_scores):
-    print("--LOGIC: Merge semua data sources")
+    print("--LOGIC: Merge semua data sources (join hero_id)")
     
     # Merge Stats
-    df_enriched = pd.merge(df_draft, df_stats[['hero_name_normalized', 'win_rate', 'pick_rate', 'ban_rate', 'role', 'lane', 'speciality']], how='left', on='hero_name_normalized')
+    df_enriched = pd.merge(df_draft, df_stats[['hero_id', 'win_rate', 'pick_rate', 'ban_rate', 'role', 'lane', 'speciality']], how='left', on='hero_id')
     
     # Merge Meta
-    df_enriched = pd.merge(df_enriched, df_meta[['hero_name_normalized', 'tier_score', 'score']], how='left', on='hero_name_normalized', suffixes=('', '_meta'))
+    df_enriched = pd.merge(df_enriched, df_meta[['hero_id', 'tier_score', 'score']], how='left', on='hero_id', suffixes=('', '_meta'))
     
     # Merge Counter Scores
-    df_enriched = pd.merge(df_enriched, df_scores, how='left', on=['match_id', 'team_side', 'hero_name_normalized'])
+    df_enriched = pd.merge(df_enriched, df_scores.drop(columns=['hero_name_normalized']), how='left', on=['match_id', 'team_side', 'hero_id'])
     
     fill_values = {'win_rate': 0.0, 'pick_rate': 0.0, 'tier_score': 0, 'counter_score': 0.0, 'role': 'Unknown', 'lane': 'Unknown', 'speciality': 'Unknown'}
     df_final = df_enriched.fillna(value=fill_values)
@@ -174,12 +236,12 @@ def generate_quality_report(df_raw_enriched):
     # Skip logic complex utk sementara biar cepat
     return None
 
-def run_silver_pipeline():
+def run_silver_pipeline(full_refresh=False):
     print('--- PIPELINE TRASNFORMING SILVER LAYER ---')
     
     # 1. Load Data
     # Penting: file_format='parquet' karena kamu simpan parquet
-    df_matches = read_df_from_minio(BUCKET_NAME, "bronze/tournament_matches/bronze_mpl_matches.parquet", file_format='parquet')
+    df_matches = read_partitioned_df_from_minio(BUCKET_NAME, BRONZE_MATCHES_PREFIX, partition_cols=MATCH_PARTITION_COLS)
     
     if df_matches is None or len(df_matches) == 0:
         print("Bronze data not found!")
@@ -191,32 +253,80 @@ def run_silver_pipeline():
     df_meta = read_df_from_minio(BUCKET_NAME, "bronze/meta/bronze_hero_meta.parquet", file_format='parquet')
     df_counter = read_df_from_minio(BUCKET_NAME, "bronze/counter_hero/bronze_hero_counter.parquet", file_format='parquet')
 
-    # 2. Transform Table 1
-    print("\n2/5 Create Table 1: Silver Draft Heroes...")
-    df_draft_heroes = transform_explode_draft(df_matches)
-    
-    # CEK HASIL DISINI
-    print(f"   [CHECK] Generated {len(df_draft_heroes)} rows (Expected approx: {len(df_matches)*10})")
-    
-    upload_df_to_minio(df_draft_heroes, BUCKET_NAME, "silver/silver_draft_heroes.parquet", file_format='parquet')
+    # Registry hero dari bronze: semua join silver memakai hero_id (int16)
+    registry = HeroRegistry.load(BUCKET_NAME)
+    if len(registry) == 0:
+        print("Hero registry not found! Jalankan bronze pipeline dulu.")
+        return
+    df_stats = with_hero_id(df_stats, registry)
+    df_meta = with_hero_id(df_meta, registry)
 
-    # 3. Calculate Scores
-    print("\n3/5 Calculate Counter Scores...")
-    df_scores = transform_calculate_scores(df_matches, df_counter)
-    
-    # 4. Enrich
-    print("\n4/5 Create Table 2: Silver Enriched Data...")
-    df_final, _ = transform_enrich_draft(df_draft_heroes, df_stats, df_meta, df_scores)
-    
-    upload_df_to_minio(df_final, BUCKET_NAME, "silver/silver_draft_enriched.parquet", file_format='parquet')
-    print(f"--DONE: silver_draft_enriched.parquet ({len(df_final)} rows)")
+    # match_id stabil (hash identitas game) + content_hash untuk deteksi game yang berubah;
+    # dihitung bronze, dihitung di sini hanya untuk bronze lama yang belum punya kolomnya
+    if not {'match_id', 'content_hash'} <= set(df_matches.columns):
+        df_matches['match_id'], df_matches['content_hash'] = match_content_ids(df_matches)
+    df_matches = df_matches.drop_duplicates(subset='match_id', keep='last').reset_index(drop=True)
+
+    # Stats / meta / counter berubah -> enrich & skor semua match ikut berubah: proses ulang semua
+    dims_signature = '|'.join(str(frame_signature(df)) for df in (df_stats, df_meta, df_counter))
+    df_state = load_state(BUCKET_NAME, SILVER_STATE_PATH)
+    full = full_refresh or df_state.empty or df_state['dims_signature'].iloc[0] != dims_signature
+    if full:
+        changed, df_stale = np.ones(len(df_matches), dtype=bool), df_state.iloc[0:0]
+    else:
+        # Partisi yang tidak tercatat di state (run sebelumnya gagal di tengah) dibuang dulu
+        for prefix in (SILVER_DRAFT_PREFIX, SILVER_ENRICHED_PREFIX):
+            delete_batches(BUCKET_NAME, prefix, set(list_batches(BUCKET_NAME, prefix)) - set(df_state[BATCH_KEY]))
+        changed, df_stale = select_changed_matches(df_matches, df_state)
+
+    df_new = df_matches[changed].reset_index(drop=True)
+    print(f"   [INFO] {'Full refresh' if full else 'Inkremental'}: {len(df_new)} match baru/berubah, {len(df_stale)} versi lama dibuang.")
+    if df_new.empty and df_stale.empty:
+        print("\nSILVER PIPELINE COMPLETED (tidak ada perubahan sejak run terakhir)")
+        return
+
+    batch_id = new_batch_id()
+    df_final = None
+    if not df_new.empty:
+        # 2. Transform Table 1
+        print("\n2/5 Create Table 1: Silver Draft Heroes...")
+        df_draft_heroes = with_hero_id(transform_explode_draft(df_new), registry)
+        
+        # CEK HASIL DISINI
+        print(f"   [CHECK] Generated {len(df_draft_heroes)} rows (Expected approx: {len(df_new)*10})")
+        
+        write_batch(df_draft_heroes, BUCKET_NAME, SILVER_DRAFT_PREFIX, batch_id, SILVER_PARTITION_COLS)
+
+        # 3. Calculate Scores
+        print("\n3/5 Calculate Counter Scores...")
+        df_scores = with_hero_id(transform_calculate_scores(df_new, df_counter), registry)
+        
+        # 4. Enrich
+        print("\n4/5 Create Table 2: Silver Enriched Data...")
+        df_final, _ = transform_enrich_draft(df_draft_heroes, df_stats, df_meta, df_scores)
+        
+        write_batch(df_final, BUCKET_NAME, SILVER_ENRICHED_PREFIX, batch_id, SILVER_PARTITION_COLS)
+        print(f"--DONE: {SILVER_ENRICHED_PREFIX} batch={batch_id} ({len(df_final)} rows)")
+
+    # 5. Buang versi lama dari partisi sebelumnya, lalu simpan state + watermark
+    for prefix in (SILVER_DRAFT_PREFIX, SILVER_ENRICHED_PREFIX):
+        if full:
+            delete_batches(BUCKET_NAME, prefix, set(list_batches(BUCKET_NAME, prefix)) - {batch_id})
+        else:
+            drop_matches_from_batches(BUCKET_NAME, prefix, stale_by_batch(df_stale), SILVER_PARTITION_COLS)
+
+    df_state = update_state(df_state.iloc[0:0] if full else df_state, df_stale, df_new.assign(**{BATCH_KEY: batch_id}))
+    df_state['dims_signature'] = dims_signature
+    upload_df_to_minio(df_state, BUCKET_NAME, SILVER_STATE_PATH, file_format='parquet')
     
     # --- STEP 4: PREVIEW DATA ---
-    print('\n4/4 Preview Data untuk verifikasi:')
-    print('Sample 2 baris features tim:')
-    print(df_final[['team_name', 'team_side', 'hero_name_normalized', 'pick_rate', 'win_rate', 'tier_score', 'counter_score', 'is_winner_team']].head(40))
+    if df_final is not None:
+        print('\n4/4 Preview Data untuk verifikasi:')
+        print('Sample 2 baris features tim:')
+        print(df_final[['team_name', 'team_side', 'hero_name_normalized', 'pick_rate', 'win_rate', 'tier_score', 'counter_score', 'is_winner_team']].head(40))
     
     print("\nSILVER PIPELINE COMPLETED")
 
 if __name__ == "__main__":
-    run_silver_pipeline()
\ No newline at end of file
+    # --full: abaikan state & watermark, proses ulang semua match
+    run_silver_pipeline(full_refresh='--full' in sys.argv)
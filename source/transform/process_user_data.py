@@ -3,12 +3,28 @@ import sys
 import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-from source.utils.minio_helper import read_df_from_minio, upload_df_to_minio
+from source.utils.minio_helper import read_df_from_minio, upload_df_to_minio, upload_partitioned_df_to_minio, read_partitioned_df_from_minio
 from source.utils.global_helper import get_timestamp
 from source.utils.helper_bronze import normalize_hero_name
+from source.utils.hero_registry import HeroRegistry, hero_keys
+from source.ml.serving_bundle import publish_serving_bundle
 
 BUCKET_NAME = "mlbb-lake"
 
+# History user dipartisi per username (hive): .../username=budi/part-0.parquet
+USER_BRONZE_PREFIX = "bronze/user_history/user_match_history"
+USER_SILVER_PREFIX = "silver/user_history/user_match_enriched"
+USER_PARTITION_COLS = ['username']
+
+def read_user_history(username=None, columns=None):
+    """
+    History silver user. Dengan username hanya folder username=<nama> yang dibaca,
+    columns membatasi kolom yang di-download. None jika belum ada data.
+    """
+    filters = [('username', '==', str(username).strip().lower())] if username is not None else None
+    return read_partitioned_df_from_minio(BUCKET_NAME, USER_SILVER_PREFIX, columns=columns, filters=filters,
+                                          partition_cols=USER_PARTITION_COLS)
+
 # --- 1. BRONZE LAYER: Raw Ingestion ---
 def process_user_bronze():
     print("[User Pipeline] Processing Bronze...")
@@ -21,7 +37,7 @@ def process_user_bronze():
     # metadata manual
     df['ingested_at'] = get_timestamp()
 
-    upload_df_to_minio(df, BUCKET_NAME, "bronze/user_history/user_match_history.parquet", file_format='parquet')
+    upload_partitioned_df_to_minio(df, BUCKET_NAME, USER_BRONZE_PREFIX, USER_PARTITION_COLS)
     print("[User Pipeline] Bronze Saved.")
     return df
 
@@ -29,7 +45,7 @@ def process_user_bronze():
 def process_user_silver():
     print("[User Pipeline] Processing Silver...")
     
-    df = read_df_from_minio(BUCKET_NAME, "bronze/user_history/user_match_history.parquet", file_format='parquet')
+    df = read_partitioned_df_from_minio(BUCKET_NAME, USER_BRONZE_PREFIX, partition_cols=USER_PARTITION_COLS)
     if df is None or df.empty: return None
 
     # multi user
@@ -44,7 +60,7 @@ def process_user_silver():
     df['is_win'] = df['result'].apply(lambda x: 1 if str(x).strip().lower() in ['win', 'victory'] else 0)
 
     # Normalisasi nama hero user
-    df['user_hero_id'] = df['user_hero'].apply(lambda x: normalize_hero_name(str(x)))
+    df['user_hero_id'] = hero_keys(df['user_hero'].astype(str)).to_numpy()
 
     # Parsing tim (String -> List)
     def parse_team_list(team_str):
@@ -56,7 +72,7 @@ def process_user_silver():
     # Simpan kolom penting termasuk 'username'
     df_silver = df[['timestamp', 'username', 'user_hero_id', 'my_team_list', 'is_win', 'ingested_at']]
     
-    upload_df_to_minio(df_silver, BUCKET_NAME, "silver/user_history/user_match_enriched.parquet", file_format='parquet')
+    upload_partitioned_df_to_minio(df_silver, BUCKET_NAME, USER_SILVER_PREFIX, USER_PARTITION_COLS)
     print("[User Pipeline] Silver Saved.")
     return df_silver
 
@@ -64,7 +80,7 @@ def process_user_silver():
 def process_user_gold():
     print("[User Pipeline] Processing Gold...")
     
-    df = read_df_from_minio(BUCKET_NAME, "silver/user_history/user_match_enriched.parquet", file_format='parquet')
+    df = read_user_history(columns=['username', 'user_hero_id', 'my_team_list', 'is_win'])
     if df is None or df.empty: return
 
     # personal stats user
@@ -76,7 +92,11 @@ def process_user_gold():
     ).reset_index()
     
     df_personal['win_rate'] = df_personal['total_wins'] / df_personal['total_picks']
-    df_personal['hero_id'] = df_personal['user_hero_id'] 
+    # hero_id int16 dari registry (-1 = hero tidak dikenal), key nama tetap disimpan.
+    # Registry belum ada (bronze belum jalan): hero_id tetap berisi key nama seperti dulu
+    registry = HeroRegistry.load(BUCKET_NAME)
+    df_personal['hero_key'] = df_personal['user_hero_id']
+    df_personal['hero_id'] = registry.ids_for_keys(df_personal['hero_key']) if len(registry) else df_personal['hero_key']
     
     upload_df_to_minio(df_personal, BUCKET_NAME, "gold/user_history/user_hero_performance.parquet", file_format='parquet')
     print(f"Saved Personal Stats: {len(df_personal)} rows (User x Hero)")
@@ -96,11 +116,18 @@ def process_user_gold():
     ).reset_index()
 
     df_synergy_agg['synergy_wr'] = df_synergy_agg['wins_together'] / df_synergy_agg['matches_together']
-    df_synergy_agg['hero_id'] = df_synergy_agg['teammate_id']
+    df_synergy_agg['hero_key'] = df_synergy_agg['teammate_id']
+    df_synergy_agg['hero_id'] = registry.ids_for_keys(df_synergy_agg['hero_key']) if len(registry) else df_synergy_agg['hero_key']
 
     upload_df_to_minio(df_synergy_agg, BUCKET_NAME, "gold/user_history/user_team_synergy.parquet", file_format='parquet')
     print(f"Saved Synergy Stats: {len(df_synergy_agg)} rows (User x Teammate)")
 
+    # Statistik user berubah -> bundle serving ikut diperbarui
+    try:
+        publish_serving_bundle(df_user_perf=df_personal, df_synergy=df_synergy_agg)
+    except Exception as e:
+        print(f"[WARNING] Serving bundle gagal dibuat: {e}")
+
 if __name__ == "__main__":
     process_user_bronze()
     process_user_silver()
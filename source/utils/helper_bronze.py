@@ -1,5 +1,6 @@
 import re
 from datetime import datetime
+from functools import lru_cache
 
 HERO_ALIAS = {
    "wu ze tian": "zetian",
@@ -12,9 +13,16 @@ def get_timestamp():
    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 def normalize_hero_name(name: str) -> str:
+   """
+   Normalizer kanonik nama hero (satu-satunya di project): 'Yi Sun-shin' -> 'yisunshin'.
+   Hasil di-cache per nama mentah, jadi regex hanya jalan sekali per nama unik.
+   """
    if not isinstance(name, str):
       return None
+   return _normalize_hero_name(name)
 
+@lru_cache(maxsize=8192)
+def _normalize_hero_name(name: str) -> str:
    name = name.lower().strip()
    name = name.replace("-", " ")
 
@@ -1,11 +1,11 @@
 import numpy as np
-import re
+
+from source.utils.helper_bronze import normalize_hero_name
 
 def normalize_name_strict(text):
+   """Alias lama: key kanonik dari normalize_hero_name (cached), "" untuk input bukan string."""
    if not isinstance(text, str): return ""
-   clean = text.lower()
-   clean = re.sub(r'[^a-z0-9]', '', clean) 
-   return clean
+   return normalize_hero_name(text)
 
 def calculate_avg_counter_score(hero_name, enemy_team_list, counter_dict):
    hero_norm = normalize_name_strict(hero_name)
@@ -0,0 +1,114 @@
+"""
+Registry hero kanonik: key nama hero (hasil normalize_hero_name) -> hero_id int16 yang stabil.
+
+hero_id memakai 'Hero ID' dari scraper (meta tier / counter mlbb.io) jika ada; hero yang
+belum punya id dari sumber mana pun mendapat id baru setelah id terbesar. Id yang sudah
+tercatat tidak pernah berubah, jadi array yang di-index hero_id tetap valid antar run.
+
+Artifact: bronze/hero_registry/hero_registry.parquet (hero_id, hero_key, hero_name).
+Bronze mengisi registry dan menulis kolom hero_id; silver/gold join memakai hero_id.
+"""
+import numpy as np
+import pandas as pd
+
+from source.utils.helper_bronze import normalize_hero_name
+
+HERO_REGISTRY_PATH = "bronze/hero_registry/hero_registry.parquet"
+UNKNOWN_HERO_ID = -1
+MAX_HERO_ID = np.iinfo(np.int16).max
+
+def hero_keys(names):
+   """Series/list nama hero mentah -> Series key kanonik (normalisasi sekali per nama unik)."""
+   names = pd.Series(names, dtype=object)
+   mapping = {name: normalize_hero_name(name) for name in pd.unique(names.dropna())}
+   return names.map(mapping)
+
+class HeroRegistry:
+   def __init__(self, df=None):
+      self.id_of = {}    # hero_key -> hero_id
+      self.name_of = {}  # hero_id -> nama tampilan
+      if df is not None and not df.empty:
+         for hero_id, key, name in zip(df['hero_id'], df['hero_key'], df['hero_name']):
+            self.id_of[key] = int(hero_id)
+            self.name_of.setdefault(int(hero_id), name)
+
+   @classmethod
+   def load(cls, bucket_name):
+      """Registry dari MinIO; registry kosong jika belum pernah dibuat."""
+      from source.utils.minio_helper import read_df_from_minio
+      return cls(read_df_from_minio(bucket_name, HERO_REGISTRY_PATH, file_format='parquet'))
+
+   def save(self, bucket_name):
+      from source.utils.minio_helper import upload_df_to_minio
+      upload_df_to_minio(self.to_frame(), bucket_name, HERO_REGISTRY_PATH, file_format='parquet')
+
+   def to_frame(self):
+      df = pd.DataFrame({'hero_key': list(self.id_of), 'hero_id': list(self.id_of.values())})
+      df['hero_id'] = df['hero_id'].astype(np.int16)
+      df['hero_name'] = df['hero_id'].map(self.name_of)
+      return df.sort_values(['hero_id', 'hero_key']).reset_index(drop=True)
+
+   def __len__(self):
+      return len(self.id_of)
+
+   def register(self, names, source_ids=None):
+      """
+      Daftarkan nama hero (mentah) yang belum dikenal, lalu return array hero_id (int16).
+      source_ids: 'Hero ID' dari scraper sejajar `names` (boleh NaN); dipakai jika id itu belum terpakai.
+      """
+      names = pd.Series(names, dtype=object).reset_index(drop=True)
+      keys = hero_keys(names)
+      if source_ids is None:
+         source_ids = pd.Series(np.nan, index=keys.index)
+      source_ids = pd.to_numeric(pd.Series(source_ids).reset_index(drop=True), errors='coerce')
+
+      used = set(self.id_of.values())
+      pending = []
+      for key, name, source_id in zip(keys, names, source_ids):
+         if not key or key in self.id_of:
+            continue
+         if pd.notna(source_id) and 0 <= source_id <= MAX_HERO_ID and int(source_id) not in used:
+            self._add(key, int(source_id), name)
+            used.add(int(source_id))
+         else:
+            pending.append((key, name))
+
+      # Hero tanpa 'Hero ID' dari scraper: id baru setelah id terbesar
+      next_id = max(used, default=0) + 1
+      for key, name in pending:
+         if key in self.id_of:
+            continue
+         if next_id > MAX_HERO_ID:
+            raise ValueError(f"hero_id melebihi batas int16 ({MAX_HERO_ID})")
+         self._add(key, next_id, name)
+         next_id += 1
+      return self.ids_for_keys(keys)
+
+   def _add(self, key, hero_id, name):
+      self.id_of[key] = hero_id
+      self.name_of.setdefault(hero_id, name)
+
+   def ids(self, names):
+      """Nama hero mentah -> array hero_id int16, UNKNOWN_HERO_ID untuk hero tidak dikenal."""
+      return self.ids_for_keys(hero_keys(names))
+
+   def ids_for_keys(self, keys):
+      """Key yang sudah dinormalisasi -> array hero_id int16 (tanpa normalisasi ulang)."""
+      ids = pd.Series(keys, dtype=object).map(self.id_of)
+      return ids.fillna(UNKNOWN_HERO_ID).to_numpy(dtype=np.int16)
+
+   def id_lists(self, key_lists):
+      """Kolom list key hero (mis. left_picks_normalized) -> list hero_id per baris."""
+      return [[self.id_of.get(key, UNKNOWN_HERO_ID) for key in keys] for keys in key_lists]
+
+def frame_hero_ids(df, column='hero_id'):
+   """
+   Kolom hero_id registry dari frame gold sebagai array int, atau None jika kolom tidak ada /
+   bukan integer registry (data lama, id berupa nama, ada id kosong/negatif).
+   """
+   if df is None or column not in df.columns:
+      return None
+   ids = pd.to_numeric(df[column], errors='coerce')
+   if ids.isna().any() or (ids < 0).any() or (ids > MAX_HERO_ID).any():
+      return None
+   return ids.to_numpy(dtype=np.int64)
@@ -0,0 +1,230 @@
+"""
+Pemrosesan inkremental silver/gold.
+
+- match_id stabil: hash dari identitas game (turnamen, region, match/game ke-berapa, tim),
+  bukan posisi baris, jadi id sama antar run dan antar urutan file bronze.
+- content_hash: hash isi game (pemenang + draft); berubah berarti game perlu diproses ulang.
+- watermark: ingested_at terbesar per source_file yang sudah diproses (state parquet).
+  Hanya baris bronze yang lebih baru dari watermark yang dicek content_hash-nya.
+- Output ditulis sebagai dataset parquet hive, partisi pertama per batch run:
+      <prefix>/batch=<batch_id>/region=ID/season=S16/part-0.parquet
+  Tiap match_id hanya ada di satu partisi (partisi lama di-rewrite jika game-nya berubah),
+  jadi gabungan semua partisi = tabel lengkap terkini.
+"""
+import hashlib
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from source.utils.minio_helper import (read_df_from_minio, list_objects_in_minio, delete_objects_from_minio,
+                                       upload_partitioned_df_to_minio, read_partitioned_df_from_minio)
+
+BATCH_KEY = 'batch'
+
+# Identitas satu game; kolom yang tidak ada di bronze dilewati
+MATCH_KEY_COLS = ['tournament', 'region', 'match_order', 'game_number', 'team_left', 'team_right']
+# Isi game: kalau salah satu berubah (koreksi hasil scrape), game diproses ulang
+MATCH_CONTENT_COLS = ['winner_match', 'left_picks_normalized', 'left_bans_normalized',
+                      'right_picks_normalized', 'right_bans_normalized']
+STATE_COLS = ['match_id', 'content_hash', 'source_file', 'ingested_at', BATCH_KEY]
+
+def _hash64(texts):
+   """Series teks -> array int64 positif (blake2b 8 byte, dihitung sekali per teks unik)."""
+   mapping = {text: int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big') >> 1
+              for text in pd.unique(texts)}
+   return texts.map(mapping).to_numpy(dtype=np.int64)
+
+def _joined(df, cols):
+   """Gabung kolom jadi satu teks per baris (list -> 'a,b,c'), untuk di-hash."""
+   parts = []
+   for col in cols:
+      values = df[col]
+      if values.map(lambda v: isinstance(v, (list, tuple, np.ndarray))).any():
+         values = values.map(lambda v: ','.join(map(str, v)) if isinstance(v, (list, tuple, np.ndarray)) else str(v))
+      parts.append(values.astype(str).str.strip().str.lower())
+   if not parts:
+      return pd.Series('', index=df.index)
+   joined = parts[0]
+   for part in parts[1:]:
+      joined = joined + '|' + part
+   return joined
+
+def match_content_ids(df_matches):
+   """Return (match_id int64, content_hash int64) per baris bronze match."""
+   key_cols = [c for c in MATCH_KEY_COLS if c in df_matches.columns]
+   content_cols = [c for c in MATCH_CONTENT_COLS if c in df_matches.columns]
+   # Tanpa kolom identitas, isi game sekaligus jadi identitasnya
+   match_id = _hash64(_joined(df_matches, key_cols or content_cols))
+   content_hash = _hash64(_joined(df_matches, key_cols + content_cols))
+   return match_id, content_hash
+
+def frame_signature(df, exclude=('ingested_at', 'processed_at')):
+   """Hash isi DataFrame (tanpa kolom waktu proses). None jika frame tidak ada."""
+   if df is None:
+      return None
+   df = df.drop(columns=[c for c in exclude if c in df.columns])
+   df = df[sorted(df.columns)].astype(str)
+   hashed = pd.util.hash_pandas_object(df, index=False).to_numpy()
+   return hashlib.blake2b(hashed.tobytes() + ','.join(df.columns).encode('utf-8'), digest_size=16).hexdigest()
+
+def new_batch_id():
+   """Id batch yang urut waktu, mis. '20261018T061500123456'."""
+   return datetime.now().strftime("%Y%m%dT%H%M%S%f")
+
+# --- PARTISI PER BATCH ---
+def _batch_prefix(prefix, batch_id):
+   return f"{prefix}/{BATCH_KEY}={batch_id}/"
+
+def list_batches(bucket_name, prefix):
+   """Batch yang ada di prefix -> dict {batch_id: versi} (hash ETag semua file di batch itu)."""
+   files = {}
+   for object_name, etag in list_objects_in_minio(bucket_name, f"{prefix}/{BATCH_KEY}=").items():
+      if object_name.endswith('.parquet'):
+         batch_id = object_name[len(prefix) + 1:].split('/')[0].split('=', 1)[1]
+         files.setdefault(batch_id, []).append(f"{object_name}:{etag}")
+   return {batch_id: hashlib.blake2b('|'.join(sorted(entries)).encode('utf-8'), digest_size=16).hexdigest()
+           for batch_id, entries in files.items()}
+
+def write_batch(df, bucket_name, prefix, batch_id, partition_cols=()):
+   """Tulis satu batch (isi lama batch ini diganti); di dalam batch dipartisi lagi per partition_cols."""
+   delete_batches(bucket_name, prefix, [batch_id])
+   upload_partitioned_df_to_minio(df.assign(**{BATCH_KEY: batch_id}), bucket_name, prefix, [BATCH_KEY] + list(partition_cols))
+
+def read_batches(bucket_name, prefix, batch_ids=None, columns=None, filters=None, partition_cols=()):
+   """
+   Gabungan batch (semua, atau hanya batch_ids) sebagai satu DataFrame; None jika kosong.
+   columns / filters diteruskan ke reader dataset (proyeksi kolom & pruning partisi / row group).
+   """
+   filters = list(filters or [])
+   if batch_ids is not None:
+      if not batch_ids:
+         return None
+      filters.append((BATCH_KEY, 'in', sorted(batch_ids)))
+   df = read_partitioned_df_from_minio(bucket_name, prefix, columns=columns, filters=filters or None,
+                                       partition_cols=[BATCH_KEY] + list(partition_cols))
+   if df is None:
+      return None
+   if BATCH_KEY in df.columns and (columns is None or BATCH_KEY not in columns):
+      df = df.drop(columns=BATCH_KEY)
+   return df
+
+def delete_batches(bucket_name, prefix, batch_ids):
+   names = [name for batch_id in batch_ids for name in list_objects_in_minio(bucket_name, _batch_prefix(prefix, batch_id))]
+   return delete_objects_from_minio(bucket_name, names) if names else 0
+
+def drop_matches_from_batches(bucket_name, prefix, match_ids_by_batch, partition_cols=()):
+   """
+   Buang match_id tertentu dari batch lama (game yang diganti versi baru / hilang dari bronze).
+   Batch yang jadi kosong dihapus. match_ids_by_batch: {batch_id: set(match_id)}.
+   """
+   for batch_id, match_ids in match_ids_by_batch.items():
+      df = read_batches(bucket_name, prefix, [batch_id], partition_cols=partition_cols)
+      if df is None:
+         continue
+      df = df[~df['match_id'].isin(match_ids)]
+      if df.empty:
+         delete_batches(bucket_name, prefix, [batch_id])
+      else:
+         write_batch(df, bucket_name, prefix, batch_id, partition_cols)
+
+# --- STATE & WATERMARK ---
+def load_state(bucket_name, path, columns=STATE_COLS):
+   """State parquet dari MinIO; frame kosong (kolom `columns`) jika belum pernah dibuat."""
+   df = read_df_from_minio(bucket_name, path, file_format='parquet')
+   if df is None:
+      return pd.DataFrame(columns=columns)
+   return df
+
+def _id_pairs(df):
+   return pd.MultiIndex.from_arrays([df['match_id'].astype(np.int64), df['content_hash'].astype(np.int64)])
+
+def carry_ingested_at(df_matches, df_previous):
+   """
+   ingested_at untuk bronze yang ditulis ulang: game yang tidak berubah (match_id & content_hash
+   sama dengan bronze sebelumnya) memakai ingested_at lamanya, hanya game baru/berubah yang
+   mendapat timestamp run ini. Tanpa ini watermark silver selalu terlewati.
+   """
+   cols = {'match_id', 'content_hash', 'ingested_at'}
+   if df_previous is None or df_previous.empty or not cols <= set(df_previous.columns):
+      return df_matches['ingested_at']
+   df_previous = df_previous.drop_duplicates(subset=['match_id', 'content_hash'], keep='first')
+   previous = pd.Series(df_previous['ingested_at'].to_numpy(), index=_id_pairs(df_previous))
+   kept = previous.reindex(_id_pairs(df_matches)).to_numpy()
+   return pd.Series(np.where(pd.isna(kept), df_matches['ingested_at'].to_numpy(), kept), index=df_matches.index)
+
+def watermark_candidates(df_matches, df_state):
+   """Mask baris bronze yang lebih baru dari watermark (ingested_at terbesar) source_file-nya."""
+   if df_state.empty:
+      return np.ones(len(df_matches), dtype=bool)
+   watermark = df_state.groupby('source_file')['ingested_at'].max()
+   seen_at = df_matches['source_file'].map(watermark)
+   return (seen_at.isna() | (df_matches['ingested_at'].astype(str) > seen_at.astype(str))).to_numpy()
+
+def select_changed_matches(df_matches, df_state):
+   """
+   Bandingkan bronze (sudah punya match_id & content_hash) dengan state match yang sudah diproses.
+
+   Watermark: baris dengan ingested_at <= watermark source_file-nya dilewati tanpa dicek.
+   Return (mask baris bronze yang baru/berubah, state baris yang harus dibuang dari output lama).
+   """
+   if df_state.empty:
+      return np.ones(len(df_matches), dtype=bool), df_state
+
+   candidate = watermark_candidates(df_matches, df_state)
+   changed = np.zeros(len(df_matches), dtype=bool)
+   if not candidate.any():
+      return changed, df_state.iloc[0:0]
+   # Hanya kandidat watermark yang dicocokkan ke state
+   known = _id_pairs(df_state)
+   changed[candidate] = ~_id_pairs(df_matches[candidate]).isin(known)
+
+   # Versi lama dari game yang berubah, plus game yang hilang dari source_file yang dibaca ulang
+   candidate_files = set(df_matches.loc[candidate, 'source_file'])
+   in_bronze = df_state['match_id'].isin(df_matches['match_id'])
+   replaced = df_state['match_id'].isin(df_matches.loc[changed, 'match_id'])
+   removed = df_state['source_file'].isin(candidate_files) & ~in_bronze
+   return changed, df_state[replaced | removed]
+
+def update_state(df_state, df_stale, df_new):
+   """State baru = state lama - baris usang + baris batch baru (kolom STATE_COLS)."""
+   kept = df_state[~df_state.index.isin(df_stale.index)]
+   return pd.concat([kept[STATE_COLS], df_new[STATE_COLS]], ignore_index=True)
+
+def stale_by_batch(df_stale):
+   """Baris state usang -> {batch_id: set(match_id)} untuk drop_matches_from_batches."""
+   return {batch_id: set(group['match_id']) for batch_id, group in df_stale.groupby(BATCH_KEY)}
+
+
+# TEST MANUAL: run kedua atas bronze yang sama tidak memilih baris apa pun
+if __name__ == "__main__":
+   df_bronze = pd.DataFrame({
+      'tournament': ['MPL ID S16'] * 3, 'region': ['ID'] * 3, 'match_order': [1, 1, 2], 'game_number': [1, 2, 1],
+      'team_left': ['RRQ', 'RRQ', 'EVOS'], 'team_right': ['ONIC', 'ONIC', 'BTR'], 'winner_match': ['RRQ', 'ONIC', 'BTR'],
+      'source_file': ['mpl_id_s16.csv'] * 3, 'ingested_at': ['2026-10-18 06:00:00'] * 3,
+   })
+   df_bronze['match_id'], df_bronze['content_hash'] = match_content_ids(df_bronze)
+
+   df_state = pd.DataFrame(columns=STATE_COLS)
+   changed, df_stale = select_changed_matches(df_bronze, df_state)
+   df_state = update_state(df_state, df_stale, df_bronze[changed].assign(**{BATCH_KEY: 'b1'}))
+   assert changed.all()
+
+   # Bronze ditulis ulang tanpa perubahan: timestamp run baru, ingested_at lama dipertahankan
+   df_rerun = df_bronze.assign(ingested_at='2026-10-18 07:00:00')
+   df_rerun['ingested_at'] = carry_ingested_at(df_rerun, df_bronze)
+   assert not watermark_candidates(df_rerun, df_state).any()
+   changed, df_stale = select_changed_matches(df_rerun, df_state)
+   assert not changed.any() and df_stale.empty
+
+   # Satu game dikoreksi: hanya game itu yang terpilih, versi lamanya dibuang
+   df_fixed = df_rerun.assign(winner_match=['RRQ', 'RRQ', 'BTR'], ingested_at='2026-10-18 08:00:00')
+   df_fixed['match_id'], df_fixed['content_hash'] = match_content_ids(df_fixed)
+   df_fixed['ingested_at'] = carry_ingested_at(df_fixed, df_rerun)
+   changed, df_stale = select_changed_matches(df_fixed, df_state)
+   assert changed.tolist() == [False, True, False] and len(df_stale) == 1
+   print("[INFO] incremental OK: run ulang tanpa perubahan memilih 0 baris, koreksi 1 game memilih 1 baris")
@@ -0,0 +1,110 @@
+import numpy as np
+
+# Urutan lane standar: bit ke-i = LANE_KEYWORDS[i] (sama dengan LANE_ROLES di recommender)
+LANE_KEYWORDS = ['exp', 'gold', 'mid', 'roam', 'jung']
+N_LANES = len(LANE_KEYWORDS)
+FULL_LANES = (1 << N_LANES) - 1
+
+_STATES = np.arange(1 << N_LANES)
+_POPCOUNT = np.array([bin(s).count("1") for s in range(1 << N_LANES)])
+# Index lane pertama (bit terendah) dari sebuah mask, -1 untuk mask kosong
+LOWEST_LANE = np.array([(s & -s).bit_length() - 1 for s in range(1 << N_LANES)])
+# Bitset state (bit ke-S) yang lane ke-i-nya masih kosong, untuk lanes_complete_many
+_WITHOUT_LANE = [sum(1 << s for s in range(1 << N_LANES) if not s & (1 << bit)) for bit in range(N_LANES)]
+
+def lane_mask(lane_text):
+   """Teks lane hero (mis. 'Exp Lane, Roam') -> bitmask 5-bit."""
+   if not isinstance(lane_text, str): return 0
+   text = lane_text.lower()
+   mask = 0
+   for bit, keyword in enumerate(LANE_KEYWORDS):
+      if keyword in text:
+         mask |= 1 << bit
+   return mask
+
+def lane_masks(lane_series):
+   """Versi kolom dari lane_mask: Series teks lane -> array uint8 bitmask."""
+   text = lane_series.astype(str).str.lower()
+   masks = np.zeros(len(text), dtype=np.uint8)
+   for bit, keyword in enumerate(LANE_KEYWORDS):
+      masks |= np.where(text.str.contains(keyword, regex=False).to_numpy(dtype=bool), 1 << bit, 0).astype(np.uint8)
+   return masks
+
+def solve_team(masks):
+   """
+   Assignment lane satu tim (tiap hero maks 1 lane, tiap lane maks 1 hero).
+   DP bitmask atas himpunan lane yang terpakai, hero tanpa data lane (mask 0) dilewati.
+
+   Return (max_assigned, open_lanes):
+   - max_assigned: jumlah hero terbanyak yang bisa dapat lane berbeda
+   - open_lanes: lane yang masih bisa diisi pick berikutnya tanpa menggeser hero lain
+     (OR komplemen dari semua assignment maksimum). Hero flex hanya menutup satu lane.
+   """
+   states = {0}
+   for mask in masks:
+      mask = int(mask)
+      if not mask: continue
+      states |= {s | (1 << bit) for s in states for bit in range(N_LANES)
+                 if mask & (1 << bit) and not s & (1 << bit)}
+   max_assigned = max(_POPCOUNT[s] for s in states)
+   open_lanes = 0
+   for s in states:
+      if _POPCOUNT[s] == max_assigned:
+         open_lanes |= FULL_LANES ^ s
+   return int(max_assigned), open_lanes
+
+def solve_teams(team_masks):
+   """
+   Versi batch dari solve_team untuk banyak tim sekaligus.
+   team_masks: array (T, K) bitmask lane per slot hero (0 = kosong / tanpa data).
+   Return array (max_assigned, open_lanes), masing-masing panjang T.
+   """
+   team_masks = np.atleast_2d(np.asarray(team_masks, dtype=np.int64))
+   reachable = np.zeros((team_masks.shape[0], len(_STATES)), dtype=bool)
+   reachable[:, 0] = True
+   for slot in range(team_masks.shape[1]):
+      mask = team_masks[:, slot]
+      grown = reachable.copy()
+      for bit in range(N_LANES):
+         lane = 1 << bit
+         src = _STATES[(_STATES & lane) == 0]
+         grown[:, src | lane] |= reachable[:, src] & ((mask & lane) != 0)[:, None]
+      reachable = grown
+
+   size = np.where(reachable, _POPCOUNT, -1)
+   max_assigned = size.max(axis=1)
+   best = size == max_assigned[:, None]
+   open_lanes = np.bitwise_or.reduce(np.where(best, FULL_LANES ^ _STATES, 0), axis=1)
+   return max_assigned, open_lanes
+
+def is_lane_complete(masks):
+   """
+   1 jika semua hero (yang punya data lane) bisa ditempatkan di lane berbeda,
+   artinya assignment 5 lane yang valid masih mungkin; 0 jika tidak / tim kosong.
+   """
+   masks = [int(m) for m in masks if m]
+   if not masks: return 0
+   max_assigned, _ = solve_team(masks)
+   return 1 if max_assigned == len(masks) else 0
+
+def lanes_complete_many(team_masks):
+   """
+   Versi batch dari is_lane_complete untuk array (T, K) lane mask.
+   Himpunan state assignment yang bisa dicapai disimpan sebagai bitset 32-bit per tim
+   (bit S = lane S sudah terisi semua hero sejauh ini), jadi tiap slot hanya
+   N_LANES operasi vektor (T,) tanpa array sementara (T, K) / (T, 32).
+   """
+   team_masks = np.atleast_2d(np.asarray(team_masks, dtype=np.int64))
+   reach = np.ones(team_masks.shape[0], dtype=np.int64)  # hanya state kosong
+   has_lane = np.zeros(team_masks.shape[0], dtype=bool)
+   for slot in range(team_masks.shape[1]):
+      mask = team_masks[:, slot]
+      grown = np.zeros_like(reach)
+      for bit in range(N_LANES):
+         lane = 1 << bit
+         grown |= ((reach & _WITHOUT_LANE[bit]) << lane) & -((mask >> bit) & 1)
+      # Hero tanpa data lane (mask 0) dilewati
+      assigned = mask != 0
+      reach = np.where(assigned, grown, reach)
+      has_lane |= assigned
+   return (has_lane & (reach != 0)).astype(np.int64)
@@ -85,4 +85,159 @@ def read_df_from_minio(bucket_name: str, object_name: str, file_format='csv'):
       return df
    except Exception as e:
       print(f"[MINIO] Error Read: {object_name}: {e}")
-      return None
\ No newline at end of file
+      return None
+def get_object_etag(bucket_name: str, object_name: str):
+   """
+   ETag object di MinIO (cukup HEAD/stat, tanpa download isi file).
+   Return None jika object tidak ada atau MinIO tidak bisa dihubungi.
+   """
+   client = get_minio_client()
+   
+   try:
+      return client.stat_object(bucket_name, object_name).etag
+   except Exception as e:
+      print(f"[MINIO] Error Stat: {object_name}: {e}")
+      return None
+
+def upload_file_to_minio(file_path: str, bucket_name: str, object_name: str):
+   """
+   upload file lokal apa adanya (mis. serving bundle biner) ke MinIO.
+   Return True jika berhasil.
+   """
+   client = get_minio_client()
+   
+   try:
+      if not client.bucket_exists(bucket_name):
+         client.make_bucket(bucket_name)
+      client.fput_object(bucket_name, object_name, file_path, content_type='application/octet-stream')
+      print(f"[MINIO] Berhasil Upload: {bucket_name}/{object_name}")
+      return True
+   except Exception as e:
+      print(f"[MINIO] Error Upload: {object_name}: {e}")
+      return False
+
+def download_file_from_minio(bucket_name: str, object_name: str, file_path: str):
+   """
+   download object MinIO ke file lokal (ditulis ke file .part lalu di-rename).
+   Return True jika berhasil.
+   """
+   client = get_minio_client()
+   
+   try:
+      client.fget_object(bucket_name, object_name, file_path)
+      return True
+   except Exception as e:
+      print(f"[MINIO] Error Download: {object_name}: {e}")
+      return False
+
+def list_objects_in_minio(bucket_name: str, prefix: str):
+   """
+   Daftar object di bawah prefix (rekursif) -> dict {object_name: etag}.
+   Dict kosong jika prefix belum ada atau MinIO tidak bisa dihubungi.
+   """
+   client = get_minio_client()
+   
+   try:
+      return {obj.object_name: obj.etag for obj in client.list_objects(bucket_name, prefix=prefix, recursive=True)}
+   except Exception as e:
+      print(f"[MINIO] Error List: {prefix}: {e}")
+      return {}
+
+def delete_objects_from_minio(bucket_name: str, object_names):
+   """
+   hapus beberapa object (mis. partisi parquet lama). Return jumlah object yang terhapus.
+   """
+   client = get_minio_client()
+   deleted = 0
+   
+   for object_name in object_names:
+      try:
+         client.remove_object(bucket_name, object_name)
+         deleted += 1
+      except Exception as e:
+         print(f"[MINIO] Error Delete: {object_name}: {e}")
+   return deleted
+
+# --- DATASET PARQUET TERPARTISI (hive: <prefix>/kolom=nilai/part-0.parquet) ---
+# Ukuran row group: cukup kecil supaya statistik min/max per row group bisa dipakai skip data,
+# cukup besar supaya overhead metadata & request range kecil
+ROW_GROUP_ROWS = 64 * 1024
+
+def get_arrow_filesystem():
+   """Filesystem pyarrow ke MinIO (S3 API); path = '<bucket>/<object>'."""
+   from pyarrow import fs
+   return fs.S3FileSystem(
+      access_key=MINIO_CONFIG['access_key'],
+      secret_key=MINIO_CONFIG['secret_key'],
+      endpoint_override=MINIO_CONFIG['endpoint'],
+      scheme='https' if MINIO_CONFIG['secure'] else 'http',
+   )
+
+def _hive_partitioning(partition_cols):
+   import pyarrow as pa
+   import pyarrow.dataset as ds
+   if not partition_cols:
+      return 'hive'
+   # Nilai partisi selalu string (username '123' tidak berubah jadi int)
+   return ds.partitioning(pa.schema([(col, pa.string()) for col in partition_cols]), flavor='hive')
+
+def upload_partitioned_df_to_minio(df: pd.DataFrame, bucket_name: str, prefix: str, partition_cols=(),
+                                   row_group_size=ROW_GROUP_ROWS):
+   """
+   upload dataframe sebagai dataset parquet gaya hive di bawah prefix, mis.
+   bronze/tournament_matches/bronze_mpl_matches/region=ID/season=S16/part-0.parquet.
+   Hanya partisi yang ada di df yang ditimpa; partisi lain dibiarkan.
+   """
+   import pyarrow as pa
+   import pyarrow.dataset as ds
+   
+   partition_cols = [col for col in partition_cols if col in df.columns]
+   df = df.copy()
+   for col in partition_cols:
+      df[col] = df[col].astype('string')
+   
+   try:
+      client = get_minio_client()
+      if not client.bucket_exists(bucket_name):
+         client.make_bucket(bucket_name)
+   except Exception as e:
+      print(f"[MINIO] Error Bucket: {bucket_name}: {e}")
+   
+   try:
+      ds.write_dataset(
+         pa.Table.from_pandas(df, preserve_index=False),
+         f"{bucket_name}/{prefix}",
+         filesystem=get_arrow_filesystem(),
+         format='parquet',
+         partitioning=partition_cols or None,
+         partitioning_flavor='hive' if partition_cols else None,
+         basename_template='part-{i}.parquet',
+         existing_data_behavior='delete_matching',
+         max_rows_per_group=row_group_size,
+         min_rows_per_group=min(row_group_size, max(len(df), 1)),
+      )
+      print(f"[MINIO] Berhasil Upload: {bucket_name}/{prefix} (partisi: {', '.join(partition_cols) or '-'})")
+      return True
+   except Exception as e:
+      print(f"[MINIO] Error Upload: {prefix}: {e}")
+      return False
+
+def read_partitioned_df_from_minio(bucket_name: str, prefix: str, columns=None, filters=None, partition_cols=None):
+   """
+   Baca dataset parquet terpartisi. Hanya byte yang dibutuhkan yang diambil:
+   - columns: proyeksi kolom (kolom lain tidak di-download)
+   - filters: list tuple gaya pyarrow, mis. [('region', '==', 'ID')] atau [('username', 'in', [...])].
+     Filter pada kolom partisi memangkas folder, filter kolom lain memangkas row group (statistik min/max).
+   Return None jika dataset belum ada.
+   """
+   import pyarrow.dataset as ds
+   import pyarrow.parquet as pq
+   
+   try:
+      dataset = ds.dataset(f"{bucket_name}/{prefix}", filesystem=get_arrow_filesystem(), format='parquet',
+                           partitioning=_hive_partitioning(partition_cols))
+      table = dataset.to_table(columns=columns, filter=pq.filters_to_expression(filters) if filters else None)
+      return table.to_pandas()
+   except Exception as e:
+      print(f"[MINIO] Error Read: {prefix}: {e}")
+      return None
@@ -1,19 +1,7 @@
-import re
+from source.utils.helper_bronze import normalize_hero_name as _canonical_hero_name
 
 def normalize_hero_name(hero_name: str) -> str:
+   """Alias lama: semua normalisasi nama hero memakai helper_bronze.normalize_hero_name."""
    if hero_name is None:
       return None
-   
-   # lowercase
-   name = hero_name.lower().strip()
-   
-   # hilangkan suffix tahun
-   name = re.sub(r"\s\d{4}$", "", name)
-   
-   # samakan tanda hubung
-   name = name.replace("-", " ")
-   
-   # hilangkan spasi ganda
-   name = re.sub(r"\s+", " ", name)
-   
-   return name
\ No newline at end of file
+   return _canonical_hero_name(hero_name)
@@ -3,12 +3,14 @@ import sys
 import os
 import time
 import pandas as pd
+import numpy as np
 import subprocess
+import threading
 
 # --- 1. SETUP PATH SYSTEM ---
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from source.ml.recommender import DraftRecommender
+from source.ml.recommender import DraftRecommender, DraftSession
 from source.utils.minio_helper import read_df_from_minio, upload_df_to_minio
 
 try:
@@ -16,6 +18,25 @@ try:
 except ImportError:
     DraftPredictor = None
 
+from source.ml.draft_search import DraftSearch
+from source.ml.draft_state import DraftState, ALLY, ENEMY
+from source.ml.gold_snapshot import HotSnapshot
+from source.ml.shared_snapshot import read_snapshot_version
+from source.ml.serving_bundle import fetch_serving_bundle, bundle_signature
+from source.ml.inference_server import InferenceServer, InferenceClient, LocalClient
+
+# Interval cek ETag data gold (detik); DAG user-learning jalan per jam, DAG hero per 2 hari
+SNAPSHOT_POLL_SECONDS = int(os.getenv("SNAPSHOT_POLL_SECONDS", "60"))
+# Snapshot recommender shared (mmap) dari publisher `python -m source.ml.shared_snapshot --watch`;
+# kosong = tiap replica membaca gold dari MinIO sendiri
+SHARED_SNAPSHOT_PATH = os.getenv("SHARED_SNAPSHOT_PATH", "")
+# 1 = cold start dari serving bundle (gold/serving_bundle.snap, dibuat process_gold3 / process_user_data)
+USE_SERVING_BUNDLE = os.getenv("USE_SERVING_BUNDLE", "0") == "1"
+# Window micro-batch inference server (ms); 0 = tanpa server, panggil model langsung
+INFERENCE_WINDOW_MS = float(os.getenv("INFERENCE_WINDOW_MS", "3"))
+# Worker process lookahead search (dibatasi kecil: pool dipakai bersama semua sesi)
+SEARCH_WORKERS = min(int(os.getenv("SEARCH_WORKERS", "4")), os.cpu_count() or 1)
+
 # --- 2. KONFIGURASI HALAMAN ---
 st.set_page_config(
     page_title="MLBB Tactical Center",
@@ -177,20 +198,69 @@ load_css()
 # --- 4. LOGIC LOAD RESOURCES ---
 @st.cache_resource
 def load_system():
+    """Snapshot recommender & predictor yang di-reload otomatis saat ETag data gold berubah."""
     try:
-        rec = DraftRecommender()
-        hero_list = sorted(rec.df_stats['hero_name'].unique().tolist()) if rec.df_stats is not None else []
-        pred = DraftPredictor() if DraftPredictor else None
-        return rec, pred, hero_list
+        if USE_SERVING_BUNDLE:
+            # Satu file berisi recommender + predictor; reload saat ETag bundle berubah
+            rec = HotSnapshot(lambda: DraftRecommender.from_shared(fetch_serving_bundle()), bundle_signature,
+                              interval_seconds=SNAPSHOT_POLL_SECONDS, name="recommender").start()
+            pred = HotSnapshot(lambda: DraftPredictor.from_shared(fetch_serving_bundle()), bundle_signature,
+                               interval_seconds=SNAPSHOT_POLL_SECONDS, name="predictor").start() if DraftPredictor else None
+            return rec, pred
+        if SHARED_SNAPSHOT_PATH and read_snapshot_version(SHARED_SNAPSHOT_PATH) is not None:
+            # Attach zero-copy ke snapshot publisher; reload saat versi di header naik
+            rec = HotSnapshot(lambda: DraftRecommender.from_shared(SHARED_SNAPSHOT_PATH),
+                              lambda: {SHARED_SNAPSHOT_PATH: read_snapshot_version(SHARED_SNAPSHOT_PATH)},
+                              interval_seconds=SNAPSHOT_POLL_SECONDS, name="recommender").start()
+        else:
+            rec = HotSnapshot(DraftRecommender, DraftRecommender.source_signature,
+                              interval_seconds=SNAPSHOT_POLL_SECONDS, name="recommender").start()
+        pred = HotSnapshot(DraftPredictor, DraftPredictor.source_signature,
+                           interval_seconds=SNAPSHOT_POLL_SECONDS, name="predictor").start() if DraftPredictor else None
+        return rec, pred
     except Exception as e:
-        return None, None, []
+        return None, None
 
-recommender, predictor, all_heroes = load_system()
+recommender_hot, predictor_hot = load_system()
+
+@st.cache_resource
+def load_inference(_recommender_hot, _predictor_hot):
+    """Satu inference server untuk semua sesi: prediksi & rekomendasi di-batch per window."""
+    if INFERENCE_WINDOW_MS <= 0:
+        return LocalClient(_predictor_hot, _recommender_hot)
+    server = InferenceServer(_predictor_hot, _recommender_hot, window_ms=INFERENCE_WINDOW_MS).start()
+    return InferenceClient(server)
 
-if not recommender:
+@st.cache_resource
+def load_search_slot():
+    """Satu DraftSearch (dan process pool-nya) untuk semua sesi, diganti saat snapshot berganti."""
+    return {'search': None, 'versions': None, 'lock': threading.Lock()}
+
+def load_search(recommender, predictor, snapshot_versions):
+    slot = load_search_slot()
+    with slot['lock']:
+        if slot['versions'] != snapshot_versions:
+            # Pool lama ditutup tanpa membatalkan search sesi lain yang masih berjalan.
+            # Worker di-spawn (bukan fork) karena proses ini punya thread poller & inference server.
+            if slot['search'] is not None:
+                slot['search'].close(wait=False)
+            slot['search'] = DraftSearch(recommender, predictor, workers=SEARCH_WORKERS, start_method='spawn').warm_up()
+            slot['versions'] = snapshot_versions
+        return slot['search']
+
+if not recommender_hot:
     st.error("System Failure: Check Data Paths.")
     st.stop()
 
+# Pin snapshot sekali per rerun: seluruh render memakai data versi yang sama
+recommender = recommender_hot.current
+predictor = predictor_hot.current if predictor_hot else None
+snapshot_versions = (recommender_hot.version, predictor_hot.version if predictor_hot else 0)
+inference = load_inference(recommender_hot, predictor_hot)
+all_heroes = sorted(recommender.df_stats['hero_name'].unique().tolist()) if not recommender.df_stats.empty else []
+# Hero index (recommender) tiap opsi selectbox, -1 jika tidak dikenal
+all_hero_idx = np.array([-1 if idx is None else idx for idx in map(recommender._hero_idx, all_heroes)], dtype=np.intp)
+
 # --- 5. SESSION STATE MANAGER ---
 defaults = {
     'draft_stage': 'ban',
@@ -206,12 +276,68 @@ def reset_draft():
         st.session_state[k] = defaults[k] if k != 'draft_stage' else 'ban'
     st.rerun()
 
+def draft_actions(pick_order):
+    """Aksi draft dari slot, urut draft sebenarnya: semua ban (fase 1) lalu pick sesuai pick_order."""
+    actions = [('ban', None, hero) for hero in st.session_state.blue_bans + st.session_state.red_bans if hero]
+    for team, idx in pick_order:
+        hero = (st.session_state.blue_picks if team == 'B' else st.session_state.red_picks)[idx]
+        if hero: actions.append(('pick', ALLY if team == 'B' else ENEMY, hero))
+    return actions
+
+def get_draft_session(actions):
+    """DraftSession milik sesi ini (dibuat ulang jika snapshot/user/profil berubah), disinkronkan dengan slot."""
+    session = st.session_state.get('draft_session')
+    if (session is None or session.recommender is not recommender or
+            session.username != st.session_state['active_user'] or
+            session.user_profile != st.session_state['user_profile']):
+        session = DraftSession(recommender, st.session_state['active_user'], st.session_state['user_profile'])
+        st.session_state['draft_session'] = session
+    session.sync(actions)
+    return session
+
+def undo_last_action():
+    """Callback tombol undo: batalkan aksi terakhir di DraftSession dan kosongkan slotnya."""
+    session = st.session_state.get('draft_session')
+    if session is None: return
+    undone = session.undo()
+    if undone is None: return
+
+    action, side, hero = undone
+    if action == 'ban':
+        slots = [('blue_bans', 'ban_b'), ('red_bans', 'ban_r')]
+    elif side == 'ally':
+        slots = [('blue_picks', 'p_b')]
+    else:
+        slots = [('red_picks', 'p_r')]
+
+    for state_key, widget_prefix in slots:
+        if hero in st.session_state[state_key]:
+            i = st.session_state[state_key].index(hero)
+            st.session_state[state_key][i] = None
+            st.session_state[f"{widget_prefix}_{i}"] = "-"
+            break
+
+def draft_state_from_slots():
+    """DraftState (bitset hero index) dari slot ban/pick; biru = tim kita."""
+    state = DraftState(recommender.n_heroes)
+    for side, picks, bans in ((ALLY, 'blue_picks', 'blue_bans'), (ENEMY, 'red_picks', 'red_bans')):
+        for hero in st.session_state[picks]:
+            if hero: state.pick(side, recommender._hero_idx(hero))
+        for hero in st.session_state[bans]:
+            if hero: state.ban(recommender._hero_idx(hero), side)
+    return state
+
+# Mask ketersediaan all_heroes per state draft (20 selectbox dalam satu rerun memakai mask yang sama)
+_availability = {}
+
 def get_available_heroes(current_val=None):
-    used = st.session_state.blue_bans + st.session_state.red_bans + \
-           st.session_state.blue_picks + st.session_state.red_picks
-    used_set = set([x for x in used if x is not None])
+    state = draft_state_from_slots()
+    available = _availability.get(state.key())
+    if available is None:
+        available = (all_hero_idx < 0) | state.available_mask()[all_hero_idx]
+        _availability[state.key()] = available
     # Jika current_val ada, izinkan dia muncul agar tidak hilang dari list saat sudah dipilih
-    return [h for h in all_heroes if h not in used_set or h == current_val]
+    return [h for h, ok in zip(all_heroes, available) if ok or h == current_val]
 
 # --- 6. HEADER VISUAL ---
 st.markdown("""
@@ -271,6 +397,9 @@ with st.sidebar:
     
     with st.expander("⚙️ Match Settings"):
         first_pick = st.radio("First Pick", ["Blue Team (You)", "Red Team (Enemy)"])
+        use_model_blend = st.checkbox("📊 Blend Model Win Rate", value=False, help="Eksperimental: tambahkan kenaikan win probability model (jika hero diambil sekarang) ke skor rekomendasi.")
+        use_lookahead = st.checkbox("🔭 Lookahead Search", value=False, help="Simulasi 2-4 pick ke depan dengan model win rate (lebih berat).")
+        lookahead_depth = st.slider("Kedalaman Lookahead", 2, 4, 3, disabled=not use_lookahead)
     
     st.divider()
     if st.button("☣️ RESET PROTOCOL", use_container_width=True, type="secondary"):
@@ -377,7 +506,11 @@ if st.session_state.draft_stage == 'ban':
         st.markdown("#### ⚠️ THREAT ANALYSIS")
         
         current_bans = [x for x in st.session_state.blue_bans + st.session_state.red_bans if x]
-        recs = recommender.recommend_dynamic_ban([], [], current_bans)
+        try:
+            recs = inference.recommend('recommend_dynamic_ban', [], [], current_bans)
+        except Exception:
+            # Server sibuk / deadline / error di sisi server: hitung langsung seperti sebelum ada server
+            recs = recommender.recommend_dynamic_ban([], [], current_bans)
         
         with st.container(height=350, border=False):
             if recs:
@@ -478,7 +611,7 @@ else:
         # 1. WIN PROBABILITY GAUGE
         if predictor and my_team and en_team:
             try:
-                win_prob = predictor.predict_win_rate(my_team, en_team)
+                win_prob = inference.predict_win_rate(my_team, en_team)
                 st.markdown(f"""
                 <div class="glass-card" style="padding: 15px; text-align:center;">
                     <div style="font-size:0.9rem; color:#94a3b8; letter-spacing:1px;">PREDICTED WIN RATE</div>
@@ -493,13 +626,19 @@ else:
             except: pass
 
         # 2. RECOMMENDATION ENGINE
+        draft_session = get_draft_session(draft_actions(pick_order))
+        if my_team or en_team:
+            st.button("↩️ UNDO LAST ACTION", on_click=undo_last_action, use_container_width=True)
+
         if curr_team == 'Blue':
-            recs_user, recs_team = recommender.recommend_personalized(my_team, en_team, banned, st.session_state['user_profile'], st.session_state['active_user'])
+            recs_user, recs_team = draft_session.recommendations(predictor if use_model_blend else None)
             
             st.markdown('<div class="glass-card">', unsafe_allow_html=True)
             
             # Tabs manual using columns for cleaner look
-            t1, t2 = st.tabs(["PERSONALIZED", "TEAM SYNERGY"])
+            show_lookahead = use_lookahead and predictor is not None
+            tabs = st.tabs(["PERSONALIZED", "TEAM SYNERGY"] + (["LOOKAHEAD"] if show_lookahead else []))
+            t1, t2 = tabs[0], tabs[1]
             
             with t1:
                st.caption("Recommended based on your Role & Comfort:")
@@ -546,6 +685,28 @@ else:
                                 <div class="hero-score">{int(r['score'])} PTS</div>
                             </div>
                             """, unsafe_allow_html=True)
+
+            if show_lookahead:
+                with tabs[2]:
+                    st.caption("Ranking berdasarkan perkiraan win rate akhir (simulasi pick lawan):")
+                    remaining_order = [
+                        'ally' if team == 'B' else 'enemy'
+                        for team, idx in pick_order
+                        if (st.session_state.blue_picks if team == 'B' else st.session_state.red_picks)[idx] is None
+                    ]
+                    search = load_search(recommender, predictor, snapshot_versions)
+                    lookahead = search.search(my_team, en_team, banned, remaining_order, max_depth=lookahead_depth)
+                    for r in lookahead:
+                        prob_text = f"{r['win_prob']:.1%}" if r['win_prob'] is not None else "-"
+                        st.markdown(f"""
+                        <div class="rec-item">
+                            <div>
+                                <div class="hero-name">{r['hero']}</div>
+                                <div class="hero-desc">Depth {r['depth']} • Heuristic {int(r['heuristic'])} PTS</div>
+                            </div>
+                            <div class="hero-score">{prob_text}</div>
+                        </div>
+                        """, unsafe_allow_html=True)
             st.markdown('</div>', unsafe_allow_html=True)
 
         elif curr_team == 'Red':